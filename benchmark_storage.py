@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Сравнение бэкендов хранилища по задержке сохранения/загрузки.
+
+Для каждого бэкенда в хранилище заранее кладется N игр (фон), после чего
+замеряется: полное сохранение игры, сохранение одного игрока (раскрытие
+карточки) и загрузка игры. Запуск:
+
+    python benchmark_storage.py [--games 1,10,100,1000] [--players 16] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from storage import JsonFileStorage, MemoryStorage, SQLiteStorage
+
+CARD_TYPES = ['profession', 'biology', 'health', 'phobia', 'hobby', 'fact', 'baggage']
+
+
+def make_player(user_id: int) -> dict:
+    """Состояние игрока того же вида, что пишет GameManager"""
+    return {
+        'user_id': user_id,
+        'username': f'player{user_id}',
+        'first_name': f'Игрок {user_id}',
+        'is_alive': True,
+        'is_admin': False,
+        'votes_received': 0,
+        'has_voted': False,
+        'vote_target': None,
+        'special_card_used': False,
+        'character': {
+            'profession': 'Инженер',
+            'gender': 'Женщина',
+            'age': random.randint(16, 100),
+            'body_type': 'Спортивное телосложение',
+            'disease': 'Полностью здоров',
+            'phobia': 'Арахнофобия - боязнь пауков',
+            'hobby': 'Пайка микросхем',
+            'fact': 'Гений',
+            'baggage': 'Фильтр для воды',
+            'special_card': '',
+            'special_card_id': '',
+            'revealed_cards': {card_type: False for card_type in CARD_TYPES + ['special_card']}
+        }
+    }
+
+
+def make_game(chat_id: int, players: int) -> dict:
+    return {
+        'chat_id': chat_id,
+        'phase': 'card_reveal_1',
+        'current_card_phase': 1,
+        'players': {str(user_id): make_player(user_id) for user_id in range(1, players + 1)}
+    }
+
+
+def timed(func, repeat: int) -> float:
+    """Медиана времени вызова в микросекундах"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(samples)
+
+
+def bench_backend(factory, background_games: int, players: int, repeat: int) -> dict:
+    storage = factory()
+    try:
+        for chat_id in range(1, background_games + 1):
+            storage.save_game_state(-chat_id, make_game(-chat_id, players))
+
+        chat_id = -(background_games + 1)
+        game = make_game(chat_id, players)
+        header = {key: value for key, value in game.items() if key != 'players'}
+        storage.save_game_state(chat_id, game)
+
+        def reveal():
+            user_id = random.randint(1, players)
+            player = game['players'][str(user_id)]
+            player['character']['revealed_cards'][random.choice(CARD_TYPES)] = True
+            storage.save_player_state(chat_id, header, user_id, player)
+
+        return {
+            'save': timed(lambda: storage.save_game_state(chat_id, game), repeat),
+            'reveal': timed(reveal, repeat),
+            'load': timed(lambda: storage.load_game_state(chat_id), repeat),
+        }
+    finally:
+        storage.close()
+
+
+def run_benchmark(game_counts, players: int = 16, repeat: int = 200):
+    print(f"👥 Игроков в игре: {players}, повторов: {repeat}. Время - медиана, мкс")
+    print(f"{'бэкенд':<8} {'игр':>6} {'save':>10} {'reveal':>10} {'load':>10}")
+
+    for background_games in game_counts:
+        tmp_dir = tempfile.mkdtemp(prefix='bunker_bench_')
+        try:
+            backends = [
+                ('memory', MemoryStorage),
+                ('json', lambda: JsonFileStorage(os.path.join(tmp_dir, 'cards'), os.path.join(tmp_dir, 'games'))),
+                ('sqlite', lambda: SQLiteStorage(os.path.join(tmp_dir, 'bench.db'))),
+            ]
+            for name, factory in backends:
+                result = bench_backend(factory, background_games, players, repeat)
+                print(f"{name:<8} {background_games:>6} {result['save']:>10.1f} "
+                      f"{result['reveal']:>10.1f} {result['load']:>10.1f}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилищ карточек и игр")
+    parser.add_argument('--games', default='1,10,100,1000', help="Количество игр в хранилище, через запятую")
+    parser.add_argument('--players', type=int, default=16, help="Игроков в игре")
+    parser.add_argument('--repeat', type=int, default=200, help="Повторов на замер")
+    args = parser.parse_args(argv)
+
+    run_benchmark([int(count) for count in args.games.split(',')], args.players, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
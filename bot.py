@@ -5,33 +5,41 @@ from telebot import types
 from telebot import apihelper
 import threading
 import time
+from typing import Optional
 
-from config import BOT_TOKEN, LOGGING_CONFIG
+from config import BOT_TOKEN, LOGGING_CONFIG, MEMBER_CACHE_SETTINGS, HTTP_SETTINGS, FANOUT_SETTINGS, CALLBACK_SETTINGS
 from game_manager import GameManager
 from handlers import BotHandlers
+from logging_setup import setup_logging, shutdown_logging
+from member_cache import MemberCache
+from http_session import install_api_session
+from fanout import shutdown_fan_out
+from edit_dedup import edit_dedup
+from tracing import install_api_tracing, start_update_trace
 
 apihelper.ENABLE_MIDDLEWARE = True
 
-# Настройка логирования
-logging.basicConfig(
-    level=getattr(logging, LOGGING_CONFIG['level']),
-    format=LOGGING_CONFIG['format'],
-    handlers=[
-        logging.FileHandler(LOGGING_CONFIG['file'], encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Настройка логирования (запись в файл - в фоновом потоке)
+setup_logging(LOGGING_CONFIG)
 
 logger = logging.getLogger(__name__)
 
 class BunkerBot:
     """Основной класс бота"""
     
-    def __init__(self):
-        """Инициализация бота"""
+    def __init__(self, worker_index: Optional[int] = None):
+        """Инициализация бота (worker_index - номер воркера в многопроцессном режиме)"""
+        self.worker_index = worker_index
         self.bot = telebot.TeleBot(BOT_TOKEN, parse_mode='Markdown')
-        self.game_manager = GameManager(self.bot)
+        self.game_manager = GameManager(self.bot, cards_read_only=worker_index is not None,
+                                        worker_index=worker_index)
         self.handlers = BotHandlers(self.bot, self.game_manager)
+        # Администраторы и участники чатов (проверки прав без запроса на каждое нажатие)
+        self.member_cache = MemberCache(
+            ttl=MEMBER_CACHE_SETTINGS['TTL'],
+            negative_ttl=MEMBER_CACHE_SETTINGS['NEGATIVE_TTL'],
+            max_size=MEMBER_CACHE_SETTINGS['MAX_SIZE']
+        )
         
         # Настройка бота
         self._setup_bot()
@@ -46,6 +54,28 @@ class BunkerBot:
         # Регистрируем обработчики
         self.handlers.register_handlers()
 
+        # Изменение состава или прав в чате сбрасывает кэш участников этого чата
+        self.bot.chat_member_handler(func=lambda update: True)(self._on_chat_member_update)
+        self.bot.my_chat_member_handler(func=lambda update: True)(self._on_chat_member_update)
+
+        # Пул соединений к Bot API по числу рабочих потоков, колбэков и рассылки (+ polling и таймеры)
+        install_api_session(
+            HTTP_SETTINGS['POOL_SIZE']
+            or self.bot.worker_pool.num_threads + CALLBACK_SETTINGS['WORKERS'] + FANOUT_SETTINGS['MAX_WORKERS'] + 4
+        )
+
+        # Каждый запрос к Telegram API - спан трассы
+        install_api_tracing()
+
+        # Middleware трассировки: трасса начинается до всех остальных middleware
+        @self.bot.middleware_handler(update_types=['message', 'callback_query'])
+        def trace_middleware(bot_instance, update):
+            """Назначает трассу сообщению или колбэку"""
+            try:
+                start_update_trace(update)
+            except Exception as e:
+                logger.error(f"Ошибка в trace_middleware: {e}")
+
         # ДОБАВЬТЕ ЭТОТ КОД ЗДЕСЬ:
         # Middleware для ограничения чатов
         @self.bot.middleware_handler(update_types=['message', 'callback_query'])
@@ -98,25 +128,35 @@ class BunkerBot:
         @self.bot.middleware_handler(update_types=['message', 'callback_query'])
         def log_middleware(bot_instance, update):
             """Middleware для логирования"""
+            # Ничего не собираем, если DEBUG выключен
+            if not logger.isEnabledFor(logging.DEBUG):
+                return
+
             try:
                 if hasattr(update, 'message') and update.message:
-                    user_info = f"User {update.message.from_user.id}"
-                    if update.message.from_user.username:
-                        user_info += f" (@{update.message.from_user.username})"
-
-                    chat_info = f"Chat {update.message.chat.id} ({update.message.chat.type})"
-                    logger.debug(f"Message from {user_info} in {chat_info}: {update.message.text}")
+                    message = update.message
+                    logger.debug("Message from User %s (@%s) in Chat %s (%s): %s",
+                                 message.from_user.id, message.from_user.username,
+                                 message.chat.id, message.chat.type, message.text,
+                                 extra={'chat_id': message.chat.id, 'user_id': message.from_user.id})
 
                 elif hasattr(update, 'callback_query') and update.callback_query:
-                    user_info = f"User {update.callback_query.from_user.id}"
-                    if update.callback_query.from_user.username:
-                        user_info += f" (@{update.callback_query.from_user.username})"
-
-                    logger.debug(f"Callback from {user_info}: {update.callback_query.data}")
+                    callback = update.callback_query
+                    logger.debug("Callback from User %s (@%s): %s",
+                                 callback.from_user.id, callback.from_user.username, callback.data,
+                                 extra={'chat_id': callback.message.chat.id if callback.message else None,
+                                        'user_id': callback.from_user.id})
 
             except Exception as e:
                 logger.error(f"Ошибка в middleware: {e}")
     
+    def _on_chat_member_update(self, update: types.ChatMemberUpdated):
+        """Обработчик chat_member / my_chat_member"""
+        try:
+            self.member_cache.invalidate_chat(update.chat.id)
+        except Exception as e:
+            logger.error(f"Ошибка сброса кэша участников: {e}")
+
     def start_polling(self):
         """Запуск бота в режиме polling"""
         try:
@@ -132,7 +172,9 @@ class BunkerBot:
                 interval=1,
                 timeout=60,
                 long_polling_timeout=60,
-                logger_level=logging.INFO
+                logger_level=logging.INFO,
+                # chat_member Telegram присылает только по явному запросу
+                allowed_updates=telebot.util.update_types
             )
             
         except Exception as e:
@@ -148,10 +190,29 @@ class BunkerBot:
             for game in self.game_manager.games.values():
                 self.game_manager.phase_timer.stop_phase_timer(game.chat_id)
             
+            # Дожидаемся начатых колбэков и рассылок в ЛС
+            self.handlers.stop_callbacks()
+            shutdown_fan_out()
+            if self.game_manager.board:
+                self.game_manager.board.close()
+
+            # Останавливаем очистку и сохраняем состояния пользователей
+            self.handlers.user_states.close()
+
+            # Дописываем историю игр
+            if self.game_manager.history:
+                self.game_manager.history.close()
+            if self.game_manager.card_analytics:
+                self.game_manager.card_analytics.close()
+            # Отпускаем аренды игр узла (кластерный режим)
+            self.game_manager.release_all_games()
+            self.game_manager.storage.close()
+
             # Останавливаем polling
             self.bot.stop_polling()
             
             logger.info("Бот остановлен")
+            shutdown_logging()
             
         except Exception as e:
             logger.error(f"Ошибка при остановке бота: {e}")
@@ -174,7 +235,7 @@ class BunkerBot:
     def edit_message_safe(self, chat_id: int, message_id: int, text: str, **kwargs):
         """Безопасное редактирование сообщения"""
         try:
-            return self.bot.edit_message_text(text, chat_id, message_id, **kwargs)
+            return edit_dedup.edit(self.bot.edit_message_text, text, chat_id, message_id, **kwargs)
         except telebot.apihelper.ApiTelegramException as e:
             if e.error_code == 400 and "message is not modified" in e.description.lower():
                 # Сообщение не изменилось - это нормально
@@ -186,20 +247,19 @@ class BunkerBot:
         return None
     
     def get_chat_administrators_safe(self, chat_id: int):
-        """Безопасное получение списка администраторов чата"""
-        try:
-            return self.bot.get_chat_administrators(chat_id)
-        except Exception as e:
-            logger.error(f"Ошибка получения админов чата {chat_id}: {e}")
-            return []
+        """Безопасное получение списка администраторов чата (через кэш)"""
+        return self.member_cache.get_or_load(
+            ('admins', chat_id),
+            lambda: self.bot.get_chat_administrators(chat_id),
+            default=[]
+        )
     
     def get_chat_member_safe(self, chat_id: int, user_id: int):
-        """Безопасное получение информации о участнике чата"""
-        try:
-            return self.bot.get_chat_member(chat_id, user_id)
-        except Exception as e:
-            logger.error(f"Ошибка получения участника {user_id} в чате {chat_id}: {e}")
-            return None
+        """Безопасное получение информации о участнике чата (через кэш)"""
+        return self.member_cache.get_or_load(
+            ('member', chat_id, user_id),
+            lambda: self.bot.get_chat_member(chat_id, user_id)
+        )
 
 def create_bot():
     """Фабрика для создания экземпляра бота"""
@@ -0,0 +1,99 @@
+# callback_codec.py
+"""Компактное самоописывающее кодирование callback_data игровых кнопок.
+
+Формат: "~" + код действия (1 символ) + base64url(версия, chat_id, nonce фазы, цель).
+Кнопка сама несёт игру и фазу, поэтому обработчику не нужно состояние пользователя,
+а кнопки из прошлых фаз отбрасываются сравнением nonce за O(1).
+"""
+import base64
+import binascii
+import struct
+from typing import NamedTuple, Optional
+
+CALLBACK_MARKER = "~"
+CODEC_VERSION = 1
+
+# Версия (1 байт), chat_id (8 байт), nonce фазы (2 байта), цель (8 байт) = 19 байт -> 26 символов
+_PAYLOAD = struct.Struct(">BqHq")
+
+# Ограничение Telegram на callback_data
+MAX_CALLBACK_DATA_LENGTH = 64
+
+NONCE_MASK = 0xFFFF
+
+
+class CallbackAction:
+    """Коды действий игровых кнопок"""
+    REVEAL = "r"
+    VOTE = "v"
+    ABSTAIN = "a"
+    SPECIAL = "s"
+
+    ALL = (REVEAL, VOTE, ABSTAIN, SPECIAL)
+
+
+# Карточки кодируются индексом в этом списке
+CARD_CODES = ['profession', 'biology', 'health', 'phobia', 'hobby', 'fact', 'baggage']
+
+
+class CallbackPayload(NamedTuple):
+    """Раскодированные данные кнопки"""
+    action: str
+    chat_id: int
+    nonce: int
+    target: int
+
+    @property
+    def card_type(self) -> Optional[str]:
+        """Тип карточки для действия раскрытия"""
+        if 0 <= self.target < len(CARD_CODES):
+            return CARD_CODES[self.target]
+        return None
+
+
+def encode_callback(action: str, chat_id: int, nonce: int, target: int = 0) -> str:
+    """Кодирует действие кнопки в callback_data"""
+    if action not in CallbackAction.ALL:
+        raise ValueError(f"Неизвестное действие кнопки: {action}")
+
+    raw = _PAYLOAD.pack(CODEC_VERSION, chat_id, nonce & NONCE_MASK, target)
+    data = CALLBACK_MARKER + action + base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+    if len(data.encode('utf-8')) > MAX_CALLBACK_DATA_LENGTH:
+        raise ValueError(f"callback_data длиннее {MAX_CALLBACK_DATA_LENGTH} байт")
+    return data
+
+
+def encode_card_reveal(chat_id: int, nonce: int, card_type: str) -> str:
+    """Кодирует кнопку раскрытия карточки"""
+    return encode_callback(CallbackAction.REVEAL, chat_id, nonce, CARD_CODES.index(card_type))
+
+
+def is_encoded_callback(data: str) -> bool:
+    """Проверяет, закодирована ли callback_data этим кодеком"""
+    return bool(data) and data.startswith(CALLBACK_MARKER)
+
+
+def decode_callback(data: str) -> Optional[CallbackPayload]:
+    """Раскодирует callback_data. Возвращает None для чужих, битых и устаревших по версии данных"""
+    if not is_encoded_callback(data) or len(data) < 3:
+        return None
+
+    action = data[1]
+    if action not in CallbackAction.ALL:
+        return None
+
+    encoded = data[2:]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+    except (binascii.Error, ValueError):
+        return None
+
+    if len(raw) != _PAYLOAD.size:
+        return None
+
+    version, chat_id, nonce, target = _PAYLOAD.unpack(raw)
+    if version != CODEC_VERSION:
+        return None
+
+    return CallbackPayload(action, chat_id, nonce, target)
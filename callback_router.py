@@ -0,0 +1,176 @@
+# callback_router.py
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+from logging_setup import bind_log_context, clear_log_context
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек (в миллисекундах)
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class RouteStats:
+    """Статистика вызовов одного маршрута"""
+
+    __slots__ = ('calls', 'errors', 'total_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # Последняя корзина - всё, что дольше последней границы
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms: float, failed: bool = False):
+        """Учитывает один вызов"""
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля по гистограмме (верхняя граница корзины)"""
+        if not self.calls:
+            return 0.0
+
+        threshold = self.calls * q
+        seen = 0
+        for i, count in enumerate(self.buckets[:-1]):
+            seen += count
+            if seen >= threshold:
+                return float(LATENCY_BUCKETS_MS[i])
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        """Снимок статистики"""
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_ms': self.total_ms / self.calls if self.calls else 0.0,
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max_ms,
+            'buckets': list(self.buckets),
+        }
+
+
+class Route:
+    """Маршрут колбэка"""
+
+    __slots__ = ('name', 'handler', 'stats')
+
+    def __init__(self, name: str, handler: Callable):
+        self.name = name
+        self.handler = handler
+        self.stats = RouteStats()
+
+
+class _TrieNode:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.route: Optional[Route] = None
+
+
+class CallbackRouter:
+    """Маршрутизатор callback_data: точные ключи в словаре, префиксы в префиксном дереве.
+
+    Точное совпадение всегда важнее префикса, среди префиксов побеждает самый длинный,
+    поэтому порядок регистрации не влияет на результат.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, Route] = {}
+        self._root = _TrieNode()
+        self._routes: List[Route] = []
+        self._lock = threading.Lock()
+
+    def exact(self, key: str, handler: Callable, name: str = None):
+        """Регистрирует обработчик для точного значения callback_data"""
+        if key in self._exact:
+            raise ValueError(f"Маршрут '{key}' уже зарегистрирован")
+
+        route = Route(name or key, handler)
+        self._exact[key] = route
+        self._routes.append(route)
+
+    def prefix(self, prefix: str, handler: Callable, name: str = None):
+        """Регистрирует обработчик для всех callback_data с данным префиксом"""
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+
+        if node.route is not None:
+            raise ValueError(f"Префикс '{prefix}*' уже зарегистрирован")
+
+        route = Route(name or f"{prefix}*", handler)
+        node.route = route
+        self._routes.append(route)
+
+    def resolve(self, data: str) -> Optional[Route]:
+        """Находит маршрут за O(len(data))"""
+        route = self._exact.get(data)
+        if route is not None:
+            return route
+
+        best = None
+        node = self._root
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                best = node.route
+        return best
+
+    def dispatch(self, call) -> bool:
+        """Вызывает обработчик для колбэка. Возвращает False, если маршрут не найден"""
+        clear_log_context()
+        bind_log_context(
+            chat_id=call.message.chat.id if call.message else None,
+            user_id=call.from_user.id
+        )
+
+        route = self.resolve(call.data or "")
+        if route is None:
+            logger.debug("Нет маршрута для колбэка: %s", call.data)
+            return False
+
+        failed = False
+        started = time.perf_counter()
+        try:
+            with tracer.span(f"route:{route.name}"):
+                route.handler(call)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                route.stats.record(elapsed_ms, failed)
+
+        return True
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Возвращает статистику по всем маршрутам"""
+        with self._lock:
+            return {route.name: route.stats.to_dict() for route in self._routes}
+
+    def get_slowest_routes(self, limit: int = 5) -> List[tuple]:
+        """Возвращает самые медленные маршруты по p95"""
+        stats = [(name, data) for name, data in self.get_stats().items() if data['calls']]
+        stats.sort(key=lambda item: (item[1]['p95_ms'], item[1]['avg_ms']), reverse=True)
+        return stats[:limit]
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Аналитика пулов карточек по завершенным играм.
+
+Каждая завершенная игра добавляет строку на каждую выданную карточку пула
+(профессия, пол, телосложение, болезнь, фобия, хобби, факт, багаж): кто ее
+раскрыл и когда, победил ли владелец, был ли он исключен. Хранилище колоночное
+и только дописывается: по файлу фиксированной ширины на колонку, значения
+карточек - номера в словаре (cards.jsonl). С NumPy колонки читаются через
+memmap и агрегаты считаются bincount'ом, без NumPy - те же файлы читаются в
+array.array и считаются циклом.
+
+Писатель у каталога один на процесс: воркеры многопроцессного режима пишут
+каждый в свой подкаталог (worker0, worker1, ...), номера карточек у них свои,
+а отчеты складывают агрегаты всех подкаталогов по (пул, карточка).
+
+Агрегаты для админ-панели:
+  - процент побед по карточкам пула ("какая профессия выигрывает");
+  - что раскрывают по выбору до первого голосования;
+  - карточки, с которыми чаще исключают (доля исключенных среди раскрывших
+    против средней).
+
+    python card_analytics.py [--dir data/card_analytics]       # отчет
+    python card_analytics.py --bench 1000000                   # скорость на синтетике
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import logging
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # те же файлы читаются в array.array
+    np = None
+
+from config import CARD_ANALYTICS_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# (пул карточек, поле персонажа, тип раскрываемой карточки)
+POOL_FIELDS = (
+    ('professions', 'profession', 'profession'),
+    ('biology', 'gender', 'biology'),
+    ('health_body', 'body_type', 'health'),
+    ('health_disease', 'disease', 'health'),
+    ('phobias', 'phobia', 'phobia'),
+    ('hobbies', 'hobby', 'hobby'),
+    ('facts', 'fact', 'fact'),
+    ('baggage', 'baggage', 'baggage'),
+)
+POOL_CODES = {pool: code for code, (pool, _, _) in enumerate(POOL_FIELDS)}
+POOL_TITLES = {
+    'professions': "Профессия", 'biology': "Пол", 'health_body': "Телосложение",
+    'health_disease': "Болезнь", 'phobias': "Фобия", 'hobbies': "Хобби", 'facts': "Факт", 'baggage': "Багаж",
+}
+CARD_TYPE_TITLES = {
+    'profession': "Профессия", 'biology': "Биология", 'health': "Здоровье", 'phobia': "Фобия",
+    'hobby': "Хобби", 'fact': "Факт", 'baggage': "Багаж",
+}
+
+# Колонка -> код array.array (little-endian на всех платформах бота)
+COLUMNS = (
+    ('game', 'I'),      # порядковый номер игры в хранилище
+    ('pool', 'B'),      # код пула (POOL_CODES)
+    ('card', 'i'),      # номер карточки в словаре
+    ('phase', 'b'),     # фаза раскрытия по очереди, 0 - не раскрыта или раскрыта спецкарточкой
+    ('revealed', 'B'),  # раскрыта к концу игры
+    ('early', 'B'),     # раскрыта по выбору (не в 1-й фазе) до первого голосования
+    ('winner', 'B'),
+    ('eliminated', 'B'),
+)
+NUMPY_TYPES = {'I': '<u4', 'B': 'u1', 'i': '<i4', 'b': 'i1'}
+
+
+def build_card_rows(game) -> List[tuple]:
+    """Строки (pool, (пул, карточка), phase, revealed, early, winner, eliminated) по завершенной игре"""
+    winners = set(game.winners)
+    eliminated = {user_id for _, user_id, _ in game.elimination_log}
+    phases = {(user_id, card_type): card_phase for user_id, card_type, card_phase, _ in game.reveal_log}
+
+    first_vote = None
+    if game.plan:
+        first_vote = next((card for kind, card in game.plan.steps if kind == 'voting'), None)
+
+    rows = []
+    for player in game.players.values():
+        character = player.character
+        if not character:
+            continue
+        for code, (pool, field, card_type) in enumerate(POOL_FIELDS):
+            value = getattr(character, field, None)
+            if not value:
+                continue
+            phase = phases.get((player.user_id, card_type)) or 0
+            rows.append((
+                code, (pool, str(value)), phase,
+                1 if character.revealed_cards.get(card_type, False) else 0,
+                1 if first_vote and 1 < phase <= first_vote else 0,
+                1 if player.user_id in winners else 0,
+                1 if player.user_id in eliminated else 0,
+            ))
+    return rows
+
+
+class _CardColumns:
+    """Колонки одного писателя: словарь карточек и файлы фиксированной ширины.
+
+    Писатель при открытии чинит хвосты после сбоя и дописывает. Читатель
+    (read_only) файлы не трогает: refresh() берет целые строки, которые уже
+    записаны во все колонки, и новые строки словаря."""
+
+    def __init__(self, directory: str, read_only: bool = False):
+        self.directory = directory
+        self.read_only = read_only
+        self._lock = threading.Lock()
+
+        self._cards: List[Tuple[str, str]] = []
+        self._card_ids: Dict[Tuple[str, str], int] = {}
+        self._dictionary_offset = 0
+        self._arrays: Dict[str, object] = {}
+        self._mapped_rows = -1
+        self.rows = 0
+        self.games = 0
+
+        if read_only:
+            self.refresh()
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._load_dictionary()
+        self.rows = self._count_rows(repair=True)
+        if self.rows:
+            self.games = int(self._read_last('game')) + 1
+
+    def _column_file(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.col")
+
+    def _load_dictionary(self):
+        path = os.path.join(self.directory, 'cards.jsonl')
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+' if not self.read_only else 'rb') as f:
+            f.seek(self._dictionary_offset)
+            complete = self._dictionary_offset
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    pool, value = json.loads(line)
+                except ValueError:
+                    break
+                self._card_ids[(pool, value)] = len(self._cards)
+                self._cards.append((pool, value))
+                complete += len(line)
+            self._dictionary_offset = complete
+            # Недописанная после сбоя строка отрезается, иначе следующая запись склеится с ней
+            if not self.read_only:
+                f.truncate(complete)
+
+    def _count_rows(self, repair: bool = False) -> int:
+        """Число целых строк; при repair колонки, дописанные сбоем длиннее других, обрезаются"""
+        counts = []
+        for name, typecode in COLUMNS:
+            path = self._column_file(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // array(typecode).itemsize)
+        rows = min(counts)
+        if repair:
+            for (name, typecode), count in zip(COLUMNS, counts):
+                path = self._column_file(name)
+                if count > rows or not os.path.exists(path):
+                    with open(path, 'ab') as f:
+                        f.truncate(rows * array(typecode).itemsize)
+        return rows
+
+    def _read_last(self, name: str) -> int:
+        typecode = dict(COLUMNS)[name]
+        itemsize = array(typecode).itemsize
+        with open(self._column_file(name), 'rb') as f:
+            f.seek((self.rows - 1) * itemsize)
+            values = array(typecode)
+            values.frombytes(f.read(itemsize))
+        return values[0]
+
+    def refresh(self):
+        """Читатель: подхватывает строки, дописанные писателем другого процесса"""
+        with self._lock:
+            # Сначала строки, потом словарь: словарь пишется раньше колонок и покрывает их
+            rows = self._count_rows()
+            self._load_dictionary()
+            if rows != self.rows:
+                self.rows = rows
+                self.games = int(self._read_last('game')) + 1 if rows else 0
+
+    # --- запись ---
+
+    def append_rows(self, rows: List[tuple]):
+        """Дописывает одну игру: строки (pool, (пул, карточка), phase, revealed, early, winner, eliminated)"""
+        with self._lock:
+            new_cards = []
+            for row in rows:
+                if row[1] not in self._card_ids:
+                    self._card_ids[row[1]] = len(self._cards)
+                    self._cards.append(row[1])
+                    new_cards.append(row[1])
+            # Словарь пишется раньше колонок: лишние значения после сбоя безвредны
+            if new_cards:
+                with open(os.path.join(self.directory, 'cards.jsonl'), 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(card, ensure_ascii=False) + "\n" for card in new_cards)
+
+            # Без NumPy колонки в памяти дописываются вместе с файлами
+            in_sync = np is None and self._mapped_rows == self.rows
+            game = self.games
+            values = {
+                'game': [game] * len(rows),
+                'pool': [row[0] for row in rows],
+                'card': [self._card_ids[row[1]] for row in rows],
+                'phase': [row[2] for row in rows],
+                'revealed': [row[3] for row in rows],
+                'early': [row[4] for row in rows],
+                'winner': [row[5] for row in rows],
+                'eliminated': [row[6] for row in rows],
+            }
+            for name, typecode in COLUMNS:
+                column = array(typecode, values[name])
+                with open(self._column_file(name), 'ab') as f:
+                    column.tofile(f)
+                if in_sync:
+                    self._arrays[name].extend(column)
+
+            self.rows += len(rows)
+            self.games += 1
+            if in_sync:
+                self._mapped_rows = self.rows
+
+    # --- чтение ---
+
+    def _columns(self) -> Dict[str, object]:
+        """Колонки на текущее число строк (memmap или array.array)"""
+        if self._mapped_rows == self.rows:
+            return self._arrays
+
+        arrays = {}
+        for name, typecode in COLUMNS:
+            path = self._column_file(name)
+            if np is not None:
+                dtype = np.dtype(NUMPY_TYPES[typecode])
+                arrays[name] = (np.memmap(path, dtype=dtype, mode='r', shape=(self.rows,))
+                                if self.rows else np.zeros(0, dtype=dtype))
+            else:
+                column = array(typecode)
+                if self.rows:
+                    with open(path, 'rb') as f:
+                        column.fromfile(f, self.rows)
+                arrays[name] = column
+        self._arrays = arrays
+        self._mapped_rows = self.rows
+        return arrays
+
+    def _grouped(self, key: str, flag: str, size: int, **equals) -> Tuple[list, list]:
+        """По строкам, где column == value для всех equals: число строк и сумма flag по ключу"""
+        columns = self._columns()
+        if np is not None:
+            mask = np.ones(self.rows, dtype=bool)
+            for name, value in equals.items():
+                mask &= columns[name] == value
+            keys = columns[key][mask]
+            counts = np.bincount(keys, minlength=size)
+            sums = np.bincount(keys, weights=columns[flag][mask], minlength=size)
+            return counts.tolist(), sums.astype(np.int64).tolist()
+
+        counts, sums = [0] * size, [0] * size
+        pairs = zip(columns[key], columns[flag])
+        for name, value in equals.items():
+            pairs = itertools.compress(pairs, map(value.__eq__, columns[name]))
+        for card, flag_value in pairs:
+            counts[card] += 1
+            sums[card] += flag_value
+        return counts, sums
+
+    def card_totals(self, flag: str, **equals) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """(пул, карточка) -> (строк, сумма flag): номера карточек у каждого писателя свои"""
+        with self._lock:
+            counts, sums = self._grouped('card', flag, len(self._cards), **equals)
+            return {self._cards[card]: (count, sums[card]) for card, count in enumerate(counts) if count}
+
+    def pool_totals(self, flag: str) -> List[int]:
+        """Сумма flag по кодам пулов"""
+        with self._lock:
+            return self._grouped('pool', flag, len(POOL_FIELDS))[1]
+
+    def close(self):
+        with self._lock:
+            self._arrays = {}
+            self._mapped_rows = -1
+
+
+class CardAnalyticsStore:
+    """Колоночное хранилище событий по карточкам с агрегатами.
+
+    Писатель в каталоге один на процесс: в многопроцессном режиме воркер
+    пишет в свой подкаталог (part), а агрегаты складываются по всем
+    подкаталогам и корню, чужие колонки открываются только на чтение."""
+
+    def __init__(self, directory: str, part: Optional[str] = None):
+        self.directory = directory
+        self._writer = _CardColumns(os.path.join(directory, part) if part else directory)
+        self._readers: Dict[str, _CardColumns] = {}
+        self._lock = threading.Lock()
+        self.backend = 'numpy' if np is not None else 'python'
+        self.last_query_ms = 0.0
+
+    def _parts(self) -> List[_CardColumns]:
+        """Свои колонки и колонки других писателей (новые подкаталоги подхватываются на лету)"""
+        with self._lock:
+            candidates = [self.directory] + sorted(
+                entry.path for entry in os.scandir(self.directory) if entry.is_dir())
+            for path in candidates:
+                if (path in self._readers or os.path.abspath(path) == os.path.abspath(self._writer.directory)
+                        or not os.path.exists(os.path.join(path, 'game.col'))):
+                    continue
+                self._readers[path] = _CardColumns(path, read_only=True)
+            readers = list(self._readers.values())
+
+        for reader in readers:
+            reader.refresh()
+        return [self._writer] + readers
+
+    @property
+    def games(self) -> int:
+        return sum(part.games for part in self._parts())
+
+    @property
+    def rows(self) -> int:
+        return sum(part.rows for part in self._parts())
+
+    # --- запись ---
+
+    def record_game(self, game):
+        """Дописывает строки завершенной игры"""
+        try:
+            rows = build_card_rows(game)
+            if rows:
+                self.append_rows(rows)
+        except Exception as e:
+            logger.error(f"Ошибка записи аналитики карточек для чата {game.chat_id}: {e}")
+
+    def append_rows(self, rows: List[tuple]):
+        """Дописывает одну игру: строки (pool, (пул, карточка), phase, revealed, early, winner, eliminated)"""
+        self._writer.append_rows(rows)
+
+    # --- чтение ---
+
+    def _card_totals(self, flag: str, **equals) -> Dict[Tuple[str, str], List[int]]:
+        totals: Dict[Tuple[str, str], List[int]] = {}
+        for part in self._parts():
+            for card, (count, value) in part.card_totals(flag, **equals).items():
+                total = totals.setdefault(card, [0, 0])
+                total[0] += count
+                total[1] += value
+        return totals
+
+    def win_rates(self, pool: str = 'professions', min_count: int = 1) -> List[tuple]:
+        """Процент побед владельцев карточек пула: (карточка, выдана раз, процент), лучшие первыми"""
+        started = time.perf_counter()
+        totals = self._card_totals('winner', pool=POOL_CODES[pool])
+        self.last_query_ms = (time.perf_counter() - started) * 1000
+        result = [
+            (value, count, wins / count)
+            for (_, value), (count, wins) in totals.items() if count >= max(1, min_count)
+        ]
+        return sorted(result, key=lambda item: (-item[2], -item[1]))
+
+    def early_reveals(self) -> List[tuple]:
+        """Что раскрывают по выбору до первого голосования: (тип карточки, раскрытий, доля)"""
+        started = time.perf_counter()
+        early = [sum(values) for values in zip(*(part.pool_totals('early') for part in self._parts()))]
+        self.last_query_ms = (time.perf_counter() - started) * 1000
+
+        # Здоровье - две карточки пула на одно раскрытие, считаем один раз
+        by_type: Dict[str, int] = {}
+        for (_, _, card_type), count in zip(POOL_FIELDS, early):
+            by_type.setdefault(card_type, count)
+        total = sum(by_type.values())
+        return sorted(((card_type, count, count / total) for card_type, count in by_type.items() if count),
+                      key=lambda item: -item[1])
+
+    def elimination_lift(self, min_count: int = 20, limit: int = 5) -> List[tuple]:
+        """Раскрытые карточки, с которыми исключают чаще среднего:
+        (пул, карточка, раскрыта раз, доля исключенных, во сколько раз выше средней)"""
+        started = time.perf_counter()
+        totals = self._card_totals('eliminated', revealed=1)
+        self.last_query_ms = (time.perf_counter() - started) * 1000
+
+        total = sum(count for count, _ in totals.values())
+        base = sum(eliminated for _, eliminated in totals.values()) / total if total else 0.0
+        if not base:
+            return []
+        result = [
+            card + (count, eliminated / count, eliminated / count / base)
+            for card, (count, eliminated) in totals.items() if count >= max(1, min_count)
+        ]
+        return sorted(result, key=lambda item: (-item[4], -item[2]))[:limit]
+
+    def get_stats(self) -> Dict[str, object]:
+        parts = self._parts()
+        cards = set()
+        for part in parts:
+            cards.update(part._cards)
+        return {
+            'games': sum(part.games for part in parts), 'rows': sum(part.rows for part in parts),
+            'cards': len(cards), 'parts': len(parts), 'backend': self.backend,
+        }
+
+    def close(self):
+        with self._lock:
+            readers = list(self._readers.values())
+        for part in [self._writer] + readers:
+            part.close()
+
+
+def _fill_synthetic(store: CardAnalyticsStore, rows_wanted: int, players: int = 8):
+    """Синтетические игры: карточка влияет на исход, чтобы агрегатам было что показать"""
+    rng = random.Random(1)
+    pools = {pool: [f"{pool}-{number}" for number in range(20)] for pool, _, _ in POOL_FIELDS}
+    written = 0
+    while written < rows_wanted:
+        rows = []
+        for seat in range(players):
+            hand = {pool: rng.choice(cards) for pool, cards in pools.items()}
+            eliminated = rng.random() < 0.3 + 0.02 * int(hand['phobias'].rsplit('-', 1)[1]) / 2
+            winner = not eliminated and rng.random() < 0.7
+            for code, (pool, _, _) in enumerate(POOL_FIELDS):
+                phase = rng.randint(1, 7) if rng.random() < 0.8 else 0
+                rows.append((code, (pool, hand[pool]), phase, 1 if phase else 0,
+                             1 if 1 < phase <= 2 else 0, int(winner), int(eliminated)))
+        store.append_rows(rows)
+        written += len(rows)
+
+
+def _print_report(store: CardAnalyticsStore):
+    stats = store.get_stats()
+    print(f"📈 {stats['games']} игр, {stats['rows']} строк, {stats['cards']} карточек, "
+          f"писателей {stats['parts']}, {stats['backend']}")
+
+    started = time.perf_counter()
+    rates = store.win_rates('professions')
+    print(f"\n🏆 Процент побед по профессиям ({store.last_query_ms:.1f} мс):")
+    for value, count, rate in rates[:5]:
+        print(f"  {value}: {rate:.0%} ({count})")
+
+    early = store.early_reveals()
+    print(f"\n👀 До первого голосования раскрывают ({store.last_query_ms:.1f} мс):")
+    for card_type, count, share in early:
+        print(f"  {card_type}: {share:.0%} ({count})")
+
+    lift = store.elimination_lift()
+    print(f"\n💀 С этими карточками чаще исключают ({store.last_query_ms:.1f} мс):")
+    for pool, value, count, rate, ratio in lift:
+        print(f"  {pool} / {value}: {rate:.0%} исключены, x{ratio:.2f} ({count})")
+    print(f"\n⏱ Все отчеты: {(time.perf_counter() - started) * 1000:.1f} мс")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Аналитика пулов карточек по истории игр")
+    parser.add_argument('--dir', default=CARD_ANALYTICS_SETTINGS['DIR'], help="каталог колонок")
+    parser.add_argument('--bench', type=int, default=0, help="строк синтетики во временном каталоге")
+    args = parser.parse_args(argv)
+
+    if not args.bench:
+        _print_report(CardAnalyticsStore(args.dir))
+        return 0
+
+    directory = tempfile.mkdtemp(prefix='card_analytics_')
+    try:
+        started = time.perf_counter()
+        _fill_synthetic(CardAnalyticsStore(directory), args.bench)
+        print(f"Запись: {time.perf_counter() - started:.1f} с", file=sys.stderr)
+        # Чтение - с нуля, как после рестарта бота
+        _print_report(CardAnalyticsStore(directory))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+# card_snapshot.py
+"""Снимок пулов карточек для быстрого старта.
+
+При старте карточки собираются из хранилища (по файлу на категорию), нормализуются
+(веса - кортежи (карточка, вес)) и для взвешенных категорий строятся таблицы
+псевдонимов (alias method Уолкера: выбор за O(1) вместо прохода по весам).
+Результат сохраняется одним файлом marshal вместе с отпечатком источников
+(mtime и размер файлов категорий, хеш встроенных карточек по умолчанию).
+Следующий старт с тем же отпечатком читает только этот файл.
+"""
+import hashlib
+import json
+import marshal
+import os
+import sys
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Категории, где карточки выпадают с весами
+WEIGHTED_CATEGORIES = ('biology', 'health_body', 'health_disease')
+
+# (карточки, вероятности, псевдонимы)
+AliasTable = Tuple[tuple, tuple, tuple]
+
+
+def normalize_weighted(cards: list) -> List[Tuple[str, int]]:
+    """Приводит взвешенную категорию к списку кортежей (из JSON приходят списки,
+    добавленные через админку карточки - строки без веса)"""
+    normalized = []
+    for card in cards:
+        if isinstance(card, str):
+            normalized.append((card, 1))
+        else:
+            normalized.append((card[0], int(card[1])))
+    return normalized
+
+
+def normalize_cards(cards_data: Dict[str, list]) -> Dict[str, list]:
+    """Нормализует пулы карточек на месте и возвращает их"""
+    for category in WEIGHTED_CATEGORIES:
+        if category in cards_data:
+            cards_data[category] = normalize_weighted(cards_data[category])
+    return cards_data
+
+
+def build_alias_table(choices: List[Tuple[str, int]]) -> Optional[AliasTable]:
+    """Строит таблицу псевдонимов для взвешенного выбора (метод Возе)"""
+    choices = [(card, weight) for card, weight in choices if weight > 0]
+    if not choices:
+        return None
+
+    count = len(choices)
+    total = sum(weight for _, weight in choices)
+    scaled = [weight * count / total for _, weight in choices]
+    prob = [1.0] * count
+    alias = list(range(count))
+
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    # Остатки из-за погрешности округления выпадают всегда сами
+    return tuple(card for card, _ in choices), tuple(prob), tuple(alias)
+
+
+def build_alias_tables(cards_data: Dict[str, list]) -> Dict[str, AliasTable]:
+    """Таблицы псевдонимов для всех взвешенных категорий"""
+    tables = {}
+    for category in WEIGHTED_CATEGORIES:
+        table = build_alias_table(cards_data.get(category) or [])
+        if table:
+            tables[category] = table
+    return tables
+
+
+def defaults_digest(default_cards: dict) -> str:
+    """Хеш встроенных карточек по умолчанию (меняются вместе с кодом).
+
+    Не через marshal: его вывод зависит от счетчиков ссылок на объекты.
+    """
+    return hashlib.sha1(json.dumps(default_cards, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class CardSnapshot:
+    """Файл снимка карточек"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def make_key(sources, digest: str) -> tuple:
+        # marshal между версиями Python несовместим - версия входит в ключ
+        return (SNAPSHOT_VERSION, sys.version_info[:2], digest, tuple(sources))
+
+    def load(self, key: tuple) -> Optional[Tuple[Dict[str, list], Dict[str, AliasTable]]]:
+        """Читает снимок, если его ключ совпадает с ключом источников"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = marshal.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Снимок карточек поврежден, будет пересобран: {e}")
+            return None
+
+        if not isinstance(data, dict) or data.get('key') != key:
+            return None
+        return data['cards'], data['aliases']
+
+    def save(self, key: tuple, cards_data: Dict[str, list], alias_tables: Dict[str, AliasTable]):
+        """Атомарно записывает снимок (несколько процессов могут писать одновременно)"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                marshal.dump({'key': key, 'cards': cards_data, 'aliases': alias_tables}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Ошибка записи снимка карточек: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,231 @@
+# cluster.py
+"""Владение играми между несколькими узлами через аренды (lease) по chat_id.
+
+Игру ведет только узел, который держит ее аренду. Аренды продлеваются фоновым
+потоком; если продлить не удалось (аренду перехватил другой узел или хранилище
+недоступно), узел сразу перестает вести игру. Узел, взявший аренду, поднимает
+игру из общего хранилища состояния.
+
+SQLiteLeaseBackend - локальная замена внешнему сервису аренд (общий файл базы
+для нескольких процессов на одной машине и для тестов).
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def default_node_id() -> str:
+    """Идентификатор узла по умолчанию: хост и PID"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseBackend:
+    """Интерфейс хранилища аренд"""
+
+    def acquire(self, chat_id: int, node_id: str, ttl: float) -> bool:
+        """Берет аренду, если она свободна, просрочена или уже наша"""
+        raise NotImplementedError
+
+    def renew(self, chat_id: int, node_id: str, ttl: float) -> bool:
+        """Продлевает аренду, только если она все еще наша"""
+        raise NotImplementedError
+
+    def release(self, chat_id: int, node_id: str):
+        raise NotImplementedError
+
+    def owner(self, chat_id: int) -> Optional[Tuple[str, float]]:
+        """Текущий владелец аренды и момент ее истечения"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryLeaseBackend(LeaseBackend):
+    """Аренды в памяти процесса (один узел, тесты)"""
+
+    def __init__(self):
+        self._leases: Dict[int, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, chat_id: int, node_id: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(chat_id)
+            if current and current[0] != node_id and current[1] > now:
+                return False
+            self._leases[chat_id] = (node_id, now + ttl)
+            return True
+
+    def renew(self, chat_id: int, node_id: str, ttl: float) -> bool:
+        with self._lock:
+            current = self._leases.get(chat_id)
+            if not current or current[0] != node_id:
+                return False
+            self._leases[chat_id] = (node_id, time.time() + ttl)
+            return True
+
+    def release(self, chat_id: int, node_id: str):
+        with self._lock:
+            current = self._leases.get(chat_id)
+            if current and current[0] == node_id:
+                del self._leases[chat_id]
+
+    def owner(self, chat_id: int) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            return self._leases.get(chat_id)
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """Аренды в общей базе SQLite (WAL)"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS leases (
+        chat_id INTEGER PRIMARY KEY,
+        node_id TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    """
+
+    SQL_ACQUIRE = ("INSERT INTO leases (chat_id, node_id, expires_at) VALUES (?, ?, ?) "
+                   "ON CONFLICT(chat_id) DO UPDATE SET node_id = excluded.node_id, expires_at = excluded.expires_at "
+                   "WHERE leases.node_id = excluded.node_id OR leases.expires_at < ?")
+    SQL_RENEW = "UPDATE leases SET expires_at = ? WHERE chat_id = ? AND node_id = ?"
+    SQL_RELEASE = "DELETE FROM leases WHERE chat_id = ? AND node_id = ?"
+    SQL_OWNER = "SELECT node_id, expires_at FROM leases WHERE chat_id = ?"
+
+    def __init__(self, db_file: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    def acquire(self, chat_id: int, node_id: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(self.SQL_ACQUIRE, (chat_id, node_id, now + ttl, now))
+            return cursor.rowcount == 1
+
+    def renew(self, chat_id: int, node_id: str, ttl: float) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(self.SQL_RENEW, (time.time() + ttl, chat_id, node_id))
+            return cursor.rowcount == 1
+
+    def release(self, chat_id: int, node_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(self.SQL_RELEASE, (chat_id, node_id))
+
+    def owner(self, chat_id: int) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(self.SQL_OWNER, (chat_id,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseKeeper:
+    """Держит аренды игр этого узла и продлевает их в фоне"""
+
+    def __init__(self, backend: LeaseBackend, node_id: str, ttl: float = 30,
+                 on_lost: Callable[[int], None] = None, on_renewed: Callable[[int], None] = None):
+        self.backend = backend
+        self.node_id = node_id
+        self.ttl = ttl
+        self.on_lost = on_lost
+        self.on_renewed = on_renewed
+
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._renew_loop, name="lease-keeper", daemon=True)
+        self._thread.start()
+
+    def holds(self, chat_id: int) -> bool:
+        with self._lock:
+            return chat_id in self._held
+
+    def foreign_owner(self, chat_id: int) -> Optional[Tuple[str, float]]:
+        """Действующая аренда другого узла (владелец и момент истечения) или None"""
+        try:
+            owner = self.backend.owner(chat_id)
+        except Exception as e:
+            logger.error(f"Ошибка чтения аренды чата {chat_id}: {e}")
+            return None
+
+        if owner and owner[0] != self.node_id and owner[1] > time.time():
+            return owner
+        return None
+
+    def acquire(self, chat_id: int) -> bool:
+        """Берет аренду игры"""
+        try:
+            acquired = self.backend.acquire(chat_id, self.node_id, self.ttl)
+        except Exception as e:
+            logger.error(f"Ошибка получения аренды чата {chat_id}: {e}")
+            return False
+
+        if acquired:
+            with self._lock:
+                self._held.add(chat_id)
+        return acquired
+
+    def release(self, chat_id: int):
+        """Отпускает аренду игры"""
+        with self._lock:
+            self._held.discard(chat_id)
+        try:
+            self.backend.release(chat_id, self.node_id)
+        except Exception as e:
+            logger.error(f"Ошибка освобождения аренды чата {chat_id}: {e}")
+
+    def _renew_loop(self):
+        while not self._stop_event.wait(self.ttl / 3):
+            with self._lock:
+                held = list(self._held)
+
+            for chat_id in held:
+                try:
+                    renewed = self.backend.renew(chat_id, self.node_id, self.ttl)
+                except Exception as e:
+                    logger.error(f"Ошибка продления аренды чата {chat_id}: {e}")
+                    renewed = False
+
+                if renewed:
+                    if self.on_renewed:
+                        self.on_renewed(chat_id)
+                    continue
+
+                with self._lock:
+                    self._held.discard(chat_id)
+                logger.warning(f"Аренда чата {chat_id} потеряна узлом {self.node_id}")
+                if self.on_lost:
+                    self.on_lost(chat_id)
+
+    def close(self):
+        """Останавливает продление и отпускает все аренды"""
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+        with self._lock:
+            held = list(self._held)
+        for chat_id in held:
+            self.release(chat_id)
+        self.backend.close()
+
+
+def create_lease_backend(backend: str, db_file: str) -> LeaseBackend:
+    """Создает хранилище аренд по имени"""
+    if backend == 'memory':
+        return MemoryLeaseBackend()
+    if backend == 'sqlite':
+        return SQLiteLeaseBackend(db_file)
+
+    raise ValueError(f"Неизвестное хранилище аренд: {backend}")
@@ -7,6 +7,9 @@ BOT_TOKEN = os.getenv('BOT_TOKEN', '8317600716:AAED6tDCQ2O9WGmJrwG8mWc0BIS_km21l
 # ID администраторов бота (можно несколько через запятую)
 ADMIN_IDS = [int(x.strip()) for x in os.getenv('ADMIN_IDS', '6156642056').split(',') if x.strip()]
 
+# Username бота для ссылок перехода в ЛС (без @)
+BOT_USERNAME = os.getenv('BOT_USERNAME', 'bunker_nnkf_bot')
+
 # ID группы для кнопки возврата (оставьте пустым, чтобы отключить)
 GROUP_CHAT_ID = int(os.getenv('GROUP_CHAT_ID', '-1002924425942')) if os.getenv('GROUP_CHAT_ID', '0') != '0' else None
 
@@ -39,15 +42,129 @@ GAME_SETTINGS = {
     'RESULTS_TIME': 60,
     'CARD_REVEAL_TIME': 60,
     'TURN_TIMEOUT': 60,  # НОВОЕ: время на ход для раскрытия карты
+    'RULE_SET': os.getenv('RULE_SET', 'classic'),  # Набор правил расписания голосований (game_plan.RULE_SETS)
+    'PHASE_HOP': 5,  # Пауза перед следующей фазой, если в чат еще досылаются сообщения (сек)
+    'LOBBY_UPDATE_DELAY': float(os.getenv('LOBBY_UPDATE_DELAY', '1.5')),  # Окно сведения правок лобби (сек)
+    'BOARD_MODE': os.getenv('BOARD_MODE', '0') == '1',  # Ход игры на табло в закрепе, а не новыми сообщениями
+    'BOARD_EDIT_INTERVAL': float(os.getenv('BOARD_EDIT_INTERVAL', '3')),  # Не чаще одной правки табло (сек)
     'SPECIAL_CARD_CHANCE': 0.2,
     'CARDS_TO_REVEAL': [1, 2, 3, 4, 5, 6, 7],
 }
 
+# Размер кэша готовых клавиатур (количество сериализованных клавиатур)
+KEYBOARD_CACHE_SIZE = int(os.getenv('KEYBOARD_CACHE_SIZE', '1024'))
+
 # Пути к файлам
 DATA_DIR = 'data'
 CARDS_DIR = os.path.join(DATA_DIR, 'cards')
 PLAYER_CARDS_DIR = os.path.join(DATA_DIR, 'player_cards')  # НОВОЕ
 
+# Состояния пользователей (ввод карточек админом и т.п.)
+USER_STATE_SETTINGS = {
+    'TTL': int(os.getenv('USER_STATE_TTL', '900')),  # Время жизни состояния (сек)
+    'MAX_SIZE': int(os.getenv('USER_STATE_MAX_SIZE', '10000')),  # Максимум записей (LRU)
+    'SWEEP_INTERVAL': int(os.getenv('USER_STATE_SWEEP_INTERVAL', '60')),  # Период фоновой очистки (сек)
+    # Файл для сохранения между перезапусками (пусто - не сохранять)
+    'PERSIST_FILE': os.getenv('USER_STATE_FILE', '') or None,
+}
+
+# Сколько сводок завершенных игр держать в памяти
+GAME_ARCHIVE_SIZE = int(os.getenv('GAME_ARCHIVE_SIZE', '100'))
+
+# Хранилище карточек и состояния игр: json, memory или sqlite
+STORAGE_SETTINGS = {
+    'BACKEND': os.getenv('STORAGE_BACKEND', 'json'),
+    'SQLITE_FILE': os.getenv('STORAGE_SQLITE_FILE', os.path.join(DATA_DIR, 'bunker.db')),
+}
+
+# Многопроцессный режим: число воркеров (0 или 1 - один процесс)
+SHARDING_SETTINGS = {
+    'WORKERS': int(os.getenv('SHARD_WORKERS', '0')),
+    'QUEUE_SIZE': int(os.getenv('SHARD_QUEUE_SIZE', '1000')),  # Очередь обновлений воркера
+    'RESTART_DELAY': float(os.getenv('SHARD_RESTART_DELAY', '5')),  # Пауза перед перезапуском упавшего воркера (сек)
+}
+
+# Несколько узлов: владение играми через аренды по chat_id.
+# Состояние игр должно лежать в общем хранилище (STORAGE_BACKEND=sqlite с общим файлом)
+CLUSTER_SETTINGS = {
+    'ENABLED': os.getenv('CLUSTER_ENABLED', '0') == '1',
+    'NODE_ID': os.getenv('NODE_ID', ''),  # Пусто - имя хоста и PID
+    'LEASE_BACKEND': os.getenv('LEASE_BACKEND', 'sqlite'),  # sqlite или memory
+    'LEASE_DB_FILE': os.getenv('LEASE_DB_FILE', os.path.join(DATA_DIR, 'leases.db')),
+    'LEASE_TTL': float(os.getenv('LEASE_TTL', '30')),  # Срок аренды (сек), продление каждые TTL/3
+    'TAKEOVER_MISS_TTL': float(os.getenv('TAKEOVER_MISS_TTL', '5')),  # Сколько помнить чаты без игры или с чужой арендой (сек)
+}
+
+# Трассировка обработки обновлений
+TRACING_SETTINGS = {
+    'ENABLED': os.getenv('TRACING_ENABLED', '1') == '1',
+    'SLOW_MS': float(os.getenv('TRACING_SLOW_MS', '1500')),  # Порог записи медленной трассы в лог
+    'KEEP': int(os.getenv('TRACING_KEEP', '20')),  # Сколько самых медленных трасс хранить для /traces
+}
+
+# История завершенных игр (SQLite)
+HISTORY_SETTINGS = {
+    'ENABLED': os.getenv('HISTORY_ENABLED', '1') == '1',
+    'DB_FILE': os.getenv('HISTORY_DB_FILE', os.path.join(DATA_DIR, 'history.db')),
+    'BATCH_SIZE': int(os.getenv('HISTORY_BATCH_SIZE', '50')),  # Игр в одной транзакции
+    'FLUSH_INTERVAL': float(os.getenv('HISTORY_FLUSH_INTERVAL', '2')),  # Ожидание новых игр (сек)
+}
+
+# Аналитика пулов карточек: колонки событий по завершенным играм
+CARD_ANALYTICS_SETTINGS = {
+    'ENABLED': os.getenv('CARD_ANALYTICS_ENABLED', '1') == '1',
+    'DIR': os.getenv('CARD_ANALYTICS_DIR', os.path.join(DATA_DIR, 'card_analytics')),
+    'MIN_SAMPLES': int(os.getenv('CARD_ANALYTICS_MIN_SAMPLES', '20')),  # Реже выданные карточки не ранжируются
+}
+
+# Снимок карточек для быстрого старта (пересобирается при изменении файлов карточек)
+CARD_SNAPSHOT_SETTINGS = {
+    'ENABLED': os.getenv('CARD_SNAPSHOT_ENABLED', '1') == '1',
+    'FILE': os.getenv('CARD_SNAPSHOT_FILE', os.path.join(DATA_DIR, 'cards_snapshot.bin')),
+}
+
+# HTTP-клиент Bot API
+HTTP_SETTINGS = {
+    'POOL_SIZE': int(os.getenv('HTTP_POOL_SIZE', '0')),  # 0 - потоки бота, колбэков и рассылки + 4
+    'CONNECT_TIMEOUT': float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+    'SEND_TIMEOUT': float(os.getenv('HTTP_SEND_TIMEOUT', '15')),  # Чтение ответа обычных методов
+    'UPLOAD_TIMEOUT': float(os.getenv('HTTP_UPLOAD_TIMEOUT', '60')),  # Чтение ответа при загрузке файлов
+    'MAX_RETRIES': int(os.getenv('HTTP_MAX_RETRIES', '3')),
+    'BACKOFF': float(os.getenv('HTTP_BACKOFF', '0.5')),  # База экспоненциальной задержки (сек)
+}
+
+# Конвейер колбэков: подтверждение нажатия сразу, работа в отдельном пуле
+CALLBACK_SETTINGS = {
+    'WORKERS': int(os.getenv('CALLBACK_WORKERS', '8')),
+    'ACK_WAIT': float(os.getenv('CALLBACK_ACK_WAIT', '0.3')),  # Сколько ждать ответа обработчика (сек)
+}
+
+# Параллельная рассылка в ЛС игрокам
+FANOUT_SETTINGS = {
+    'MAX_WORKERS': int(os.getenv('FANOUT_WORKERS', '8')),  # Одновременных отправок
+    'RATE': float(os.getenv('FANOUT_RATE', '25')),  # Сообщений в секунду на процесс (лимит Telegram ~30)
+    'BURST': int(os.getenv('FANOUT_BURST', '16')),
+}
+
+# Кэш администраторов и участников чатов
+MEMBER_CACHE_SETTINGS = {
+    'TTL': float(os.getenv('MEMBER_CACHE_TTL', '60')),  # Срок ответа Telegram (сек)
+    'NEGATIVE_TTL': float(os.getenv('MEMBER_CACHE_NEGATIVE_TTL', '10')),  # Срок ошибки / "не найден"
+    'MAX_SIZE': int(os.getenv('MEMBER_CACHE_MAX_SIZE', '10000')),
+}
+
+# Пропуск правок сообщений без изменений
+EDIT_DEDUP_SETTINGS = {
+    'MAX_SIZE': int(os.getenv('EDIT_DEDUP_MAX_SIZE', '5000')),  # Сколько сообщений помнить
+}
+
+# Сэмплирующий профилировщик (/profile)
+PROFILER_SETTINGS = {
+    'INTERVAL': float(os.getenv('PROFILER_INTERVAL', '0.005')),  # Шаг сэмплирования (сек)
+    'MAX_SECONDS': int(os.getenv('PROFILER_MAX_SECONDS', '120')),  # Максимальная длительность
+    'TOP': int(os.getenv('PROFILER_TOP', '25')),  # Строк в таблице функций
+}
+
 # Создаем необходимые директории
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(CARDS_DIR, exist_ok=True)
@@ -55,7 +172,13 @@ os.makedirs(PLAYER_CARDS_DIR, exist_ok=True)  # НОВОЕ
 
 # Логирование
 LOGGING_CONFIG = {
-    'level': 'INFO',
+    'level': os.getenv('LOG_LEVEL', 'INFO'),
     'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    'file': 'bunker_bot.log'
+    'file': os.getenv('LOG_FILE', 'bunker_bot.log'),
+    'json': os.getenv('LOG_JSON', '1') == '1',  # JSON-строки в файле (в консоли - обычный формат)
+    'rotation': os.getenv('LOG_ROTATION', 'size'),  # size или time
+    'max_bytes': int(os.getenv('LOG_MAX_BYTES', str(5 * 1024 * 1024))),  # Для rotation=size
+    'when': os.getenv('LOG_ROTATE_WHEN', 'midnight'),  # Для rotation=time
+    'backup_count': int(os.getenv('LOG_BACKUP_COUNT', '7')),
+    'compress': os.getenv('LOG_COMPRESS', '1') == '1',  # Сжимать старые части в .gz
 }
\ No newline at end of file
@@ -0,0 +1,99 @@
+# edit_dedup.py
+"""Пропуск правок сообщений, которые ничего не меняют.
+
+Меню, лобби и закреп часто перерисовываются тем же текстом: Telegram отвечает
+"message is not modified", но запрос уже потрачен и учтен в лимитах. Здесь
+запоминается хеш последних текста, клавиатуры и режима разметки для каждого
+(chat_id, message_id) в ограниченном LRU, и повторная правка тем же содержимым
+не отправляется.
+
+Если правки одного сообщения шли одновременно, порядок их применения неизвестен -
+такое сообщение не запоминается до следующей правки.
+"""
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Set, Tuple
+
+from config import EDIT_DEDUP_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+def edit_fingerprint(text: str, reply_markup=None, parse_mode=None, **kwargs) -> bytes:
+    """Хеш того, что видит пользователь после правки"""
+    if reply_markup is not None and hasattr(reply_markup, 'to_json'):
+        reply_markup = reply_markup.to_json()
+    options = sorted((key, str(value)) for key, value in kwargs.items() if value is not None)
+    payload = repr((text, reply_markup, parse_mode, options)).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class EditDeduplicator:
+    """LRU последних правок по (chat_id, message_id)"""
+
+    def __init__(self, max_size: int = 5000):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._in_flight: Dict[Tuple[int, int], int] = {}
+        self._contended: Set[Tuple[int, int]] = set()
+        self._lock = threading.Lock()
+
+        self.sent = 0
+        self.saved = 0
+
+    def edit(self, edit_func: Callable, text: str, chat_id: int, message_id: int, **kwargs):
+        """Вызывает edit_func(text, chat_id, message_id, **kwargs), если содержимое изменилось.
+
+        Пропущенная правка возвращает None, ошибки edit_func пробрасываются.
+        """
+        key = (chat_id, message_id)
+        fingerprint = edit_fingerprint(text, **kwargs)
+
+        with self._lock:
+            if key not in self._in_flight and self._items.get(key) == fingerprint:
+                self._items.move_to_end(key)
+                self.saved += 1
+                return None
+
+            # Пока правка в пути, содержимое сообщения неизвестно
+            self._items.pop(key, None)
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            if self._in_flight[key] > 1:
+                self._contended.add(key)
+            self.sent += 1
+
+        known = False
+        try:
+            result = edit_func(text, chat_id, message_id, **kwargs)
+            known = True
+            return result
+        except Exception as e:
+            known = "message is not modified" in str(e)
+            raise
+        finally:
+            with self._lock:
+                self._finish(key, fingerprint if known else None)
+
+    def _finish(self, key: Tuple[int, int], fingerprint):
+        remaining = self._in_flight.pop(key) - 1
+        if remaining:
+            self._in_flight[key] = remaining
+            return
+
+        if key in self._contended:
+            self._contended.discard(key)
+            return
+
+        if fingerprint is not None:
+            self._items[key] = fingerprint
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'size': len(self._items), 'sent': self.sent, 'saved': self.saved}
+
+
+edit_dedup = EditDeduplicator(EDIT_DEDUP_SETTINGS['MAX_SIZE'])
@@ -0,0 +1,104 @@
+# fanout.py
+"""Параллельная рассылка личных сообщений игрокам.
+
+Рассылка на 16 игроков по одному запросу подряд держит переход фазы N * RTT.
+fan_out отправляет пачку через общий ограниченный пул потоков, соблюдая общий
+для процесса лимит частоты рассылок (Telegram - около 30 сообщений в секунду),
+и возвращает результат по каждому получателю (включая 403 - бот заблокирован),
+чтобы запасной вариант (сообщение в группу) выполнялся только для неудачных.
+"""
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from telebot.apihelper import ApiTelegramException
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Токен-бакет: не больше rate запросов в секунду с запасом burst"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Ждет свободный токен"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Delivery:
+    """Результат отправки одному получателю"""
+
+    __slots__ = ('recipient', 'value', 'error')
+
+    def __init__(self, recipient: Hashable, value: Any = None, error: Optional[Exception] = None):
+        self.recipient = recipient
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def blocked(self) -> bool:
+        """Бот заблокирован пользователем или ЛС с ботом не начаты"""
+        return isinstance(self.error, ApiTelegramException) and self.error.error_code == 403
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_limiter: Optional[RateLimiter] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _limiter
+    with _executor_lock:
+        if _executor is None:
+            from config import FANOUT_SETTINGS
+            _executor = ThreadPoolExecutor(max_workers=FANOUT_SETTINGS['MAX_WORKERS'], thread_name_prefix="fanout")
+            _limiter = RateLimiter(FANOUT_SETTINGS['RATE'], FANOUT_SETTINGS['BURST'])
+        return _executor
+
+
+def _deliver(recipient: Hashable, send: Callable[[], Any]) -> Delivery:
+    _limiter.acquire()
+    try:
+        return Delivery(recipient, value=send())
+    except Exception as e:
+        return Delivery(recipient, error=e)
+
+
+def fan_out(jobs: Dict[Hashable, Callable[[], Any]]) -> Dict[Hashable, Delivery]:
+    """Выполняет отправки параллельно и возвращает результат по каждому получателю"""
+    if not jobs:
+        return {}
+
+    executor = _get_executor()
+    futures = {recipient: executor.submit(_deliver, recipient, send) for recipient, send in jobs.items()}
+    return {recipient: future.result() for recipient, future in futures.items()}
+
+
+def shutdown_fan_out():
+    """Дожидается начатых рассылок и останавливает пул"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Фаззер конечного автомата игры.
+
+Гоняет настоящий GameManager (пустой транспорт и виртуальные часы из simulate.py)
+на случайных последовательностях действий: входы и выходы в лобби, старт,
+раскрытия, голоса, воздержания, спецкарточки, срабатывания таймеров и сдвиги
+часов - в том числе не по очереди и не в свою фазу. После каждого действия
+проверяются инварианты (в том числе по журналу переходов: каждый шаг плана
+начинается один раз, каждый живой игрок ходит в фазе раскрытия один раз и по
+порядку мест), в конце игру доигрывают одни таймеры: дедлайны - верхняя
+граница любой фазы, и игра обязана завершиться без участия игроков.
+
+Скорость - около 140 прогонов в секунду на ядро (в среднем 75 действий на
+прогон, каждое - вызов настоящего GameManager с сохранением и проверкой
+инвариантов), до тысяч в секунду одно ядро не дотягивает; прогоны
+масштабируются процессами (--jobs).
+
+Падение - исключение, ошибка в логе движка, нарушение инварианта или зависшая
+игра. Последовательность действий падения сжимается до минимальной (удаляются
+куски и отдельные действия, пока падение повторяется) и печатается одной
+строкой JSON для воспроизведения:
+
+    python fuzz_engine.py [--games 2000] [--seed N] [--max-actions 300] [--players 8] [--jobs 4]
+    python fuzz_engine.py --replay '{"seed": 1, "actions": [["join", 2], ...]}'
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import random
+import re
+import sys
+import time
+import traceback
+from typing import List, Optional, Tuple
+
+from simulate import PHASE_CARDS, VirtualClock, VirtualScheduler, create_headless_manager
+
+CHAT_ID = -1000
+ADMIN_ID = 1
+MAX_DRAIN_STEPS = 2000
+
+# Карточки для раскрытия: по фазам и заведомо неверная
+CARD_TYPES = tuple(PHASE_CARDS.values()) + ('special',)
+
+
+class Failure:
+    """Падение: что сломалось, на каком действии и как его воспроизвести"""
+
+    def __init__(self, kind: str, check: str, message: str, seed: int, actions: List[tuple]):
+        self.kind = kind
+        self.check = check
+        self.message = message
+        self.seed = seed
+        self.actions = actions
+
+    @property
+    def signature(self) -> Tuple[str, str]:
+        """Одно и то же падение при сжатии (без чисел, которые зависят от порядка действий)"""
+        return self.kind, re.sub(r'-?\d+', '#', self.check)
+
+    def to_replay(self) -> str:
+        return json.dumps({'seed': self.seed, 'actions': [list(action) for action in self.actions]},
+                          ensure_ascii=False)
+
+    def format(self) -> str:
+        return (f"💥 {self.kind}: {self.message}\n"
+                f"   действий: {len(self.actions)}\n"
+                f"   воспроизвести: python fuzz_engine.py --replay '{self.to_replay()}'")
+
+
+class _ErrorCapture(logging.Handler):
+    """Собирает записи ERROR движка за время одного прогона"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+
+class EngineFuzzer:
+    """Прогоны GameManager на случайных и заданных последовательностях действий"""
+
+    def __init__(self, max_players: int = 8, max_actions: int = 300):
+        self.max_players = max_players
+        self.max_actions = max_actions
+        self.clock = VirtualClock()
+        self.manager = create_headless_manager(self.clock)
+        self.timers = [self.manager.phase_timer.timer, self.manager.notification_timer.timer]
+        self.scheduler = VirtualScheduler(self.clock, self.timers)
+        self.errors = _ErrorCapture()
+        logging.getLogger().addHandler(self.errors)
+
+        # Журнал переходов прогона: шаги плана, ожидаемые и сделанные ходы по фазам
+        self.steps = set()
+        self.expected_turns = {}
+        self.turns = {}
+        self.phase_ends = 0
+        self.violations: List[str] = []
+        self._watch_transitions()
+
+        self.cases = 0
+        self.actions_run = 0
+
+    def close(self):
+        logging.getLogger().removeHandler(self.errors)
+
+    # --- Прогон ---
+
+    def run_case(self, seed: int, actions: Optional[List[tuple]] = None,
+                 trace: bool = False) -> Optional[Failure]:
+        """Один прогон: actions=None - случайные действия из seed, иначе ровно заданные"""
+        from game_manager import GamePhase
+
+        self._reset()
+        random.seed(seed)  # случайность движка: персонажи, сценарий, спецкарточки
+        rng = random.Random(seed) if actions is None else None
+        played: List[tuple] = []
+
+        self.manager.create_game(CHAT_ID, ADMIN_ID)
+        game = self.manager.games[CHAT_ID]
+
+        steps = self.max_actions if actions is None else len(actions)
+        for index in range(steps):
+            if CHAT_ID not in self.manager.games:
+                break
+            action = self._generate(rng, game) if rng else tuple(actions[index])
+            played.append(action)
+            self.actions_run += 1
+
+            try:
+                result = self._apply(action)
+                problem = self._check_invariants(game, action, result)
+            except Exception:
+                return self._failure('exception', seed, played)
+
+            if trace:
+                print(f"{index + 1:4d}. {action} -> {result} [{game.phase.value}, t={self.clock.now:.0f}]")
+            if problem:
+                return Failure('invariant', problem, problem, seed, played)
+            if self.errors.records:
+                return self._log_failure(seed, played)
+
+        # Без игроков игру доводят дедлайны
+        try:
+            for _ in range(MAX_DRAIN_STEPS):
+                if CHAT_ID not in self.manager.games or game.phase == GamePhase.LOBBY:
+                    break
+                if not self.scheduler.run_next():
+                    break
+                problem = self._check_invariants(game, ('timer',), True)
+                if problem:
+                    return Failure('invariant', problem, f"{problem} (после действий игроков)", seed, played)
+        except Exception:
+            return self._failure('exception', seed, played)
+
+        if self.errors.records:
+            return self._log_failure(seed, played)
+        if CHAT_ID in self.manager.games and game.phase != GamePhase.LOBBY:
+            check = f"зависла в фазе {game.phase.value}"
+            return Failure('stuck', check, f"игра {check} без игроков", seed, played)
+        return None
+
+    def _reset(self):
+        """Чистит состояние после прошлого прогона"""
+        self.cases += 1
+        self.manager._cleanup_game(CHAT_ID)
+        for timer in self.timers:
+            timer.stop_all_timers()
+        self.manager.storage.delete_game_state(CHAT_ID)
+        self.errors.records.clear()
+        self.steps.clear()
+        self.expected_turns.clear()
+        self.turns.clear()
+        self.violations.clear()
+        # Настройка логов (setup_logging) снимает чужие обработчики с корня
+        root = logging.getLogger()
+        if self.errors not in root.handlers:
+            root.addHandler(self.errors)
+
+    def _failure(self, kind: str, seed: int, played: List[tuple]) -> Failure:
+        """Падение по текущему исключению: место - последний кадр в коде бота"""
+        frames = traceback.extract_tb(sys.exc_info()[2])
+        frame = frames[-1]
+        error = sys.exc_info()[1]
+        check = f"{type(error).__name__} {frame.filename.rsplit('/', 1)[-1]}:{frame.lineno}"
+        return Failure(kind, check, f"{type(error).__name__}: {error} ({check})", seed, played)
+
+    def _log_failure(self, seed: int, played: List[tuple]) -> Failure:
+        record = self.errors.records[0]
+        message = record.getMessage()
+        return Failure('log', f"{record.name}: {message}", f"ошибка в логе {record.name}: {message}", seed, played)
+
+    # --- Действия ---
+
+    def _apply(self, action: tuple):
+        manager = self.manager
+        kind, args = action[0], action[1:]
+
+        if kind == 'join':
+            return manager.join_game(CHAT_ID, args[0], f"fuzz{args[0]}", f"Игрок {args[0]}")
+        if kind == 'leave':
+            return manager.leave_game(CHAT_ID, args[0])
+        if kind == 'start':
+            return manager.start_game(CHAT_ID, args[0])
+        if kind == 'reveal':
+            return manager.reveal_card(CHAT_ID, args[0], args[1])
+        if kind == 'vote':
+            # Как BotHandlers._handle_vote: голос и проверка досрочного конца
+            voted = manager.vote_player(CHAT_ID, args[0], args[1])
+            if voted:
+                manager.check_voting_complete(CHAT_ID)
+            return voted
+        if kind == 'abstain':
+            abstained = manager.abstain_player(CHAT_ID, args[0])
+            if abstained:
+                manager.check_voting_complete(CHAT_ID)
+            return abstained
+        if kind == 'special':
+            return manager.use_special_card(CHAT_ID, args[0], args[1]).get('success', False)
+        if kind == 'timer':
+            return self.scheduler.run_next()
+        if kind == 'wait':
+            self.scheduler.advance_to(self.clock.now + args[0])
+            return True
+        raise ValueError(f"Неизвестное действие {action}")
+
+    def _generate(self, rng: random.Random, game) -> tuple:
+        """Следующее действие: в основном осмысленное для фазы, иногда - любое"""
+        from game_manager import GamePhase
+
+        seats = list(range(1, self.max_players + 1))
+        alive = [player.user_id for player in game.get_alive_players()]
+        roll = rng.random()
+
+        if game.phase == GamePhase.LOBBY:
+            if roll < 0.75:
+                return 'join', rng.choice(seats)
+            if roll < 0.8:
+                return 'leave', rng.choice(seats)
+            return 'start', ADMIN_ID if rng.random() < 0.9 else rng.choice(seats)
+
+        if roll < 0.1:
+            return 'timer',
+        if roll < 0.15:
+            return 'wait', rng.choice((1, 5, 30, 61))
+        if roll < 0.2:
+            return self._random_action(rng, seats)
+
+        if game.phase.value.startswith('card_reveal_') and game.current_turn_player_id:
+            if roll < 0.3:
+                return 'special', rng.choice(alive), rng.choice(seats)
+            user_id = game.current_turn_player_id
+            card = PHASE_CARDS[game.current_card_phase] if rng.random() < 0.7 else rng.choice(CARD_TYPES)
+            return 'reveal', user_id, card
+
+        if game.phase == GamePhase.VOTING and alive:
+            voter = rng.choice(alive)
+            if roll < 0.3:
+                return 'abstain', voter
+            candidates = [player.user_id for player in game.get_vote_candidates()] or alive
+            return 'vote', voter, rng.choice(candidates)
+
+        return 'timer',
+
+    def _random_action(self, rng: random.Random, seats: List[int]) -> tuple:
+        """Действие без оглядки на фазу и очередь"""
+        kind = rng.choice(('join', 'leave', 'start', 'reveal', 'vote', 'abstain', 'special'))
+        user_id = rng.choice(seats)
+        if kind == 'reveal':
+            return kind, user_id, rng.choice(CARD_TYPES)
+        if kind in ('vote', 'special'):
+            return kind, user_id, rng.choice(seats)
+        return kind, user_id
+
+    # --- Журнал переходов ---
+
+    def _watch_transitions(self):
+        """Оборачивает переходы менеджера: колбэки таймеров и вызовы внутри движка идут через обертки"""
+        manager = self.manager
+        start_card_phase = manager._start_card_reveal_phase
+        end_card_phase = manager._handle_card_phase_end
+        start_next_turn = manager._start_next_turn
+        start_voting = manager._start_voting_phase
+        start_results = manager._start_results_phase
+
+        def card_phase(chat_id, card_number):
+            game = manager.games.get(chat_id)
+            if game:
+                self._enter_step(('раскрытие', card_number))
+                card_type = PHASE_CARDS[card_number]
+                self.expected_turns[card_number] = {
+                    player.user_id for player in game.get_alive_players()
+                    if not player.character.revealed_cards.get(card_type, False)
+                    and not getattr(player, f'abstained_card_{card_type}', False)
+                }
+                self.turns[card_number] = []
+            return start_card_phase(chat_id, card_number)
+
+        def card_phase_end(chat_id, card_number):
+            game = manager.games.get(chat_id)
+            if game:
+                self.phase_ends += 1
+                self._enter_step(('конец раскрытия', card_number))
+                self._check_all_turns(game, card_number)
+            return end_card_phase(chat_id, card_number)
+
+        def next_turn(chat_id, card_number):
+            phase_ends = self.phase_ends
+            start_next_turn(chat_id, card_number)
+            # Ход выдан, если фаза не закончилась (иначе ходы следующей фазы пишет вложенный вызов)
+            game = manager.games.get(chat_id)
+            if (game and self.phase_ends == phase_ends and game.current_turn_player_id
+                    and game.phase.value == f"card_reveal_{card_number}"):
+                self._record_turn(game, card_number, game.current_turn_player_id)
+
+        def voting(chat_id):
+            game = manager.games.get(chat_id)
+            if game:
+                self._enter_step(('голосование', game.voting_round))
+            return start_voting(chat_id)
+
+        def results(chat_id):
+            game = manager.games.get(chat_id)
+            if game:
+                self._enter_step(('результаты', game.voting_round))
+            return start_results(chat_id)
+
+        manager._start_card_reveal_phase = card_phase
+        manager._handle_card_phase_end = card_phase_end
+        manager._start_next_turn = next_turn
+        manager._start_voting_phase = voting
+        manager._start_results_phase = results
+
+    def _enter_step(self, step: tuple):
+        if step in self.steps:
+            self.violations.append(f"шаг плана {step[0]} #{step[1]} начат повторно")
+        self.steps.add(step)
+
+    def _record_turn(self, game, card_number: int, user_id: int):
+        """Ход в фазе: один на игрока, по кругу в порядке мест от первого походившего"""
+        turns = self.turns.setdefault(card_number, [])
+        if user_id in turns:
+            self.violations.append(f"второй ход игрока {user_id} в фазе {card_number}")
+        turns.append(user_id)
+
+        order = [player.user_id for player in game.players_order]
+        if any(turn not in order for turn in turns):
+            self.violations.append(f"ход игрока вне очереди мест в фазе {card_number}")
+            return
+        positions = [(order.index(turn) - order.index(turns[0])) % len(order) for turn in turns]
+        if positions != sorted(set(positions)):
+            self.violations.append(f"ходы фазы {card_number} не по порядку мест")
+
+    def _check_all_turns(self, game, card_number: int):
+        """К концу фазы походили все, кто мог: ход пропускают только раскрывшие карточку или воздержавшиеся"""
+        card_type = PHASE_CARDS[card_number]
+        turned = set(self.turns.get(card_number, []))
+        for user_id in self.expected_turns.get(card_number, set()) - turned:
+            player = game.players.get(user_id)
+            if (player and player.is_alive and not player.character.revealed_cards.get(card_type, False)
+                    and not getattr(player, f'abstained_card_{card_type}', False)):
+                self.violations.append(f"игрок {user_id} остался без хода в фазе {card_number}")
+
+    # --- Инварианты ---
+
+    def _chat_timers(self) -> List[str]:
+        prefixes = (f"phase_{CHAT_ID}_", f"turn_{CHAT_ID}_")
+        return [timer_id for timer_id in self.manager.phase_timer.timer.timers if timer_id.startswith(prefixes)]
+
+    def _check_invariants(self, game, action: tuple, result) -> Optional[str]:
+        """Описание нарушения или None"""
+        from game_manager import GamePhase
+
+        if self.violations:
+            return self.violations[0]
+
+        if CHAT_ID not in self.manager.games:
+            if game.phase != GamePhase.FINISHED and game.phase != GamePhase.LOBBY:
+                return f"игра удалена в фазе {game.phase.value}"
+            if self._chat_timers():
+                return f"таймеры пережили игру: {', '.join(sorted(self._chat_timers()))}"
+            if game.phase == GamePhase.FINISHED and sorted(game.winners) != sorted(
+                    player.user_id for player in game.get_alive_players()):
+                return "победители не совпадают с живыми"
+            return None
+
+        if self.manager.games[CHAT_ID] is not game:
+            return "объект игры подменен"
+        if game.phase == GamePhase.LOBBY:
+            return None
+
+        alive = game.get_alive_players()
+        if not alive:
+            return "не осталось живых игроков"
+        if len(set(game.eliminated_players)) != len(game.eliminated_players):
+            return "игрок исключен дважды"
+        for user_id in game.eliminated_players:
+            if user_id not in game.players or game.players[user_id].is_alive:
+                return "исключенный игрок жив или пропал из игры"
+
+        # Живость: что-то должно продвинуть игру без участия игроков
+        if not self._chat_timers():
+            return f"в фазе {game.phase.value} нет ни одного таймера"
+
+        plan = game.plan
+        if plan and game.get_planned_votes() > plan.total_votes:
+            return "голосований больше, чем в плане"
+
+        if game.phase.value.startswith('card_reveal_'):
+            if game.phase.value != f"card_reveal_{game.current_card_phase}":
+                return f"фаза {game.phase.value} не совпадает с current_card_phase"
+            turn = game.current_turn_player_id
+            if turn is not None and (turn not in game.players or not game.players[turn].is_alive):
+                return "ход у выбывшего игрока"
+
+        if game.phase == GamePhase.VOTING:
+            for player in alive:
+                target = player.vote_target
+                if target is None:
+                    continue
+                if target == player.user_id or target not in game.players or not game.players[target].is_alive:
+                    return "голос против себя или выбывшего"
+                if game.is_revoting and target not in game.revote_candidates:
+                    return "голос при переголосовании не за ничейного"
+
+        # Успешное действие игрока сохранено
+        if result is True and action[0] in ('vote', 'abstain', 'reveal'):
+            return self._check_saved(game, action[1])
+        return None
+
+    def _check_saved(self, game, user_id: int) -> Optional[str]:
+        saved = self.manager.storage.load_game_state(CHAT_ID)
+        stored = (saved or {}).get('players', {}).get(str(user_id))
+        if stored is None:
+            return "состояние игрока не сохранено"
+
+        player = game.players[user_id]
+        if (stored.get('has_voted'), stored.get('vote_target')) != (player.has_voted, player.vote_target):
+            return "сохраненный голос расходится с игрой"
+        revealed = (stored.get('character') or {}).get('revealed_cards')
+        if player.character and revealed != player.character.revealed_cards:
+            return "сохраненные раскрытия расходятся с игрой"
+        return None
+
+    # --- Сжатие ---
+
+    def shrink(self, failure: Failure) -> Failure:
+        """Убирает куски и отдельные действия, пока падение с той же сигнатурой повторяется"""
+        chunk = max(1, len(failure.actions) // 2)
+        while True:
+            index, reduced = 0, False
+            while index < len(failure.actions):
+                candidate = failure.actions[:index] + failure.actions[index + chunk:]
+                result = self.run_case(failure.seed, candidate)
+                if result and result.signature == failure.signature:
+                    failure, reduced = result, True
+                else:
+                    index += chunk
+            if chunk == 1 and not reduced:
+                return failure
+            chunk = max(1, chunk // 2)
+
+
+_worker: Optional[EngineFuzzer] = None
+
+
+def _init_worker(max_players: int, max_actions: int):
+    global _worker
+    logging.disable(logging.WARNING)  # ERROR движка доходит до фаззера, остальное - шум
+    _worker = EngineFuzzer(max_players, max_actions)
+
+
+def _run_seeds(seeds: range) -> Tuple[int, List[Failure]]:
+    """Пачка прогонов в процессе: (действий, первые падения каждой сигнатуры)"""
+    actions_before = _worker.actions_run
+    failures = {}
+    for seed in seeds:
+        failure = _worker.run_case(seed)
+        if failure and failure.signature not in failures:
+            failures[failure.signature] = failure
+    return _worker.actions_run - actions_before, list(failures.values())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Фаззер переходов GameManager на виртуальных часах")
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--players', type=int, default=8, help="мест за столом (номера игроков 1..N)")
+    parser.add_argument('--max-actions', type=int, default=300)
+    parser.add_argument('--jobs', type=int, default=1, help="процессов (каждый со своим GameManager)")
+    parser.add_argument('--replay', help="JSON из отчета о падении: прогнать с трассой действий")
+    parser.add_argument('--no-shrink', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.CRITICAL)
+    _init_worker(args.players, args.max_actions)
+    try:
+        if args.replay:
+            case = json.loads(args.replay)
+            failure = _worker.run_case(case['seed'], [tuple(action) for action in case['actions']], trace=True)
+            print(failure.format() if failure else "✅ Падение не воспроизводится")
+            return 1 if failure else 0
+
+        base_seed = args.seed if args.seed is not None else random.randrange(2 ** 31)
+        batch = max(1, min(500, args.games // max(1, args.jobs * 4)))
+        batches = [range(start, min(start + batch, base_seed + args.games))
+                   for start in range(base_seed, base_seed + args.games, batch)]
+
+        started = time.perf_counter()
+        if args.jobs > 1:
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(args.jobs, _init_worker, (args.players, args.max_actions)) as pool:
+                results = pool.map(_run_seeds, batches)
+        else:
+            results = [_run_seeds(seeds) for seeds in batches]
+        elapsed = time.perf_counter() - started
+
+        failures = {}
+        for _, batch_failures in results:
+            for failure in batch_failures:
+                failures.setdefault(failure.signature, failure)
+
+        actions = sum(count for count, _ in results)
+        print(f"🎲 {args.games} прогонов (seed {base_seed}), {actions} действий, "
+              f"{elapsed:.1f} с, {args.games / max(elapsed, 1e-9):.0f} игр/с")
+        if not failures:
+            print("✅ Падений нет")
+            return 0
+
+        print(f"❌ Разных падений: {len(failures)}")
+        for failure in failures.values():
+            if not args.no_shrink:
+                failure = _worker.shrink(failure)
+            print(failure.format())
+        return 1
+    finally:
+        _worker.close()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+# game_archive.py
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Tuple
+
+from callback_codec import CARD_CODES
+
+
+@dataclass(frozen=True)
+class GameSummary:
+    """Неизменяемая сводка завершенной игры"""
+    chat_id: int
+    scenario: str
+    bunker_info: str
+    # (user_id, отображаемое имя)
+    winners: Tuple[Tuple[int, str], ...]
+    eliminated: Tuple[Tuple[int, str], ...]
+    # (user_id, имя, ((тип карточки, значение), ...)) - только раскрытые карточки
+    reveals: Tuple[Tuple[int, str, Tuple[Tuple[str, str], ...]], ...]
+    player_count: int
+    last_card_phase: int
+    finished_at: float
+
+    @classmethod
+    def from_game(cls, game) -> 'GameSummary':
+        """Сжимает живой объект игры в сводку"""
+        def names(user_ids: List[int]) -> Tuple[Tuple[int, str], ...]:
+            return tuple(
+                (user_id, game.players[user_id].get_display_name())
+                for user_id in user_ids if user_id in game.players
+            )
+
+        reveals = []
+        for player in game.players.values():
+            character = player.character
+            if not character:
+                continue
+
+            revealed = tuple(
+                (card_type, character.get_card_value(card_type)) for card_type in CARD_CODES
+                if character.revealed_cards.get(card_type, False)
+            )
+            reveals.append((player.user_id, player.get_display_name(), revealed))
+
+        return cls(
+            chat_id=game.chat_id,
+            scenario=game.scenario,
+            bunker_info=game.bunker_info,
+            winners=names(game.winners),
+            eliminated=names(game.eliminated_players),
+            reveals=tuple(reveals),
+            player_count=len(game.players),
+            last_card_phase=getattr(game, 'current_card_phase', 0),
+            finished_at=time.time()
+        )
+
+
+class GameArchive:
+    """Небольшой ограниченный архив сводок последних завершенных игр"""
+
+    def __init__(self, max_size: int = 100):
+        self._summaries: Deque[GameSummary] = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self.total_archived = 0
+
+    def add(self, summary: GameSummary):
+        """Добавляет сводку (самая старая вытесняется при переполнении)"""
+        with self._lock:
+            self._summaries.append(summary)
+            self.total_archived += 1
+
+    def get_last(self, chat_id: int) -> Optional[GameSummary]:
+        """Возвращает последнюю сводку игры в чате"""
+        with self._lock:
+            for summary in reversed(self._summaries):
+                if summary.chat_id == chat_id:
+                    return summary
+        return None
+
+    def get_recent(self, limit: int = 10) -> List[GameSummary]:
+        """Возвращает последние сводки (новые первыми)"""
+        with self._lock:
+            return list(reversed(self._summaries))[:limit]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._summaries)
@@ -0,0 +1,110 @@
+# game_board.py
+"""Режим табло: все публичное состояние игры в одном закрепленном сообщении.
+
+Вместо потока сообщений (фаза, очередь, каждое раскрытие) закреп перерисовывается
+целиком: фаза, очередь ходов, текущий ход, открытые карточки игроков и лента
+последних действий. Правки идут не чаще раза в BOARD_EDIT_INTERVAL секунд
+(Debouncer), отдельными сообщениями по-прежнему приходят только ключевые
+события: голосование, изгнания, результаты.
+"""
+import logging
+
+from callback_codec import CARD_CODES
+from timers import Debouncer
+
+logger = logging.getLogger(__name__)
+
+CARD_ICONS = {
+    'profession': '💼', 'biology': '👤', 'health': '🫁', 'phobia': '🗣',
+    'hobby': '🎮', 'fact': '🔎', 'baggage': '📦',
+}
+
+# Предел длины текста сообщения Telegram с запасом
+MAX_BOARD_LENGTH = 4000
+MAX_CARD_LENGTH = 40
+
+PHASE_TITLES = {
+    'role_study': "Изучение ролей",
+    'voting': "Голосование",
+    'results': "Результаты",
+    'finished': "Игра завершена",
+}
+
+
+def _phase_title(game) -> str:
+    phase = game.phase.value
+    if phase.startswith('card_reveal_'):
+        return f"Раскрытие карточек #{game.current_card_phase}"
+    return PHASE_TITLES.get(phase, phase)
+
+
+def _short(text: str) -> str:
+    return text if len(text) <= MAX_CARD_LENGTH else text[:MAX_CARD_LENGTH - 1] + "…"
+
+
+def render_board(game) -> str:
+    """Текст табло по текущему состоянию игры"""
+    lines = [f"📌 **Бункер** | {_phase_title(game)}"]
+    if game.scenario:
+        lines.append(f"🌍 {game.scenario}")
+    if game.bunker_info:
+        lines.append(f"🏠 {game.bunker_info}")
+
+    current = game.players.get(game.current_turn_player_id) if game.current_turn_player_id else None
+    if current and game.phase.value.startswith('card_reveal_'):
+        lines.append(f"\n🎯 **Ход:** {current.get_display_name()}")
+
+    order = [player for player in game.players_order if player.user_id in game.players] or list(game.players.values())
+    lines.append("\n**Игроки:**")
+    for number, player in enumerate(order, 1):
+        mark = "🎯" if current is player else ("✅" if player.is_alive else "❌")
+        lines.append(f"{number}. {mark} {player.get_display_name()}")
+
+        character = player.character
+        if not character or not player.is_alive:
+            continue
+        revealed = [f"{CARD_ICONS[card_type]} {_short(character.get_card_value(card_type))}"
+                    for card_type in CARD_CODES if character.revealed_cards.get(card_type, False)]
+        if revealed:
+            lines.append("    " + " | ".join(revealed))
+
+    feed = getattr(game, 'board_feed', None)
+    if feed:
+        lines.append("\n**Последние события:**")
+        lines.extend(f"• {item}" for item in feed)
+
+    text = "\n".join(lines)
+    return text if len(text) <= MAX_BOARD_LENGTH else text[:MAX_BOARD_LENGTH - 1] + "…"
+
+
+class GameBoard:
+    """Перерисовка табло с ограничением частоты правок"""
+
+    def __init__(self, game_manager, interval: float):
+        self.game_manager = game_manager
+        self.updates = Debouncer(interval, self._flush)
+
+    def refresh(self, chat_id: int):
+        """Отмечает, что табло чата устарело"""
+        self.updates.trigger(chat_id)
+
+    def render_now(self, chat_id: int):
+        """Перерисовывает табло сразу (конец игры: потом игра удаляется)"""
+        self.updates.trigger(chat_id)
+        self.updates.flush(chat_id)
+
+    def _flush(self, chat_id: int):
+        game = self.game_manager.games.get(chat_id)
+        if not game or not game.pin_message_id:
+            return
+
+        from keyboards import get_cards_menu_inline_keyboard
+        self.game_manager._update_pin_message(
+            chat_id, render_board(game), reply_markup=get_cards_menu_inline_keyboard(chat_id)
+        )
+
+    def get_stats(self) -> dict:
+        return {'changes': self.updates.triggered, 'edits': self.updates.fired}
+
+    def close(self):
+        self.updates.flush_all()
@@ -1,8 +1,10 @@
 # game_manager.py
-import json
+import copy
+import functools
 import os
 import random
 import threading
+from collections import deque
 from typing import Dict, List, Optional, Tuple
 from enum import Enum
 import logging
@@ -10,13 +12,105 @@ import time
 
 from player import Player, PlayerCharacter
 from timers import PhaseTimer, NotificationTimer
-from config import GAME_SETTINGS, CARDS_DIR, DATA_DIR
-from config import PLAYER_CARDS_DIR
+from config import GAME_SETTINGS, DATA_DIR
 from config import MESSAGE_DELAY, BOT_IMAGES
-from config import ADMIN_IDS
+from config import ADMIN_IDS, GAME_ARCHIVE_SIZE, HISTORY_SETTINGS, CLUSTER_SETTINGS, CARD_SNAPSHOT_SETTINGS
+from config import CARD_ANALYTICS_SETTINGS
+from callback_codec import NONCE_MASK
+from game_archive import GameArchive, GameSummary
+from history_store import GameHistoryStore
+from card_analytics import CardAnalyticsStore
+from storage import StorageBackend, create_storage
+from card_snapshot import (CardSnapshot, WEIGHTED_CATEGORIES, build_alias_table, build_alias_tables,
+                           defaults_digest, normalize_cards, normalize_weighted)
+from fanout import fan_out
+from edit_dedup import edit_dedup
+from game_board import GameBoard
+from game_plan import GamePlan, build_game_plan
+from cluster import LeaseKeeper, create_lease_backend, default_node_id
+from logging_setup import set_phase_provider
+from tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Карточки по умолчанию (записываются в хранилище, если категории там нет)
+DEFAULT_CARDS = {
+    'professions': [
+        'Админ по вп', 'Слесарь', 'Разнорабочий', 'Адвокат', 'Судья',
+        'Прокурор', 'Хирург', 'Ортопед', 'Стоматолог', 'Гинеколог',
+        'Фермер', 'Физик ядерщик', 'Экономист', 'Инженер'
+    ],
+    'biology': [
+        ('Мужчина', 70), ('Женщина', 70), ('Гермафродит', 5),
+        ('Футанари', 3), ('Кантбой', 3), ('Разумная белая свинья', 1)
+    ],
+    'health_body': [
+        ('Обычный', 40), ('Крупное телосложение', 20), ('Тощий', 20),
+        ('Спортивное телосложение', 15), ('Карлик', 8), ('Уродливый', 8),
+        ('Гигантизм', 5), ('Хвост кошки', 3), ('Хвост свиньи', 3),
+        ('Пятачок', 3), ('Рога', 3), ('Три глаза', 1)
+    ],
+    'health_disease': [
+        ('Полностью здоров', 30), ('Никогда не обследовался', 20),
+        ('Непереносимость лактозы', 15), ('Плоскостопие', 10),
+        ('Хроническая усталость', 8), ('Депрессия', 8),
+        ('Хроническая бессонница', 8), ('Нет одного пальца', 5),
+        ('Алопеция', 5), ('Аутизм', 3), ('Алкоголизм', 3),
+        ('Три лишних пальца', 3), ('Немой', 2), ('Нет руки', 2),
+        ('Нет ноги', 2), ('Шизофрения', 2), ('Раздвоение личности', 2),
+        ('Парализован ниже пояса', 1), ('Лимфома', 1), ('Лейкемия', 1),
+        ('Болезнь Альцгеймера', 1)
+    ],
+    'phobias': [
+        'Андрофобия - боязнь мужчин', 'Арахнофобия - боязнь пауков'
+    ],
+    'hobbies': [
+        'Квадробика', 'Хоббихорсинг', 'Пайка микросхем', 'Рукоделие',
+        'Вязание', 'Стрельба из лука', 'Плаванье', 'Бокс', 'Вольная борьба'
+    ],
+    'facts': [
+        'Утверждает что был укушен зомби', 'Телепат', 'Читает мысли',
+        'Гений', 'Ушел после 6 класса', 'Не умеет читать',
+        'Хрюкает как свинья когда смеётся', 'Моется раз в две недели',
+        'Не смывает за собой в туалете', 'Женоненавистник',
+        'Мужененавистник', 'Сексист', 'Сидел в тюрьме',
+        'Серийный убийца', 'Извращенец', 'Раньше снимался в порно'
+    ],
+    'baggage': [
+        'Белая разумная свинья', 'Мини электростанция', 'Фильтр для воды',
+        'Аптечка первой помощи', 'Лекарства от вирусных заболеваний',
+        'Противогазы', 'Пистолет без патронов', 'Бронежилет',
+        'Пояс верности', 'Чемодан набитый дошираком', '20 килограмм риса'
+    ],
+    'special_cards': [
+        'Поменяйся карточками фактов с любым неизгнанным игроком с открытой картой факта'
+    ],
+    'scenarios': [
+        'Зомби-апокалипсис',
+        'Нашествие разумных свиней',
+        'Вирусная пандемия'
+    ],
+    'scenario_descriptions': {
+        'Зомби-апокалипсис': 'В мире появился новый вирус который начал распространяться через телеграмм канал "no nuance confessions" все кто видели хоть пару строчек оттуда превращались в безмозглых зомби, время от времени говорящих что то про трансгендеров и инцест. Правительство пыталось заблокировать этот канал и запретить приложение "Telegram" но попытки были тщетны. Люди заражались и от укусов этих зомби что привело к ужасному Апокалипсису. Выберетесь из бункера и создайте вакцину, которая сможет спасти пострадавших.',
+        'Нашествие разумных свиней': 'В ходе магического ритуала древнего колдуна Евгения открылся портал с разумными белыми свиньями-людоедами. Полчище голодных, уродливых животных заполонило мир и стало стремительно пожирать человечество. Свиньи проявили невероятные интеллектуальные способности для скота: благодаря гениальным стратегиям, учитывавшим уровень военной подготовки стран, они разбили войска, полностью уничтожили армию, спецслужбы и полицию, подорвали военные базы. В результате почти всё население было стёрто с лица Земли. Вам удалось спрятаться в бункере. Выберитесь из убежища, очистите Землю от этих адских созданий и заново постройте могущественную цивилизацию.',
+        'Вирусная пандемия': 'Подписчики Telegram-канала "No Nuance Confessions" решили начать ставить опасные эксперименты над собой, чтобы воплотить свои мнения в реальность и стать максимально уникальными. Однако по своей неосторожности они создали новый вирус: каждый из них начал превращаться в олицетворение своих «мнений», закреплённых в тейках. Например, Сейзук, который писал о том, что пердеть в общественных местах — это норма, сам стал постоянно вонять из-за непрекращающегося пердежа на публике. Другой участник, поддерживающий трансгендерность в своих тейках, сам превратился в транса: вместо пениса у него выросла вагина, а на груди появились женские признаки. Ваша задача — остановить распространение вируса и создать лекарство для его нейтрализации.'
+    },
+    'events': [
+        {'type': 'помеха', 'name': 'Короткое замыкание',
+         'description': 'Провода на секунду вспыхнули в дальнем углу бункера рядом с автоматической системой очистки воздуха. Уже чувствуется запах гари. Нужно срочно что-то предпринять, иначе все задохнутся.'},
+        {'type': 'помеха', 'name': 'Чумная крыса',
+         'description': 'На складе с зерном вы обнаружили серую крысу. Она очень дружелюбная и любит ласку, легко поддаётся дрессировке. Через три дня после контакта с ней у вас началась лихорадка и озноб.'},
+        {'type': 'припасы', 'name': 'Блины',
+         'description': 'Вкусные свежие блины были оставлены на кухне неизвестной персоной. Рядом с тарелкой записка: "С любовью, Диана". Если съесть блины, это поможет растянуть имеющиеся запасы на год и немного порадовать себя.'},
+        {'type': 'припасы', 'name': 'Боеприпасы',
+         'description': 'Пистолет и патроны лежат в коробке из-под обуви. В случае крайней необходимости это поможет вам обезопасить себя.'},
+        {'type': 'комната', 'name': 'Криокапсулы',
+         'description': 'Вы нашли три криокапсулы в секретной комнате. Можно прилечь и поспать в них на год, чтобы скоротать время.'},
+        {'type': 'комната', 'name': 'Игровая комната',
+         'description': 'Просторная комната с дюжиной стеллажей, заполненных настольными, компьютерными и азартными играми. Вам точно не будет скучно.'}
+    ]
+}
+
 
 class GamePhase(Enum):
     LOBBY = "lobby"
@@ -40,6 +134,8 @@ class Game:
         self.chat_id = chat_id
         self.admin_id = admin_id
         self.players: Dict[int, Player] = {}
+        # Nonce фазы зашивается в кнопки; случайный старт, чтобы кнопки прошлой игры в чате не совпали
+        self.phase_nonce = random.randrange(NONCE_MASK + 1)
         self.phase = GamePhase.LOBBY
         self.scenario = ""
         self.scenario_description = ""
@@ -50,6 +146,7 @@ class Game:
         self.created_at = None
         self.current_card_phase = 1
         self.voting_rounds_left = 0
+        self.plan: Optional[GamePlan] = None  # Расписание фаз, собирается при старте
         # НЕ устанавливайте эти поля здесь!
         # self.current_player_index = 0
         # self.players_order = []
@@ -57,6 +154,7 @@ class Game:
         self.pin_message_id = None
         self.revote_candidates = []
         self.is_revoting = False
+        self.revote_rounds = 0  # Переголосования при ничьей, в план не входят
         self.lobby_message_id = None
         self.first_voting_completed = False
         self.players_order = []  # Порядок игроков для очереди
@@ -65,6 +163,28 @@ class Game:
         self.turn_started_at = None  # Время начала хода
         self.menu_sent_to_players = set()
         self.current_turn_message_id = None
+        # Журнал для истории игр
+        self.started_at = None
+        self.voting_round = 0
+        self.vote_log: List[Tuple[int, int, Optional[int]]] = []  # (раунд, голосующий, цель или None)
+        self.reveal_log: List[Tuple[int, str, int, float]] = []  # (user_id, карточка, фаза, время)
+        self.elimination_log: List[Tuple[int, int, int]] = []  # (раунд, user_id, голосов)
+        # Лента последних действий для табло (режим BOARD_MODE)
+        self.board_feed = deque(maxlen=5)
+
+    @property
+    def phase(self) -> GamePhase:
+        return self._phase
+
+    @phase.setter
+    def phase(self, value: GamePhase):
+        """Смена фазы делает недействительными кнопки предыдущей фазы"""
+        if value != getattr(self, '_phase', None):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Чат %s: фаза %s -> %s", self.chat_id, getattr(self, '_phase', None), value,
+                             extra={'chat_id': self.chat_id, 'phase': value.value})
+            self.phase_nonce = (self.phase_nonce + 1) & NONCE_MASK
+        self._phase = value
 
     def add_player(self, user_id: int, username: str, first_name: str) -> bool:
         """Добавляет игрока в игру"""
@@ -92,6 +212,17 @@ class Game:
         """Возвращает живых игроков"""
         return [p for p in self.players.values() if p.is_alive]
 
+    def get_vote_candidates(self) -> List[Player]:
+        """Против кого можно голосовать: при переголосовании - только между ничейными"""
+        alive = self.get_alive_players()
+        if self.is_revoting:
+            return [p for p in alive if p.user_id in self.revote_candidates]
+        return alive
+
+    def get_planned_votes(self) -> int:
+        """Сколько голосований плана уже прошло"""
+        return self.voting_round - self.revote_rounds
+
     def can_start(self) -> bool:
         """Проверяет возможность начала игры"""
         from config import GAME_SETTINGS
@@ -116,120 +247,303 @@ class Game:
         return scenario, bunker_info
 
 
+class GameCache(dict):
+    """Игры этого узла в кластерном режиме: кэш поверх общего хранилища.
+
+    Если игры нет в памяти, проверка `chat_id in games` пытается взять аренду
+    и поднять игру из хранилища. Удаление (`del games[chat_id]`) завершает игру:
+    стирает сохраненное состояние и отпускает аренду. evict() только выгружает
+    игру из памяти (аренда потеряна).
+    """
+
+    def __init__(self, manager: 'GameManager'):
+        super().__init__()
+        self.manager = manager
+
+    def __contains__(self, chat_id) -> bool:
+        return dict.__contains__(self, chat_id) or self.manager._take_over_game(chat_id) is not None
+
+    def __getitem__(self, chat_id) -> 'Game':
+        game = dict.get(self, chat_id)
+        if game is None:
+            game = self.manager._take_over_game(chat_id)
+            if game is None:
+                raise KeyError(chat_id)
+        return game
+
+    def get(self, chat_id, default=None):
+        try:
+            return self[chat_id]
+        except KeyError:
+            return default
+
+    def __delitem__(self, chat_id):
+        dict.__delitem__(self, chat_id)
+        self.manager._on_game_deleted(chat_id)
+
+    def evict(self, chat_id) -> Optional['Game']:
+        """Выгружает игру из памяти, не трогая хранилище"""
+        return dict.pop(self, chat_id, None)
+
+
 class GameManager:
     """Менеджер игр"""
 
-    def __init__(self, bot):
+    def __init__(self, bot, cards_read_only: bool = False, worker_index: Optional[int] = None):
         self.bot = bot
-        self.games: Dict[int, Game] = {}  # chat_id -> Game
+        self.worker_index = worker_index
+        self.lease_keeper = self._create_lease_keeper()
+        # В кластерном режиме игры - кэш над общим хранилищем, иначе обычный словарь
+        self.games: Dict[int, Game] = GameCache(self) if self.lease_keeper else {}  # chat_id -> Game
+        self._takeover_lock = threading.RLock()
+        # chat_id -> до какого момента не пытаться подхватить игру (игры нет или чужая аренда)
+        self._takeover_misses: Dict[int, float] = {}
+        self._takeover_misses_lock = threading.Lock()
+        # В многопроцессном режиме пулы карточек общие, воркеры их не меняют
+        self.cards_read_only = cards_read_only
+        self.archive = GameArchive(GAME_ARCHIVE_SIZE)  # сводки завершенных игр
+        self.history = self._create_history_store()
+        self.card_analytics = self._create_card_analytics()
         self.phase_timer = PhaseTimer(self)
         self.notification_timer = NotificationTimer(bot)
+        self.storage = self._create_storage()
+        self.card_alias_tables = {}  # взвешенные категории -> таблица псевдонимов
         self.cards_data = self._load_cards_data()
+        # Табло в закрепе вместо потока сообщений о ходе игры
+        self.board = GameBoard(self, GAME_SETTINGS['BOARD_EDIT_INTERVAL']) if GAME_SETTINGS['BOARD_MODE'] else None
+        set_phase_provider(self._get_phase_for_logs)
+
+    def _get_phase_for_logs(self, chat_id: int) -> Optional[str]:
+        """Фаза игры для контекста логов (без подхвата игры в кластерном режиме)"""
+        game = dict.get(self.games, chat_id)
+        return game.phase.value if game else None
+
+    def _create_lease_keeper(self) -> Optional[LeaseKeeper]:
+        """Включает аренды игр (кластерный режим)"""
+        if not CLUSTER_SETTINGS['ENABLED']:
+            return None
 
-    def _load_cards_data(self) -> Dict[str, List[str]]:
-        """Загружает данные карточек"""
-        default_cards = {
-            'professions': [
-                'Админ по вп', 'Слесарь', 'Разнорабочий', 'Адвокат', 'Судья',
-                'Прокурор', 'Хирург', 'Ортопед', 'Стоматолог', 'Гинеколог',
-                'Фермер', 'Физик ядерщик', 'Экономист', 'Инженер'
-            ],
-            'biology': [
-                ('Мужчина', 70), ('Женщина', 70), ('Гермафродит', 5),
-                ('Футанари', 3), ('Кантбой', 3), ('Разумная белая свинья', 1)
-            ],
-            'health_body': [
-                ('Обычный', 40), ('Крупное телосложение', 20), ('Тощий', 20),
-                ('Спортивное телосложение', 15), ('Карлик', 8), ('Уродливый', 8),
-                ('Гигантизм', 5), ('Хвост кошки', 3), ('Хвост свиньи', 3),
-                ('Пятачок', 3), ('Рога', 3), ('Три глаза', 1)
-            ],
-            'health_disease': [
-                ('Полностью здоров', 30), ('Никогда не обследовался', 20),
-                ('Непереносимость лактозы', 15), ('Плоскостопие', 10),
-                ('Хроническая усталость', 8), ('Депрессия', 8),
-                ('Хроническая бессонница', 8), ('Нет одного пальца', 5),
-                ('Алопеция', 5), ('Аутизм', 3), ('Алкоголизм', 3),
-                ('Три лишних пальца', 3), ('Немой', 2), ('Нет руки', 2),
-                ('Нет ноги', 2), ('Шизофрения', 2), ('Раздвоение личности', 2),
-                ('Парализован ниже пояса', 1), ('Лимфома', 1), ('Лейкемия', 1),
-                ('Болезнь Альцгеймера', 1)
-            ],
-            'phobias': [
-                'Андрофобия - боязнь мужчин', 'Арахнофобия - боязнь пауков'
-            ],
-            'hobbies': [
-                'Квадробика', 'Хоббихорсинг', 'Пайка микросхем', 'Рукоделие',
-                'Вязание', 'Стрельба из лука', 'Плаванье', 'Бокс', 'Вольная борьба'
-            ],
-            'facts': [
-                'Утверждает что был укушен зомби', 'Телепат', 'Читает мысли',
-                'Гений', 'Ушел после 6 класса', 'Не умеет читать',
-                'Хрюкает как свинья когда смеётся', 'Моется раз в две недели',
-                'Не смывает за собой в туалете', 'Женоненавистник',
-                'Мужененавистник', 'Сексист', 'Сидел в тюрьме',
-                'Серийный убийца', 'Извращенец', 'Раньше снимался в порно'
-            ],
-            'baggage': [
-                'Белая разумная свинья', 'Мини электростанция', 'Фильтр для воды',
-                'Аптечка первой помощи', 'Лекарства от вирусных заболеваний',
-                'Противогазы', 'Пистолет без патронов', 'Бронежилет',
-                'Пояс верности', 'Чемодан набитый дошираком', '20 килограмм риса'
-            ],
-            'special_cards': [
-                'Поменяйся карточками фактов с любым неизгнанным игроком с открытой картой факта'
-            ],
-            'scenarios': [
-                'Зомби-апокалипсис',
-                'Нашествие разумных свиней',
-                'Вирусная пандемия'
-            ],
-            'scenario_descriptions': {
-                'Зомби-апокалипсис': 'В мире появился новый вирус который начал распространяться через телеграмм канал "no nuance confessions" все кто видели хоть пару строчек оттуда превращались в безмозглых зомби, время от времени говорящих что то про трансгендеров и инцест. Правительство пыталось заблокировать этот канал и запретить приложение "Telegram" но попытки были тщетны. Люди заражались и от укусов этих зомби что привело к ужасному Апокалипсису. Выберетесь из бункера и создайте вакцину, которая сможет спасти пострадавших.',
-                'Нашествие разумных свиней': 'В ходе магического ритуала древнего колдуна Евгения открылся портал с разумными белыми свиньями-людоедами. Полчище голодных, уродливых животных заполонило мир и стало стремительно пожирать человечество. Свиньи проявили невероятные интеллектуальные способности для скота: благодаря гениальным стратегиям, учитывавшим уровень военной подготовки стран, они разбили войска, полностью уничтожили армию, спецслужбы и полицию, подорвали военные базы. В результате почти всё население было стёрто с лица Земли. Вам удалось спрятаться в бункере. Выберитесь из убежища, очистите Землю от этих адских созданий и заново постройте могущественную цивилизацию.',
-                'Вирусная пандемия': 'Подписчики Telegram-канала "No Nuance Confessions" решили начать ставить опасные эксперименты над собой, чтобы воплотить свои мнения в реальность и стать максимально уникальными. Однако по своей неосторожности они создали новый вирус: каждый из них начал превращаться в олицетворение своих «мнений», закреплённых в тейках. Например, Сейзук, который писал о том, что пердеть в общественных местах — это норма, сам стал постоянно вонять из-за непрекращающегося пердежа на публике. Другой участник, поддерживающий трансгендерность в своих тейках, сам превратился в транса: вместо пениса у него выросла вагина, а на груди появились женские признаки. Ваша задача — остановить распространение вируса и создать лекарство для его нейтрализации.'
-            },
-            'events': [
-                {'type': 'помеха', 'name': 'Короткое замыкание',
-                 'description': 'Провода на секунду вспыхнули в дальнем углу бункера рядом с автоматической системой очистки воздуха. Уже чувствуется запах гари. Нужно срочно что-то предпринять, иначе все задохнутся.'},
-                {'type': 'помеха', 'name': 'Чумная крыса',
-                 'description': 'На складе с зерном вы обнаружили серую крысу. Она очень дружелюбная и любит ласку, легко поддаётся дрессировке. Через три дня после контакта с ней у вас началась лихорадка и озноб.'},
-                {'type': 'припасы', 'name': 'Блины',
-                 'description': 'Вкусные свежие блины были оставлены на кухне неизвестной персоной. Рядом с тарелкой записка: "С любовью, Диана". Если съесть блины, это поможет растянуть имеющиеся запасы на год и немного порадовать себя.'},
-                {'type': 'припасы', 'name': 'Боеприпасы',
-                 'description': 'Пистолет и патроны лежат в коробке из-под обуви. В случае крайней необходимости это поможет вам обезопасить себя.'},
-                {'type': 'комната', 'name': 'Криокапсулы',
-                 'description': 'Вы нашли три криокапсулы в секретной комнате. Можно прилечь и поспать в них на год, чтобы скоротать время.'},
-                {'type': 'комната', 'name': 'Игровая комната',
-                 'description': 'Просторная комната с дюжиной стеллажей, заполненных настольными, компьютерными и азартными играми. Вам точно не будет скучно.'}
-            ]
-        }
+        node_id = CLUSTER_SETTINGS['NODE_ID'] or default_node_id()
+        backend = create_lease_backend(CLUSTER_SETTINGS['LEASE_BACKEND'], CLUSTER_SETTINGS['LEASE_DB_FILE'])
+        logger.info(f"Кластерный режим, узел {node_id}")
+        return LeaseKeeper(
+            backend, node_id, CLUSTER_SETTINGS['LEASE_TTL'],
+            on_lost=self._on_lease_lost,
+            on_renewed=self.save_player_cards
+        )
 
-        # Пытаемся загрузить из файлов
-        cards_data = {}
-        for category, default_list in default_cards.items():
-            file_path = os.path.join(CARDS_DIR, f'{category}.json')
+    @traced()
+    def _take_over_game(self, chat_id: int) -> Optional['Game']:
+        """Берет аренду и поднимает игру из общего хранилища"""
+        if not self.lease_keeper:
+            return None
+
+        game = dict.get(self.games, chat_id)
+        if game is not None:
+            return game
+
+        now = time.time()
+        if self._takeover_misses.get(chat_id, 0) > now:
+            return None
+
+        # Живая аренда другого узла: игру ведет он, состояние не читаем
+        owner = self.lease_keeper.foreign_owner(chat_id)
+        if owner:
+            self._remember_takeover_miss(chat_id, min(owner[1], now + CLUSTER_SETTINGS['TAKEOVER_MISS_TTL']))
+            return None
+
+        try:
+            # Дешевая проверка без общей блокировки: в большинстве чатов игры просто нет
+            game_data = self.storage.load_game_state(chat_id)
+        except Exception as e:
+            logger.error(f"Ошибка чтения игры в чате {chat_id}: {e}")
+            return None
+        if not game_data or 'admin_id' not in game_data:
+            self._remember_takeover_miss(chat_id, now + CLUSTER_SETTINGS['TAKEOVER_MISS_TTL'])
+            return None
+
+        with self._takeover_lock:
+            game = dict.get(self.games, chat_id)
+            if game is not None:
+                return game
 
             try:
-                if os.path.exists(file_path):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        cards_data[category] = json.load(f)
+                if not self.lease_keeper.acquire(chat_id):
+                    self._remember_takeover_miss(chat_id, now + CLUSTER_SETTINGS['TAKEOVER_MISS_TTL'])
+                    return None
+
+                # Перечитываем после взятия аренды: прежний владелец мог успеть сохраниться
+                game_data = self.storage.load_game_state(chat_id)
+                if not game_data or 'admin_id' not in game_data:
+                    self.lease_keeper.release(chat_id)
+                    return None
+
+                game = self._restore_game(game_data)
+            except Exception as e:
+                logger.error(f"Ошибка подхвата игры в чате {chat_id}: {e}")
+                self.lease_keeper.release(chat_id)
+                return None
+
+            dict.__setitem__(self.games, chat_id, game)
+
+        self._resume_timers(game)
+        logger.info(f"Игра в чате {chat_id} подхвачена узлом {self.lease_keeper.node_id} (фаза {game.phase.value})")
+        return game
+
+    def _remember_takeover_miss(self, chat_id: int, until: float):
+        """Запоминает, что подхватывать игру в чате пока не нужно"""
+        with self._takeover_misses_lock:
+            self._takeover_misses[chat_id] = until
+            if len(self._takeover_misses) > 10000:
+                now = time.time()
+                self._takeover_misses = {key: value for key, value in self._takeover_misses.items() if value > now}
+
+    def _on_lease_lost(self, chat_id: int):
+        """Аренда перешла другому узлу: перестаем вести игру"""
+        self.phase_timer.stop_chat_timers(chat_id)
+        if self.games.evict(chat_id) is not None:
+            logger.warning(f"Игра в чате {chat_id} выгружена: аренда потеряна")
+
+    def _on_game_deleted(self, chat_id: int):
+        """Игра завершена и удалена из кэша"""
+        self.phase_timer.stop_chat_timers(chat_id)
+        self.delete_player_cards(chat_id)
+        self.lease_keeper.release(chat_id)
+
+    def release_all_games(self):
+        """Сохраняет игры узла и отпускает аренды (при остановке)"""
+        if not self.lease_keeper:
+            return
+
+        for chat_id in list(dict.keys(self.games)):
+            self.save_player_cards(chat_id)
+            self.phase_timer.stop_chat_timers(chat_id)
+            self.games.evict(chat_id)
+        self.lease_keeper.close()
+
+    def _resume_timers(self, game: 'Game'):
+        """Перезапускает таймеры подхваченной игры (с полной длительностью)"""
+        chat_id = game.chat_id
+        if game.phase == GamePhase.ROLE_STUDY:
+            self.phase_timer.start_phase_timer(chat_id, "role_study", GAME_SETTINGS['ROLE_STUDY_TIME'])
+        elif game.phase == GamePhase.VOTING:
+            self.phase_timer.start_phase_timer(chat_id, "voting", GAME_SETTINGS['VOTING_TIME'])
+        elif game.phase == GamePhase.RESULTS:
+            self.phase_timer.start_phase_timer(chat_id, "results", GAME_SETTINGS['RESULTS_TIME'])
+        elif game.phase.value.startswith("card_reveal_"):
+            card_number = game.current_card_phase
+            player = game.players.get(game.current_turn_player_id)
+            if player and player.is_alive and not getattr(player, f'turn_completed_phase_{card_number}', False):
+                self.phase_timer.timer.start_timer(
+                    f"turn_{chat_id}_{player.user_id}",
+                    GAME_SETTINGS['TURN_TIMEOUT'],
+                    self._handle_turn_timeout,
+                    chat_id,
+                    card_number
+                )
+            else:
+                # Ход не назначен или уже сделан (прежний узел не успел передать очередь):
+                # следующий ход или конец фазы - как после обычного хода
+                self.phase_timer.timer.start_timer(
+                    f"phase_{chat_id}_next", 0, self._start_next_turn, chat_id, card_number)
+
+    def _create_storage(self) -> StorageBackend:
+        """Создает хранилище карточек и игр (при ошибке - JSON-файлы)"""
+        try:
+            storage = create_storage()
+        except Exception as e:
+            logger.error(f"Не удалось создать хранилище: {e}")
+            storage = create_storage('json')
+
+        logger.info(f"Хранилище данных: {storage.name}")
+        return storage
+
+    def _create_history_store(self) -> Optional[GameHistoryStore]:
+        """Открывает базу истории игр (если включена)"""
+        if not HISTORY_SETTINGS['ENABLED']:
+            return None
+
+        try:
+            return GameHistoryStore(
+                HISTORY_SETTINGS['DB_FILE'],
+                batch_size=HISTORY_SETTINGS['BATCH_SIZE'],
+                flush_interval=HISTORY_SETTINGS['FLUSH_INTERVAL']
+            )
+        except Exception as e:
+            logger.error(f"Не удалось открыть историю игр: {e}")
+            return None
+
+    def _create_card_analytics(self) -> Optional[CardAnalyticsStore]:
+        """Открывает колонки аналитики карточек (если включена)"""
+        if not CARD_ANALYTICS_SETTINGS['ENABLED']:
+            return None
+
+        # Воркеры пишут каждый в свой подкаталог, отчеты собираются по всем
+        part = f"worker{self.worker_index}" if self.worker_index is not None else None
+        try:
+            return CardAnalyticsStore(CARD_ANALYTICS_SETTINGS['DIR'], part=part)
+        except Exception as e:
+            logger.error(f"Не удалось открыть аналитику карточек: {e}")
+            return None
+
+    def _load_cards_data(self) -> Dict[str, list]:
+        """Загружает карточки: из снимка, если источники не менялись, иначе из хранилища"""
+        started = time.perf_counter()
+        snapshot = CardSnapshot(CARD_SNAPSHOT_SETTINGS['FILE']) if CARD_SNAPSHOT_SETTINGS['ENABLED'] else None
+        sources = self.storage.cards_fingerprint(DEFAULT_CARDS) if snapshot else None
+        digest = defaults_digest(DEFAULT_CARDS) if sources is not None else None
+
+        if sources is not None:
+            loaded = snapshot.load(CardSnapshot.make_key(sources, digest))
+            if loaded:
+                cards_data, self.card_alias_tables = loaded
+                self._log_cards_startup("снимок", cards_data, started)
+                return cards_data
+
+        cards_data = normalize_cards(self._read_cards_data())
+        self.card_alias_tables = build_alias_tables(cards_data)
+
+        if sources is not None:
+            # Отпечаток берется заново: недостающие категории только что записаны
+            sources = self.storage.cards_fingerprint(DEFAULT_CARDS)
+            snapshot.save(CardSnapshot.make_key(sources, digest), cards_data, self.card_alias_tables)
+
+        self._log_cards_startup("хранилище", cards_data, started)
+        return cards_data
+
+    def _log_cards_startup(self, source: str, cards_data: Dict[str, list], started: float):
+        """Статистика загрузки карточек (время холодного старта)"""
+        total = sum(len(cards) for cards in cards_data.values())
+        logger.info(
+            f"Карточки загружены ({source}) за {(time.perf_counter() - started) * 1000:.1f} мс: "
+            f"категорий {len(cards_data)}, карточек {total}, хранилище {self.storage.name}"
+        )
+
+    def _read_cards_data(self) -> Dict[str, list]:
+        """Читает все категории из хранилища, недостающие заполняет карточками по умолчанию"""
+        cards_data = {}
+        for category, default_list in DEFAULT_CARDS.items():
+            try:
+                cards = self.storage.load_cards_category(category)
+                if cards is not None:
+                    cards_data[category] = cards
                 else:
-                    cards_data[category] = default_list
+                    cards_data[category] = copy.deepcopy(default_list)
                     # Сохраняем дефолтные данные
                     self._save_cards_category(category, default_list)
             except Exception as e:
                 logger.error(f"Ошибка загрузки {category}: {e}")
-                cards_data[category] = default_list
+                cards_data[category] = copy.deepcopy(default_list)
 
         return cards_data
 
     def _save_cards_category(self, category: str, cards: List[str]):
         """Сохраняет категорию карточек"""
+        if self.cards_read_only:
+            return
+
         try:
-            file_path = os.path.join(CARDS_DIR, f'{category}.json')
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(cards, f, ensure_ascii=False, indent=2)
+            self.storage.save_cards_category(category, cards)
         except Exception as e:
             logger.error(f"Ошибка сохранения {category}: {e}")
 
@@ -238,7 +552,12 @@ class GameManager:
         if chat_id in self.games:
             return False
 
+        if self.lease_keeper and not self.lease_keeper.acquire(chat_id):
+            logger.warning(f"Чат {chat_id} ведет другой узел")
+            return False
+
         self.games[chat_id] = Game(chat_id, admin_id)
+        self._takeover_misses.pop(chat_id, None)
 
         # ДОБАВЛЕНО: пытаемся загрузить существующие карточки
         self.load_player_cards(chat_id)
@@ -263,8 +582,13 @@ class GameManager:
             return False
 
         game = self.games[chat_id]
+        # После старта игрок нужен очереди ходов и голосованию
+        if game.phase != GamePhase.LOBBY:
+            return False
+
         return game.remove_player(user_id)
 
+    @traced()
     def start_game(self, chat_id: int, user_id: int) -> bool:
         """Начинает игру"""
         if chat_id not in self.games:
@@ -280,15 +604,21 @@ class GameManager:
         if not game.can_start():
             return False
 
+        game.started_at = time.time()
+
         # Генерируем персонажей
         for player in game.players.values():
-            player.generate_character(self.cards_data)
+            player.generate_character(self.cards_data, self.card_alias_tables)
 
         # Генерируем сценарий
         game.scenario, game.bunker_info = game.generate_scenario(
             self.cards_data.get('scenarios', [])
         )
 
+        game.plan = build_game_plan(len(game.players), game.bunker_info)
+        logger.info(f"План игры в чате {chat_id}: {game.plan.total_votes} голосований, "
+                    f"мест {game.plan.bunker_slots}, до ~{game.plan.expected_duration // 60} мин")
+
         # Сохраняем описание сценария
         game.scenario_description = self.cards_data.get('scenario_descriptions', {}).get(game.scenario,
                                                                                          "Описание недоступно")
@@ -335,6 +665,7 @@ class GameManager:
         self._start_card_reveal_phase(chat_id, 1)
         return True
 
+    @traced()
     def _start_role_study_phase(self, chat_id: int):
         """Начинает фазу изучения ролей"""
         if chat_id not in self.games:
@@ -348,18 +679,15 @@ class GameManager:
         # Отправляем сообщения игрокам
         self._send_phase_message(chat_id, "🎭 Фаза изучения ролей началась!", duration)
 
-        # Сначала отправляем все карточки
+        # Сначала отправляем все карточки (fan_out возвращается, когда все доставлены)
         self._send_characters_to_players(chat_id)
 
-        # Добавляем задержку перед запуском таймеров, чтобы все карточки успели дойти
-        def start_timers():
-            self.phase_timer.start_phase_timer(chat_id, "role_study", duration)
-            self.notification_timer.schedule_phase_warnings(chat_id, "изучения ролей", duration)
-
-        threading.Timer(5, start_timers).start()
+        self.phase_timer.start_phase_timer(chat_id, "role_study", duration)
+        self.notification_timer.schedule_phase_warnings(chat_id, "изучения ролей", duration)
 
 
 
+    @traced()
     def _start_voting_phase(self, chat_id: int):
         """Начинает фазу голосования"""
         if chat_id not in self.games:
@@ -368,12 +696,16 @@ class GameManager:
         game = self.games[chat_id]
         game.phase = GamePhase.VOTING
 
-        # Сбрасываем голоса
+        # Сбрасываем голоса (и сохраняем: иначе после рестарта голос прошлого раунда засчитан)
         for player in game.players.values():
             player.reset_vote()
+        self.save_player_cards(chat_id)
 
-        # Показываем открытые карты перед голосованием
-        self._show_revealed_cards_summary(chat_id)
+        # Показываем открытые карты перед голосованием (на табло они уже есть)
+        if self._board_active(chat_id):
+            self.board.refresh(chat_id)
+        else:
+            self._show_revealed_cards_summary(chat_id)
 
         vote_text = "🗳️ **Фаза голосования началась!**\n\n"
         vote_text += "Голосуйте против тех, кто НЕ должен попасть в бункер."
@@ -394,6 +726,7 @@ class GameManager:
         duration = GAME_SETTINGS['VOTING_TIME']
         self.phase_timer.start_phase_timer(chat_id, "voting", duration)
 
+    @traced()
     def _start_results_phase(self, chat_id: int):
         """Начинает фазу результатов"""
         if chat_id not in self.games:
@@ -406,14 +739,24 @@ class GameManager:
         if not hasattr(game, 'first_voting_completed'):
             game.first_voting_completed = True
 
+        # Переголосование бывает одно: повторная ничья никого не исключает
+        revote = game.is_revoting
+        game.is_revoting = False
+
         # Подсчитываем голоса
         self._count_votes(chat_id)
+        if revote:
+            game.revote_rounds += 1
 
         # Определяем исключенных
         self._eliminate_players(chat_id)
 
         # Отправляем результаты
-        self._send_voting_results(chat_id)
+        self._send_voting_results(chat_id, allow_revote=not revote)
+        if not game.is_revoting:
+            game.revote_candidates = []
+        if self._board_active(chat_id):
+            self.board.refresh(chat_id)
 
         duration = GAME_SETTINGS['RESULTS_TIME']
 
@@ -433,6 +776,7 @@ class GameManager:
 
         game = self.games[chat_id]
         votes_count: Dict[int, int] = {}
+        game.voting_round += 1
 
         # Инициализируем счетчики
         for player in game.get_alive_players():
@@ -440,6 +784,8 @@ class GameManager:
 
         # Подсчитываем голоса
         for player in game.get_alive_players():
+            if player.has_voted:
+                game.vote_log.append((game.voting_round, player.user_id, player.vote_target))
             if player.vote_target and player.vote_target in votes_count:
                 # Проверяем двойной голос
                 vote_power = 2 if hasattr(player, 'double_vote_active') and player.double_vote_active else 1
@@ -527,6 +873,7 @@ class GameManager:
 
                 if player.eliminate():
                     game.eliminated_players.append(user_id)
+                    game.elimination_log.append((game.voting_round, user_id, max_votes))
 
     def use_special_card(self, chat_id: int, user_id: int, target_id: int = None) -> dict:  # new
         """Использование специальной карточки"""
@@ -540,6 +887,8 @@ class GameManager:
         player = game.players[user_id]
         target_player = game.players.get(target_id) if target_id else None
 
+        # Карточкам нужен менеджер для сохранения изменений
+        game.game_manager = self
         return player.use_special_card(game, self.bot, target_player)
 
 
@@ -551,20 +900,17 @@ class GameManager:
         game = self.games[chat_id]
         alive_players = game.get_alive_players()
 
-        # Извлекаем количество мест из описания бункера
-        bunker_slots = self._extract_bunker_slots(game.bunker_info)
-
         # Игра заканчивается, если осталось игроков <= количества мест
-        return len(alive_players) <= bunker_slots
+        return len(alive_players) <= self.get_game_plan(game).bunker_slots
 
-
-    def _extract_bunker_slots(self, bunker_info: str) -> int:
-        """Извлекает количество мест в бункере"""
-        import re
-        match = re.search(r'(\d+)\s+(?:человек|мест)', bunker_info)
-        return int(match.group(1)) if match else 1
+    def get_game_plan(self, game: 'Game') -> GamePlan:
+        """План игры (подхваченной из хранилища игре собирается заново)"""
+        if game.plan is None:
+            game.plan = build_game_plan(len(game.players), game.bunker_info)
+        return game.plan
 
 
+    @traced()
     def _finish_game(self, chat_id: int):
         """Завершает игру"""
         if chat_id not in self.games:
@@ -578,15 +924,29 @@ class GameManager:
 
         # Отправляем финальное сообщение
         self._send_final_results(chat_id)
+        if self._board_active(chat_id):
+            self.board.render_now(chat_id)
 
-        # Останавливаем таймеры
-        self.phase_timer.stop_phase_timer(chat_id)
+        # Пишем историю (в фоне, пачками)
+        if self.history:
+            self.history.record_game(game)
+        if self.card_analytics:
+            self.card_analytics.record_game(game)
 
-        # Удаляем игру через некоторое время
-        threading.Timer(300, self._cleanup_game, args=[chat_id]).start()  # 5 минут
+        # Сжимаем игру в сводку и сразу освобождаем живой объект:
+        # в чате можно начинать новую игру без ожидания
+        try:
+            self.archive.add(GameSummary.from_game(game))
+        except Exception as e:
+            logger.error(f"Ошибка архивации игры в чате {chat_id}: {e}")
+
+        self._cleanup_game(chat_id)
 
     def _cleanup_game(self, chat_id: int):
         """Очищает завершенную игру"""
+        # Останавливаем таймеры фаз и ходов, чтобы они не сработали для новой игры
+        self.phase_timer.stop_chat_timers(chat_id)
+
         if chat_id in self.games:
             # ДОБАВЛЕНО: удаляем файл карточек
             self.delete_player_cards(chat_id)
@@ -612,6 +972,7 @@ class GameManager:
         except Exception as e:
             logger.error(f"Ошибка отправки сообщения о фазе: {e}")
 
+    @traced()
     def _send_message_with_delay_and_image(self, chat_id: int, text: str, image_key: str = None, **kwargs):
         """Отправляет сообщение с возможным изображением"""
 
@@ -636,32 +997,43 @@ class GameManager:
             except Exception as e2:
                 logger.error(f"Ошибка отправки fallback сообщения: {e2}")
 
+    @traced()
     def _send_characters_to_players(self, chat_id: int):
         """Отправляет персонажей игрокам"""
         if chat_id not in self.games:
             return
 
         game = self.games[chat_id]
+        players = list(game.players.values())
+
+        # Всем сразу, параллельно; в общий чат - только тем, кому ЛС не дошло
+        deliveries = fan_out({
+            player.user_id: functools.partial(
+                self.bot.send_message, player.user_id,
+                f"🎭 **Ваш персонаж:**\n\n{player.get_character_info(show_all=True)}"
+                f"\n\n💡 Используйте кнопки для раскрытия карточек в общем чате."
+            )
+            for player in players
+        })
 
-        for player in game.players.values():
+        for player in players:
+            delivery = deliveries[player.user_id]
+            if delivery.ok:
+                continue
+
+            if delivery.blocked:
+                logger.warning(f"Игрок {player.user_id} не начал ЛС с ботом или заблокировал его")
+            else:
+                logger.warning(f"Не удалось отправить персонажа в ЛС {player.user_id}: {delivery.error}")
             try:
-                character_text = f"🎭 **Ваш персонаж:**\n\n"
+                mention = f"@{player.username}" if player.username else player.first_name
+                character_text = f"🎭 **Персонаж для {mention}:**\n\n"
                 character_text += player.get_character_info(show_all=True)
-                character_text += f"\n\n💡 Используйте кнопки для раскрытия карточек в общем чате."
+                self.bot.send_message(chat_id, character_text)
+            except Exception as e2:
+                logger.error(f"Ошибка отправки персонажа в чат: {e2}")
 
-                self.bot.send_message(player.user_id, character_text)
-            except Exception as e:
-                # Если не можем отправить в ЛС, отправляем в общий чат
-                logger.warning(f"Не удалось отправить персонажа в ЛС {player.user_id}: {e}")
-                try:
-                    mention = f"@{player.username}" if player.username else player.first_name
-                    character_text = f"🎭 **Персонаж для {mention}:**\n\n"
-                    character_text += player.get_character_info(show_all=True)
-                    self.bot.send_message(chat_id, character_text)
-                except Exception as e2:
-                    logger.error(f"Ошибка отправки персонажа в чат: {e2}")
-
-    def _send_voting_results(self, chat_id: int):
+    def _send_voting_results(self, chat_id: int, allow_revote: bool = True):
         """Отправляет результаты голосования с логикой переголосования"""
         if chat_id not in self.games:
             return
@@ -691,7 +1063,9 @@ class GameManager:
         max_votes = max(voted_results.values())
         tied_players = [uid for uid, votes in voted_results.items() if votes == max_votes]
 
-        if len(tied_players) > 1:
+        if len(tied_players) > 1 and not allow_revote:
+            results_text += "\n🤝 Снова ничья - в этот раз никто не исключен."
+        elif len(tied_players) > 1:
             # Переголосование
             results_text += f"\n🔄 **ПЕРЕГОЛОСОВАНИЕ!**\nРавное количество голосов. Голосование только между:"
             for uid in tied_players:
@@ -750,20 +1124,50 @@ class GameManager:
     def on_phase_timeout(self, chat_id: int, phase: str):
         """Обработчик истечения времени фазы"""
         try:
-            logger.info(f"Таймаут фазы {phase} в чате {chat_id}")
-
-            if phase == "role_study":
-                threading.Timer(5, self._start_discussion_phase, args=[chat_id]).start()
-            elif phase == "discussion":
-                threading.Timer(5, self._start_voting_phase, args=[chat_id]).start()
-            elif phase == "voting":
-                threading.Timer(5, self._start_results_phase, args=[chat_id]).start()
-            elif phase == "results":
-                threading.Timer(5, self._start_discussion_phase, args=[chat_id]).start()
-
+            logger.info("Таймаут фазы %s в чате %s", phase, chat_id)
+            self._advance_phase(chat_id, phase)
         except Exception as e:
             logger.error(f"Ошибка в обработчике таймаута: {e}")
 
+    def check_voting_complete(self, chat_id: int) -> bool:
+        """Завершает голосование досрочно, если все живые игроки проголосовали или воздержались"""
+        game = self.games.get(chat_id)
+        if not game or game.phase != GamePhase.VOTING:
+            return False
+
+        if not all(player.has_voted for player in game.get_alive_players()):
+            return False
+
+        # Таймер фазы - верхняя граница: если он уже сработал, переход идет оттуда
+        if not self.phase_timer.stop_phase_timer(chat_id, "voting"):
+            return False
+
+        logger.info("Все проголосовали, голосование в чате %s завершено досрочно", chat_id)
+        self._advance_phase(chat_id, "voting")
+        return True
+
+    def _advance_phase(self, chat_id: int, phase: str):
+        """Переходит к следующей фазе: сразу, а если в чат еще досылаются
+        сообщения - после паузы PHASE_HOP"""
+        if phase == "role_study":
+            next_step = functools.partial(self._start_card_reveal_phase, card_number=1)
+        elif phase == "voting":
+            next_step = self._start_results_phase
+        elif phase == "results":
+            next_step = self._handle_results_end
+        else:
+            logger.warning(f"Нет перехода из фазы {phase}")
+            return
+
+        delay = GAME_SETTINGS['PHASE_HOP'] if self._has_pending_messages(chat_id) else 0
+        # Через таймер чата: переход не держит поток колбэка и снимается stop_chat_timers
+        self.phase_timer.timer.start_timer(f"phase_{chat_id}_next", delay, next_step, chat_id)
+
+    def _has_pending_messages(self, chat_id: int) -> bool:
+        """Есть ли несделанные отложенные обновления в чате"""
+        return bool(self.board and self.board.updates.is_pending(chat_id))
+
+    @traced()
     def vote_player(self, chat_id: int, voter_id: int, target_id: int) -> bool:
         """Игрок голосует против другого игрока"""
         if chat_id not in self.games:
@@ -774,7 +1178,7 @@ class GameManager:
         if game.phase != GamePhase.VOTING:
             return False
 
-        if voter_id not in game.players or target_id not in game.players:
+        if voter_id not in game.players or target_id not in game.players or voter_id == target_id:
             return False
 
         voter = game.players[voter_id]
@@ -783,16 +1187,35 @@ class GameManager:
         if not voter.is_alive or not target.is_alive:
             return False
 
-        return voter.vote(target_id)
+        if game.is_revoting and target_id not in game.revote_candidates:
+            return False
 
         success = voter.vote(target_id)
 
         if success:
             # ДОБАВЛЕНО: автосохранение после голосования
-            self.save_player_cards(chat_id)
+            self.save_player_cards(chat_id, voter_id)
 
         return success
 
+    @traced()
+    def abstain_player(self, chat_id: int, user_id: int) -> bool:
+        """Игрок воздерживается: голос учтен, но без цели"""
+        if chat_id not in self.games:
+            return False
+
+        game = self.games[chat_id]
+        player = game.players.get(user_id)
+
+        if game.phase != GamePhase.VOTING or not player or not player.is_alive or player.has_voted:
+            return False
+
+        player.has_voted = True
+        player.vote_target = None
+        self.save_player_cards(chat_id, user_id)
+        return True
+
+    @traced()
     def reveal_card(self, chat_id: int, user_id: int, card_type: str) -> bool:
         """Игрок раскрывает карточку"""
         if chat_id not in self.games:
@@ -818,12 +1241,14 @@ class GameManager:
         success = game.players[user_id].reveal_card(card_type)
 
         if success:
+            game.reveal_log.append((user_id, card_type, game.current_card_phase, time.time()))
+
             # ИЗМЕНЕНО: отмечаем что игрок завершил ход в этой фазе
             player = game.players[user_id]
             setattr(player, f'turn_completed_phase_{game.current_card_phase}', True)
 
-            # Сохраняем изменения
-            self.save_player_cards(chat_id)
+            # Сохраняем изменения (раскрытие меняет только этого игрока)
+            self.save_player_cards(chat_id, user_id)
 
             # Останавливаем таймер хода
             timer_id = f"turn_{chat_id}_{user_id}"
@@ -883,12 +1308,17 @@ class GameManager:
     # Методы для управления карточками админом
     def add_card(self, category: str, card_text: str) -> bool:
         """Добавляет карточку в категорию"""
+        if self.cards_read_only:
+            logger.warning("Карточки доступны только для чтения (многопроцессный режим)")
+            return False
+
         try:
             if category not in self.cards_data:
                 self.cards_data[category] = []
 
             if card_text not in self.cards_data[category]:
                 self.cards_data[category].append(card_text)
+                self._refresh_alias_table(category)
                 self._save_cards_category(category, self.cards_data[category])
                 return True
 
@@ -899,9 +1329,14 @@ class GameManager:
 
     def remove_card(self, category: str, card_text: str) -> bool:
         """Удаляет карточку из категории"""
+        if self.cards_read_only:
+            logger.warning("Карточки доступны только для чтения (многопроцессный режим)")
+            return False
+
         try:
             if category in self.cards_data and card_text in self.cards_data[category]:
                 self.cards_data[category].remove(card_text)
+                self._refresh_alias_table(category)
                 self._save_cards_category(category, self.cards_data[category])
                 return True
         except Exception as e:
@@ -910,39 +1345,24 @@ class GameManager:
         return False
 
 
+    def _refresh_alias_table(self, category: str):
+        """Пересобирает таблицу псевдонимов взвешенной категории после правки админом"""
+        if category not in WEIGHTED_CATEGORIES:
+            return
+
+        self.cards_data[category] = normalize_weighted(self.cards_data[category])
+        table = build_alias_table(self.cards_data[category])
+        if table:
+            self.card_alias_tables[category] = table
+        else:
+            self.card_alias_tables.pop(category, None)
+
     def get_cards_list(self, category: str) -> Optional[List[str]]:
         """Возвращает список карточек категории"""
         return self.cards_data.get(category, None)
 
 
-    def _get_voting_phases(self) -> List[str]:
-        """Возвращает фазы с голосованием"""
-        return ["card_reveal_2", "card_reveal_3", "card_reveal_6", "card_reveal_7"]
-
-
-    def _should_have_voting(self, phase: str, player_count: int) -> bool:
-        """Определяет нужно ли голосование в данной фазе"""
-        voting_phases = {
-            "card_reveal_2": True,
-            "card_reveal_3": True,
-            "card_reveal_5": player_count >= 6,
-            "card_reveal_6": player_count >= 8,
-            "card_reveal_7": player_count >= 10,
-        }
-        return voting_phases.get(phase, False)
-
-
-    def _calculate_voting_rounds(self, player_count: int, phase: str) -> int:
-        """Рассчитывает количество раундов голосования"""
-        if phase == "card_reveal_7":
-            if player_count >= 16:
-                return 3
-            elif player_count >= 12:
-                return 2
-            elif player_count >= 10:
-                return 1
-        return 1
-
+    @traced()
     def _start_card_reveal_phase(self, chat_id: int, card_number: int):
         """Начинает фазу раскрытия карточек с поочерёдностью"""
         if chat_id not in self.games:
@@ -976,21 +1396,24 @@ class GameManager:
         keyboard = get_cards_menu_inline_keyboard(chat_id)
 
         try:
-            self._send_message_with_delay_and_image(
+            self._send_game_update(
                 chat_id,
                 message,
                 'card_reveal',  # ключ изображения
+                feed_text=message.split("\n")[0],
                 reply_markup=keyboard,
                 parse_mode='Markdown'
             )
         except Exception as e:
             logger.error(f"Ошибка отправки сообщения фазы: {e}")
 
-        self._update_pin_message(chat_id, message)
+        if not self._board_active(chat_id):
+            self._update_pin_message(chat_id, message)
 
         # Запускаем первый ход
         self._start_next_turn(chat_id, card_number)
 
+    @traced()
     def _start_next_turn(self, chat_id: int, card_number: int):
         """Начинает ход следующего игрока"""
         if chat_id not in self.games:
@@ -1007,9 +1430,11 @@ class GameManager:
 
         card_type = current_card_types.get(card_number, "profession")
 
+        # Ход в фазе один: походивший (в том числе раскрывший другую карточку) больше не ходит
         available_players = []
         for player in alive_players:
-            if (not player.character.revealed_cards.get(card_type, False) and
+            if (not getattr(player, f'turn_completed_phase_{card_number}', False) and
+                    not player.character.revealed_cards.get(card_type, False) and
                     not getattr(player, f'abstained_card_{card_type}', False)):
                 available_players.append(player)
 
@@ -1050,10 +1475,12 @@ class GameManager:
         keyboard = get_cards_menu_inline_keyboard(chat_id)
 
         try:
-            self._send_message_with_delay_and_image(
+            # Текущий ход табло показывает в заголовке, в ленту не пишется
+            self._send_game_update(
                 chat_id,
                 turn_message,
                 None,
+                feed_text="",
                 reply_markup=keyboard,
                 parse_mode='Markdown'
             )
@@ -1085,6 +1512,7 @@ class GameManager:
             card_number
         )
 
+    @traced()
     def _resend_menus_after_voting(self, chat_id: int):
         """Повторно отправляет меню игрокам после голосования"""
         if chat_id not in self.games:
@@ -1092,19 +1520,22 @@ class GameManager:
 
         game = self.games[chat_id]
 
-        for player in game.get_alive_players():
-            try:
-                from keyboards import get_cards_menu_inline_keyboard
-                keyboard = get_cards_menu_inline_keyboard(chat_id)
+        from keyboards import get_cards_menu_inline_keyboard
+        keyboard = get_cards_menu_inline_keyboard(chat_id)
 
-                self.bot.send_message(
-                    player.user_id,
-                    "🎮 **Меню обновлено после голосования**\n\nИспользуйте кнопки для управления карточками:",
-                    reply_markup=keyboard,
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"Ошибка повторной отправки меню игроку {player.user_id}: {e}")
+        deliveries = fan_out({
+            player.user_id: functools.partial(
+                self.bot.send_message, player.user_id,
+                "🎮 **Меню обновлено после голосования**\n\nИспользуйте кнопки для управления карточками:",
+                reply_markup=keyboard,
+                parse_mode='Markdown'
+            )
+            for player in game.get_alive_players()
+        })
+
+        for user_id, delivery in deliveries.items():
+            if not delivery.ok:
+                logger.error(f"Ошибка повторной отправки меню игроку {user_id}: {delivery.error}")
 
     def _check_phase_completion(self, chat_id: int, card_number: int) -> bool:
         """Проверяет завершена ли фаза раскрытия карточек"""
@@ -1127,24 +1558,27 @@ class GameManager:
         # Фаза завершена когда все сделали ход
         return players_completed >= len(alive_players)
 
+    @traced()
     def _handle_card_phase_end(self, chat_id: int, card_number: int):
         """Обрабатывает окончание фазы раскрытия карточки"""
         if chat_id not in self.games:
             return
 
         game = self.games[chat_id]
-        alive_count = len(game.get_alive_players())
-        phase_name = f"card_reveal_{card_number}"
 
-        # Проверяем нужно ли голосование
-        if self._should_have_voting(phase_name, alive_count):
+        # Голосование или следующая карточка - по плану игры
+        self._start_plan_step(chat_id, self.get_game_plan(game).next_step(card_number, game.get_planned_votes()))
+
+    def _start_plan_step(self, chat_id: int, step):
+        """Запускает шаг плана; план окончен или места в бункере заняты - конец игры"""
+        if step is None:
+            self._finish_game(chat_id)
+        elif step[0] == 'voting':
             self._start_voting_phase(chat_id)
+        elif self._check_game_end(chat_id):
+            self._finish_game(chat_id)
         else:
-            # Переходим к следующей карточке или завершаем игру
-            if card_number < 7 and not self._check_game_end(chat_id):
-                self._start_card_reveal_phase(chat_id, card_number + 1)
-            else:
-                self._finish_game(chat_id)
+            self._start_card_reveal_phase(chat_id, step[1])
 
     def _handle_results_end(self, chat_id: int):
         """Обрабатывает окончание фазы результатов"""
@@ -1153,27 +1587,26 @@ class GameManager:
 
         game = self.games[chat_id]
 
-        # Проверяем есть ли переголосование
-        if hasattr(game, 'is_revoting') and game.is_revoting:
-            # Логика переголосования
-            pass
+        if self._check_game_end(chat_id):
+            self._finish_game(chat_id)
+        elif game.is_revoting:
+            # Ничья: голосуем еще раз, только между ничейными
+            self._start_voting_phase(chat_id)
         else:
-            # Переходим к следующей фазе или завершаем игру
-            if self._check_game_end(chat_id):
-                self._finish_game(chat_id)
-            else:
-                next_card = game.current_card_phase + 1
-                if next_card <= 7:
-                    self._start_card_reveal_phase(chat_id, next_card)
-                else:
-                    self._finish_game(chat_id)
+            # Переходим к следующему шагу плана
+            plan = self.get_game_plan(game)
+            self._start_plan_step(chat_id, plan.next_step(game.current_card_phase, game.get_planned_votes()))
 
+    @traced()
     def _handle_turn_timeout(self, chat_id: int, card_number: int):
         """Обрабатывает истечение времени хода с автоматическим раскрытием"""
         if chat_id not in self.games:
             return
 
         game = self.games[chat_id]
+        # Запоздавший таймер прошлой фазы не двигает текущую
+        if game.phase.value != f"card_reveal_{card_number}":
+            return
 
         if game.current_turn_player_id:
             current_player = game.players.get(game.current_turn_player_id)
@@ -1234,7 +1667,7 @@ class GameManager:
                     card_value = card_values.get(card_to_reveal, "Неизвестно")
 
                     try:
-                        self._send_message_with_delay_and_image(
+                        self._send_game_update(
                             chat_id,
                             f"⏱️ Время истекло! Автоматически раскрыта карточка {current_player.get_display_name()}:\n**{card_name}**: {card_value}",
                             'card_reveal',
@@ -1242,13 +1675,15 @@ class GameManager:
                         )
                     except Exception as e:
                         logger.error(f"Ошибка отправки автораскрытия: {e}")
+                    # reveal_card уже передал ход или завершил фазу
+                    return
                 else:
                     # Если нет карточек для раскрытия, просто отмечаем завершение хода
                     setattr(current_player, f'turn_completed_phase_{card_number}', True)
                     self.save_player_cards(chat_id)
 
                     try:
-                        self.bot.send_message(
+                        self._send_game_update(
                             chat_id,
                             f"⏱️ Время истекло! {current_player.get_display_name()} пропустил ход."
                         )
@@ -1280,7 +1715,32 @@ class GameManager:
             except Exception as e:
                 logger.error(f"Ошибка отправки события: {e}")
 
-    def _update_pin_message(self, chat_id: int, new_text: str):
+    def _board_active(self, chat_id: int) -> bool:
+        """Включен ли режим табло и есть ли у игры закреп"""
+        if not self.board:
+            return False
+        game = self.games.get(chat_id)
+        return bool(game and game.pin_message_id)
+
+    def _send_game_update(self, chat_id: int, text: str, image_key: str = None,
+                          feed_text: str = None, **kwargs):
+        """Сообщение о ходе игры в общий чат.
+
+        В режиме табло вместо нового сообщения feed_text (по умолчанию - сам текст
+        в одну строку) попадает в ленту табло, а табло перерисовывается.
+        """
+        if not self._board_active(chat_id):
+            self._send_message_with_delay_and_image(chat_id, text, image_key, **kwargs)
+            return
+
+        if feed_text is None:
+            feed_text = " ".join(text.split())
+        if feed_text:
+            self.games[chat_id].board_feed.append(feed_text)
+        self.board.refresh(chat_id)
+
+    @traced()
+    def _update_pin_message(self, chat_id: int, new_text: str, reply_markup=None):
         """Обновляет закрепленное сообщение"""
         if chat_id not in self.games:
             return
@@ -1288,10 +1748,12 @@ class GameManager:
         game = self.games[chat_id]
         if hasattr(game, 'pin_message_id') and game.pin_message_id:
             try:
-                self.bot.edit_message_text(
+                edit_dedup.edit(
+                    self.bot.edit_message_text,
                     new_text,
                     chat_id,
                     game.pin_message_id,
+                    reply_markup=reply_markup,
                     parse_mode='Markdown'
                 )
             except Exception as e:
@@ -1331,81 +1793,207 @@ class GameManager:
         except Exception as e:
             logger.error(f"Ошибка отправки сводки карт: {e}")
 
-    def save_player_cards(self, chat_id: int):
-        """Сохраняет карточки всех игроков в игре"""
+    def _serialize_player_state(self, player: Player) -> dict:
+        """Состояние игрока для хранилища"""
+        player_data = {
+            'user_id': player.user_id,
+            'username': player.username,
+            'first_name': player.first_name,
+            'is_alive': player.is_alive,
+            'is_admin': player.is_admin,
+            'votes_received': player.votes_received,
+            'has_voted': player.has_voted,
+            'vote_target': player.vote_target,
+            'special_card_used': getattr(player, 'special_card_used', False)
+        }
+
+        if player.character:
+            player_data['character'] = {
+                'profession': player.character.profession,
+                'gender': player.character.gender,
+                'age': player.character.age,
+                'body_type': player.character.body_type,
+                'disease': player.character.disease,
+                'phobia': player.character.phobia,
+                'hobby': player.character.hobby,
+                'fact': player.character.fact,
+                'baggage': player.character.baggage,
+                'special_card': player.character.special_card,
+                'special_card_id': getattr(player.character, 'special_card_id', ''),
+                'revealed_cards': player.character.revealed_cards.copy()
+            }
+
+            # Сохраняем информацию о воздержании
+            for card_type in ['profession', 'biology', 'health', 'phobia', 'hobby', 'fact', 'baggage']:
+                abstain_attr = f'abstained_card_{card_type}'
+                if hasattr(player, abstain_attr):
+                    player_data[abstain_attr] = getattr(player, abstain_attr)
+
+        # Завершенные ходы по фазам раскрытия
+        player_data['turn_completed_phases'] = [
+            phase for phase in range(1, 8) if getattr(player, f'turn_completed_phase_{phase}', False)
+        ]
+
+        return player_data
+
+    def _serialize_game_header(self, game: 'Game') -> dict:
+        """Состояние игры без игроков (достаточно, чтобы другой узел продолжил игру)"""
+        return {
+            'chat_id': game.chat_id,
+            'phase': game.phase.value,
+            'current_card_phase': getattr(game, 'current_card_phase', 1),
+            'admin_id': game.admin_id,
+            'phase_nonce': game.phase_nonce,
+            'scenario': game.scenario,
+            'scenario_description': game.scenario_description,
+            'bunker_info': game.bunker_info,
+            'eliminated_players': list(game.eliminated_players),
+            'winners': list(game.winners),
+            'voting_rounds_left': game.voting_rounds_left,
+            'voting_round': game.voting_round,
+            'lobby_message_id': game.lobby_message_id,
+            'pin_message_id': game.pin_message_id,
+            'revote_candidates': list(game.revote_candidates),
+            'is_revoting': game.is_revoting,
+            'revote_rounds': game.revote_rounds,
+            'first_voting_completed': game.first_voting_completed,
+            'players_order': [player.user_id for player in game.players_order],
+            'current_player_index': game.current_player_index,
+            'current_turn_player_id': game.current_turn_player_id,
+            'menu_sent_to_players': list(game.menu_sent_to_players),
+            'started_at': game.started_at,
+            # Журналы нужны итогам и аналитике, когда игру доигрывает другой узел
+            'vote_log': game.vote_log,
+            'reveal_log': game.reveal_log,
+            'elimination_log': game.elimination_log,
+        }
+
+    def _restore_game(self, game_data: dict) -> 'Game':
+        """Собирает игру из сохраненного состояния"""
+        game = Game(game_data['chat_id'], game_data['admin_id'])
+        game.phase = GamePhase(game_data.get('phase', GamePhase.LOBBY.value))
+        game.phase_nonce = game_data.get('phase_nonce', game.phase_nonce)
+        game.current_card_phase = game_data.get('current_card_phase', 1)
+
+        for field in ('scenario', 'scenario_description', 'bunker_info', 'voting_rounds_left', 'voting_round',
+                      'lobby_message_id', 'pin_message_id', 'is_revoting', 'revote_rounds', 'first_voting_completed',
+                      'current_player_index', 'current_turn_player_id', 'started_at'):
+            if field in game_data:
+                setattr(game, field, game_data[field])
+
+        game.eliminated_players = list(game_data.get('eliminated_players', []))
+        game.winners = list(game_data.get('winners', []))
+        game.revote_candidates = list(game_data.get('revote_candidates', []))
+        game.menu_sent_to_players = set(game_data.get('menu_sent_to_players', []))
+        # В JSON кортежи журналов становятся списками
+        game.vote_log = [tuple(entry) for entry in game_data.get('vote_log', [])]
+        game.reveal_log = [tuple(entry) for entry in game_data.get('reveal_log', [])]
+        game.elimination_log = [tuple(entry) for entry in game_data.get('elimination_log', [])]
+
+        for user_id_str, player_data in game_data.get('players', {}).items():
+            player = Player(int(user_id_str), player_data.get('username'), player_data.get('first_name'))
+            player.is_admin = player_data.get('is_admin', False)
+
+            char_data = player_data.get('character')
+            if char_data:
+                player.character = PlayerCharacter(
+                    profession=char_data.get('profession', ''),
+                    gender=char_data.get('gender', ''),
+                    age=char_data.get('age', 18),
+                    body_type=char_data.get('body_type', ''),
+                    disease=char_data.get('disease', ''),
+                    phobia=char_data.get('phobia', ''),
+                    hobby=char_data.get('hobby', ''),
+                    fact=char_data.get('fact', ''),
+                    baggage=char_data.get('baggage', '')
+                )
+
+            self._apply_player_state(player, player_data)
+            game.players[player.user_id] = player
+
+        # Очередь хранится как user_id, в игре - объекты игроков
+        game.players_order = [game.players[user_id] for user_id in game_data.get('players_order', [])
+                              if user_id in game.players]
+        return game
+
+    def _apply_player_state(self, player: Player, player_data: dict):
+        """Восстанавливает игрока из состояния хранилища"""
+        # Восстанавливаем основные данные
+        player.is_alive = player_data.get('is_alive', True)
+        player.votes_received = player_data.get('votes_received', 0)
+        player.has_voted = player_data.get('has_voted', False)
+        player.vote_target = player_data.get('vote_target')
+        player.special_card_used = player_data.get('special_card_used', False)
+
+        # Восстанавливаем персонажа
+        if 'character' in player_data and player.character:
+            char_data = player_data['character']
+
+            player.character.profession = char_data.get('profession', '')
+            player.character.gender = char_data.get('gender', '')
+            player.character.age = char_data.get('age', 18)
+            player.character.body_type = char_data.get('body_type', '')
+            player.character.disease = char_data.get('disease', '')
+            player.character.phobia = char_data.get('phobia', '')
+            player.character.hobby = char_data.get('hobby', '')
+            player.character.fact = char_data.get('fact', '')
+            player.character.baggage = char_data.get('baggage', '')
+            player.character.special_card = char_data.get('special_card', '')
+
+            if 'special_card_id' in char_data:
+                player.character.special_card_id = char_data['special_card_id']
+
+            if 'revealed_cards' in char_data:
+                player.character.revealed_cards.update(char_data['revealed_cards'])
+
+        # Восстанавливаем информацию о воздержании
+        for card_type in ['profession', 'biology', 'health', 'phobia', 'hobby', 'fact', 'baggage']:
+            abstain_attr = f'abstained_card_{card_type}'
+            if abstain_attr in player_data:
+                setattr(player, abstain_attr, player_data[abstain_attr])
+
+        for phase in player_data.get('turn_completed_phases', []):
+            setattr(player, f'turn_completed_phase_{phase}', True)
+
+    @traced()
+    def save_player_cards(self, chat_id: int, user_id: int = None):
+        """Сохраняет карточки игроков в игре (если указан user_id - только этого игрока)"""
         if chat_id not in self.games:
             return False
 
         try:
             game = self.games[chat_id]
-            game_data = {
-                'chat_id': chat_id,
-                'phase': game.phase.value,
-                'current_card_phase': getattr(game, 'current_card_phase', 1),
-                'players': {}
-            }
-
-            for user_id, player in game.players.items():
-                player_data = {
-                    'user_id': user_id,
-                    'username': player.username,
-                    'first_name': player.first_name,
-                    'is_alive': player.is_alive,
-                    'is_admin': player.is_admin,
-                    'votes_received': player.votes_received,
-                    'has_voted': player.has_voted,
-                    'vote_target': player.vote_target,
-                    'special_card_used': getattr(player, 'special_card_used', False)
-                }
-
-                if player.character:
-                    player_data['character'] = {
-                        'profession': player.character.profession,
-                        'gender': player.character.gender,
-                        'age': player.character.age,
-                        'body_type': player.character.body_type,
-                        'disease': player.character.disease,
-                        'phobia': player.character.phobia,
-                        'hobby': player.character.hobby,
-                        'fact': player.character.fact,
-                        'baggage': player.character.baggage,
-                        'special_card': player.character.special_card,
-                        'special_card_id': getattr(player.character, 'special_card_id', ''),
-                        'revealed_cards': player.character.revealed_cards.copy()
-                    }
-
-                    # Сохраняем информацию о воздержании
-                    for card_type in ['profession', 'biology', 'health', 'phobia', 'hobby', 'fact', 'baggage']:
-                        abstain_attr = f'abstained_card_{card_type}'
-                        if hasattr(player, abstain_attr):
-                            player_data[abstain_attr] = getattr(player, abstain_attr)
+            game_header = self._serialize_game_header(game)
 
-                game_data['players'][str(user_id)] = player_data
+            if user_id is not None and user_id in game.players:
+                self.storage.save_player_state(
+                    chat_id, game_header, user_id, self._serialize_player_state(game.players[user_id])
+                )
+                logger.debug("Карточки игрока %s в чате %s сохранены", user_id, chat_id)
+                return True
 
-            # Сохраняем в файл
-            filename = os.path.join(PLAYER_CARDS_DIR, f'game_{chat_id}.json')
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(game_data, f, ensure_ascii=False, indent=2)
+            game_data = dict(game_header)
+            game_data['players'] = {
+                str(uid): self._serialize_player_state(player) for uid, player in game.players.items()
+            }
+            self.storage.save_game_state(chat_id, game_data)
 
-            logger.info(f"Карточки игроков для чата {chat_id} сохранены")
+            logger.debug("Карточки игроков для чата %s сохранены", chat_id)
             return True
 
         except Exception as e:
             logger.error(f"Ошибка сохранения карточек игроков: {e}")
             return False
 
+    @traced()
     def load_player_cards(self, chat_id: int):
-        """Загружает карточки игроков из файла"""
+        """Загружает карточки игроков из хранилища"""
         try:
-            filename = os.path.join(PLAYER_CARDS_DIR, f'game_{chat_id}.json')
-
-            if not os.path.exists(filename):
+            if chat_id not in self.games:
                 return False
 
-            with open(filename, 'r', encoding='utf-8') as f:
-                game_data = json.load(f)
-
-            if chat_id not in self.games:
+            game_data = self.storage.load_game_state(chat_id)
+            if game_data is None:
                 return False
 
             game = self.games[chat_id]
@@ -1413,45 +2001,10 @@ class GameManager:
             # Восстанавливаем данные игроков
             for user_id_str, player_data in game_data.get('players', {}).items():
                 user_id = int(user_id_str)
-
                 if user_id in game.players:
-                    player = game.players[user_id]
+                    self._apply_player_state(game.players[user_id], player_data)
 
-                    # Восстанавливаем основные данные
-                    player.is_alive = player_data.get('is_alive', True)
-                    player.votes_received = player_data.get('votes_received', 0)
-                    player.has_voted = player_data.get('has_voted', False)
-                    player.vote_target = player_data.get('vote_target')
-                    player.special_card_used = player_data.get('special_card_used', False)
-
-                    # Восстанавливаем персонажа
-                    if 'character' in player_data and player.character:
-                        char_data = player_data['character']
-
-                        player.character.profession = char_data.get('profession', '')
-                        player.character.gender = char_data.get('gender', '')
-                        player.character.age = char_data.get('age', 18)
-                        player.character.body_type = char_data.get('body_type', '')
-                        player.character.disease = char_data.get('disease', '')
-                        player.character.phobia = char_data.get('phobia', '')
-                        player.character.hobby = char_data.get('hobby', '')
-                        player.character.fact = char_data.get('fact', '')
-                        player.character.baggage = char_data.get('baggage', '')
-                        player.character.special_card = char_data.get('special_card', '')
-
-                        if 'special_card_id' in char_data:
-                            player.character.special_card_id = char_data['special_card_id']
-
-                        if 'revealed_cards' in char_data:
-                            player.character.revealed_cards.update(char_data['revealed_cards'])
-
-                    # Восстанавливаем информацию о воздержании
-                    for card_type in ['profession', 'biology', 'health', 'phobia', 'hobby', 'fact', 'baggage']:
-                        abstain_attr = f'abstained_card_{card_type}'
-                        if abstain_attr in player_data:
-                            setattr(player, abstain_attr, player_data[abstain_attr])
-
-            logger.info(f"Карточки игроков для чата {chat_id} загружены")
+            logger.info("Карточки игроков для чата %s загружены", chat_id)
             return True
 
         except Exception as e:
@@ -1459,15 +2012,13 @@ class GameManager:
             return False
 
     def delete_player_cards(self, chat_id: int):
-        """Удаляет файл с карточками игроков"""
+        """Удаляет сохраненные карточки игроков"""
         try:
-            filename = os.path.join(PLAYER_CARDS_DIR, f'game_{chat_id}.json')
-            if os.path.exists(filename):
-                os.remove(filename)
-                logger.info(f"Файл карточек для чата {chat_id} удален")
+            if self.storage.delete_game_state(chat_id):
+                logger.info(f"Карточки для чата {chat_id} удалены")
             return True
         except Exception as e:
-            logger.error(f"Ошибка удаления файла карточек: {e}")
+            logger.error(f"Ошибка удаления карточек: {e}")
             return False
 
     def get_player_by_name(self, chat_id: int, name: str):
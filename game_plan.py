@@ -0,0 +1,138 @@
+# game_plan.py
+"""План игры: расписание фаз, вычисленное один раз при старте.
+
+По числу игроков и описанию бункера собирается список шагов (раскрытия
+карточек и голосования после них), число мест в бункере и оценка длительности.
+Переходы между фазами идут по плану, а не пересчитывают правила на каждом шаге.
+
+Правила - функция "число игроков -> {номер фазы раскрытия: голосований после нее}".
+Другой набор правил - еще одна запись в RULE_SETS (выбирается GAME_SETTINGS['RULE_SET']).
+"""
+import re
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import GAME_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+CARD_PHASES = 7
+
+# ('card_reveal', номер фазы) или ('voting', номер фазы, после которой голосуют)
+Step = Tuple[str, int]
+
+
+def classic_votes(player_count: int) -> Dict[int, int]:
+    """Классические правила: голосования после 2-й и 3-й фаз, в больших играх - чаще"""
+    votes = {2: 1, 3: 1}
+    if player_count >= 6:
+        votes[5] = 1
+    if player_count >= 8:
+        votes[6] = 1
+    if player_count >= 16:
+        votes[7] = 3
+    elif player_count >= 12:
+        votes[7] = 2
+    elif player_count >= 10:
+        votes[7] = 1
+    return votes
+
+
+RULE_SETS: Dict[str, Callable[[int], Dict[int, int]]] = {
+    'classic': classic_votes,
+}
+
+
+def extract_bunker_slots(bunker_info: str) -> int:
+    """Извлекает количество мест в бункере"""
+    match = re.search(r'(\d+)\s+(?:человек|мест)', bunker_info or "")
+    return int(match.group(1)) if match else 1
+
+
+class GamePlan:
+    """Расписание игры для заданного числа игроков"""
+
+    def __init__(self, player_count: int, bunker_slots: int, votes: Dict[int, int],
+                 rule_set: str = 'classic', slots_known: bool = True):
+        self.player_count = player_count
+        self.bunker_slots = bunker_slots
+        self.rule_set = rule_set
+        self.slots_known = slots_known
+
+        self.votes: Tuple[int, ...] = tuple(votes.get(card, 0) for card in range(1, CARD_PHASES + 1))
+        # Сколько голосований проходит до начала фазы (индекс - номер фазы)
+        self._votes_before: List[int] = [0, 0]
+        for card_votes in self.votes:
+            self._votes_before.append(self._votes_before[-1] + card_votes)
+
+        steps: List[Step] = []
+        for card in range(1, CARD_PHASES + 1):
+            steps.append(('card_reveal', card))
+            steps.extend(('voting', card) for _ in range(self.votes_in(card)))
+        self.steps: Tuple[Step, ...] = tuple(steps)
+
+        self.total_votes = self._votes_before[-1]
+        self.expected_duration = self._estimate_duration()
+
+    def votes_in(self, card_number: int) -> int:
+        """Голосований после фазы раскрытия card_number"""
+        return self.votes[card_number - 1] if 1 <= card_number <= CARD_PHASES else 0
+
+    def next_step(self, card_number: int, voting_round: int) -> Optional[Step]:
+        """Шаг после фазы раскрытия card_number (или очередного голосования после нее).
+
+        voting_round - сколько голосований уже прошло за игру. None - план окончен.
+        """
+        done = voting_round - self._votes_before[card_number]
+        if done < self.votes_in(card_number):
+            return 'voting', card_number
+        if card_number < CARD_PHASES:
+            return 'card_reveal', card_number + 1
+        return None
+
+    def _estimate_duration(self) -> int:
+        """Оценка сверху по дедлайнам (сек): каждый ход - до таймаута, каждое
+        голосование исключает одного игрока, игра кончается, когда живых не больше мест"""
+        alive = self.player_count
+        total = 0
+        for kind, _ in self.steps:
+            if alive <= self.bunker_slots:
+                break
+            if kind == 'card_reveal':
+                total += alive * GAME_SETTINGS['TURN_TIMEOUT']
+            else:
+                total += GAME_SETTINGS['VOTING_TIME'] + GAME_SETTINGS['RESULTS_TIME']
+                alive -= 1
+        return total
+
+    def format_preview(self) -> str:
+        """Текст плана для админа"""
+        slots = str(self.bunker_slots) if self.slots_known else f"от {self.bunker_slots} (точно - при старте)"
+        lines = [
+            f"📅 **План игры** ({self.rule_set})",
+            f"👥 Игроков: {self.player_count}",
+            f"🏠 Мест в бункере: {slots}",
+            f"🗳️ Голосований: {self.total_votes}",
+            f"⏱ Не дольше ~{max(1, round(self.expected_duration / 60))} мин",
+            "",
+        ]
+        for card in range(1, CARD_PHASES + 1):
+            card_votes = self.votes_in(card)
+            suffix = f" → голосование x{card_votes}" if card_votes > 1 else (" → голосование" if card_votes else "")
+            lines.append(f"{card}. Раскрытие карточек{suffix}")
+        return "\n".join(lines)
+
+
+def build_game_plan(player_count: int, bunker_info: Optional[str] = None) -> GamePlan:
+    """План по числу игроков и описанию бункера (без описания - до старта, места по минимуму)"""
+    rule_set = GAME_SETTINGS['RULE_SET']
+    rules = RULE_SETS.get(rule_set)
+    if rules is None:
+        logger.warning(f"Неизвестный набор правил {rule_set}, используются classic")
+        rule_set, rules = 'classic', classic_votes
+
+    if bunker_info:
+        return GamePlan(player_count, extract_bunker_slots(bunker_info), rules(player_count), rule_set)
+
+    # Game.generate_scenario дает мест на 1-2 меньше, чем игроков
+    return GamePlan(player_count, max(1, player_count - 2), rules(player_count), rule_set, slots_known=False)
@@ -3,15 +3,30 @@ import logging
 from typing import Dict, Any
 from telebot.types import Message, CallbackQuery
 from game_manager import GamePhase
+import io
+import threading
 import time
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 from keyboards import *
 from config import ADMIN_IDS, ALLOWED_CHAT_ID, MESSAGE_DELAY, BOT_IMAGES
-from config import GAME_SETTINGS
+from config import GAME_SETTINGS, USER_STATE_SETTINGS, PROFILER_SETTINGS, CALLBACK_SETTINGS
+from config import CARD_ANALYTICS_SETTINGS
 from special_cards import get_special_cards, add_special_card, remove_special_card, save_special_cards  # new
 from config import ALLOWED_CHAT_ID
 import game_manager
+from callback_router import CallbackRouter
+from callback_codec import CALLBACK_MARKER, CallbackAction, decode_callback
+from user_state import UserStateStore
+from tracing import trace_entry, tracer
+from profiler import SamplingProfiler
+from timers import Debouncer
+import http_session
+from edit_dedup import edit_dedup
+from game_plan import build_game_plan
+from card_analytics import CARD_TYPE_TITLES, POOL_TITLES
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +37,29 @@ class BotHandlers:
     def __init__(self, bot, game_manager):
         self.bot = bot
         self.game_manager = game_manager
-        self.user_states: Dict[int, Dict[str, Any]] = {}  # Состояния пользователей
+        # Состояния пользователей с TTL и ограничением размера
+        self.user_states = UserStateStore(
+            ttl=USER_STATE_SETTINGS['TTL'],
+            max_size=USER_STATE_SETTINGS['MAX_SIZE'],
+            sweep_interval=USER_STATE_SETTINGS['SWEEP_INTERVAL'],
+            persist_file=USER_STATE_SETTINGS['PERSIST_FILE']
+        )
+        self.user_states.start_sweeper()
+        self.callback_router = self._build_callback_router()
+
+        # Правки сообщения лобби при волне входов сводятся в одну за окно
+        self.lobby_updates = Debouncer(GAME_SETTINGS['LOBBY_UPDATE_DELAY'], self._flush_lobby_status)
+
+        # Конвейер колбэков: подтверждение сразу, работа в отдельном пуле
+        self._callback_executor = ThreadPoolExecutor(
+            max_workers=CALLBACK_SETTINGS['WORKERS'], thread_name_prefix="callback"
+        )
+        self._traced_dispatch = trace_entry(self.callback_router.dispatch)
+        self._callbacks_in_flight = set()
+        self._callbacks_lock = threading.Lock()
+        # id колбэков, на которые уже ответили (на колбэк можно ответить только раз)
+        self._answered_callbacks = OrderedDict()
+        self._answers_lock = threading.Lock()
 
     def _send_message_with_image(self, chat_id: int, text: str, image_key: str = None, **kwargs):
         """Отправляет сообщение с возможным изображением БЕЗ задержки (для команд)"""
@@ -51,23 +88,28 @@ class BotHandlers:
     def register_handlers(self):
         """Регистрирует обработчики"""
 
-        # Команды
-        self.bot.message_handler(commands=['start'])(self.start_command)
-        self.bot.message_handler(commands=['help'])(self.help_command)
-        self.bot.message_handler(commands=['game'])(self.game_command)
-        self.bot.message_handler(commands=['admin'])(self.admin_command)
-        self.bot.message_handler(commands=['stop'])(self.stop_command)
+        # Команды (каждый обработчик продолжает трассу, начатую в middleware)
+        self.bot.message_handler(commands=['start'])(trace_entry(self.start_command))
+        self.bot.message_handler(commands=['help'])(trace_entry(self.help_command))
+        self.bot.message_handler(commands=['game'])(trace_entry(self.game_command))
+        self.bot.message_handler(commands=['admin'])(trace_entry(self.admin_command))
+        self.bot.message_handler(commands=['stop'])(trace_entry(self.stop_command))
+        self.bot.message_handler(commands=['traces'])(trace_entry(self.traces_command))
+        self.bot.message_handler(commands=['profile'])(trace_entry(self.profile_command))
+        self.bot.message_handler(commands=['plan'])(trace_entry(self.plan_command))
+        self.bot.message_handler(commands=['lastgame'])(trace_entry(self.last_game_command))
 
         # НОВЫЕ КОМАНДЫ:
-        self.bot.message_handler(commands=['begin', 'startgame'])(self.begin_game_command)
-        self.bot.message_handler(commands=['end', 'endgame'])(self.end_game_command)
-        self.bot.message_handler(commands=['leave'])(self.leave_game_command)
+        self.bot.message_handler(commands=['begin', 'startgame'])(trace_entry(self.begin_game_command))
+        self.bot.message_handler(commands=['end', 'endgame'])(trace_entry(self.end_game_command))
+        self.bot.message_handler(commands=['leave'])(trace_entry(self.leave_game_command))
 
         # Колбэки
+        # Трасса активируется в пуле колбэков, где идет основная работа
         self.bot.callback_query_handler(func=lambda call: True)(self.callback_handler)
 
         # Текстовые сообщения
-        self.bot.message_handler(content_types=['text'])(self.text_handler)
+        self.bot.message_handler(content_types=['text'])(trace_entry(self.text_handler))
 
     def begin_game_command(self, message: Message):
         """Обработчик команды /begin (начать игру)"""
@@ -186,7 +228,7 @@ class BotHandlers:
                 else:
                     # ИСПРАВЛЕНО: обновляем только если есть сохраненный ID
                     if hasattr(game, 'lobby_message_id') and game.lobby_message_id:
-                        self._send_lobby_status(chat_id, game.lobby_message_id)
+                        self._schedule_lobby_status(chat_id)
             else:
                 self.bot.send_message(chat_id, "❌ Ошибка при выходе из игры.")
 
@@ -222,10 +264,7 @@ class BotHandlers:
             welcome_text += "кто достоин попасть в бункер после апокалипсиса.\n\n"
             welcome_text += "Выберите действие:"
 
-            keyboard = get_main_menu()
-
-            if message.from_user.id in ADMIN_IDS:
-                keyboard.add(InlineKeyboardButton("👑 Админ панель", callback_data="admin_panel"))
+            keyboard = get_main_menu(is_admin=message.from_user.id in ADMIN_IDS)
 
             self._send_message_with_image(
                 message.chat.id,
@@ -279,23 +318,6 @@ class BotHandlers:
         # Отправляем меню карточек только если очередь игрока
         self._send_cards_menu_to_private(user_id, chat_id)
 
-    def _handle_card_reveal_timeout(self, chat_id: int, card_number: int):
-        """Обрабатывает истечение времени на раскрытие карты"""
-        if chat_id not in self.games:
-            return
-
-        game = self.games[chat_id]
-
-        # Переходим к следующему игроку
-        game.current_player_index += 1
-
-        if game.current_player_index >= len(game.players_order):
-            # Все игроки прошли - завершаем фазу
-            self._handle_card_phase_end(chat_id, card_number)
-        else:
-            # Продолжаем с следующим игроком
-            self._start_card_reveal_phase(chat_id, card_number)
-
     def _send_cards_menu_to_private(self, user_id: int, chat_id: int):
         """Отправляет меню управления карточками в ЛС"""
         if chat_id not in self.game_manager.games:
@@ -307,9 +329,9 @@ class BotHandlers:
         if not player:
             return
 
-        # Передаем текущую фазу
-        current_phase = game.phase.value if hasattr(game, 'phase') else None
-        keyboard = get_private_character_keyboard(player, current_phase)
+        # Кнопки несут чат и фазу игры
+        current_phase = game.phase.value
+        keyboard = get_private_character_keyboard(player, game)
 
         if current_phase == "card_reveal_1":
             cards_text = "🎴 **Ваша очередь! Фаза раскрытия профессий**\n\n"
@@ -318,14 +340,6 @@ class BotHandlers:
             cards_text = "🃏 **Ваша очередь! Управление карточками**\n\n"
             cards_text += "Выберите карточку для раскрытия в игре:"
 
-        # Сохраняем информацию о чате
-        if not hasattr(self, 'user_states'):
-            self.user_states = {}
-
-        if user_id not in self.user_states:
-            self.user_states[user_id] = {}
-        self.user_states[user_id]['cards_chat'] = chat_id
-
         self.bot.send_message(
             user_id,
             cards_text,
@@ -388,15 +402,14 @@ class BotHandlers:
 
         game = self.game_manager.games[chat_id]
 
-        # Создаем список живых игроков (кроме самого голосующего)
-        alive_players = [p for p in game.get_alive_players() if p.user_id != user_id]
+        # Создаем список живых игроков (кроме самого голосующего, при переголосовании - только ничейных)
+        alive_players = [p for p in game.get_vote_candidates() if p.user_id != user_id]
 
         if not alive_players:
             self.bot.send_message(user_id, "❌ Нет игроков для голосования")
             return
 
-        from keyboards import get_private_voting_keyboard  # Добавить импорт
-        keyboard = get_private_voting_keyboard(alive_players, user_id)
+        keyboard = get_private_voting_keyboard(alive_players, user_id, chat_id, game.phase_nonce)
 
         voting_text = f"🗳️ **ГОЛОСОВАНИЕ**\n\n"
         voting_text += f"Выберите игрока, которого хотите **ИСКЛЮЧИТЬ** из бункера:\n\n"
@@ -404,14 +417,6 @@ class BotHandlers:
         for player in alive_players:
             voting_text += f"👤 {player.get_display_name()}\n"
 
-        # Сохраняем информацию о голосовании
-        if not hasattr(self, 'user_states'):
-            self.user_states = {}
-
-        if user_id not in self.user_states:
-            self.user_states[user_id] = {}
-        self.user_states[user_id]['voting_chat'] = chat_id
-
         self.bot.send_message(
             user_id,
             voting_text,
@@ -429,6 +434,8 @@ class BotHandlers:
     /begin - Начать созданную игру (админ)
     /end - Досрочно завершить игру (админ)
     /leave - Покинуть игру (только до начала)
+    /plan - План игры: фазы и голосования (админ игры)
+    /lastgame - Итоги последней игры в чате
     /help - Эта справка
     /admin - Панель администратора (только для админа бота)
 
@@ -489,7 +496,7 @@ class BotHandlers:
                     # ИСПРАВЛЕНО: редактируем существующее сообщение лобби
                     game = self.game_manager.games[chat_id]
                     if hasattr(game, 'lobby_message_id') and game.lobby_message_id:
-                        self._send_lobby_status(chat_id, game.lobby_message_id)
+                        self._schedule_lobby_status(chat_id)
                 else:
                     self.bot.send_message(
                         chat_id,
@@ -546,6 +553,139 @@ class BotHandlers:
         except Exception as e:
             logger.error(f"Ошибка в admin_command: {e}")
 
+    def traces_command(self, message: Message):
+        """Обработчик команды /traces [N] - самые медленные недавние трассы"""
+        try:
+            if message.from_user.id not in ADMIN_IDS:
+                self.bot.send_message(message.chat.id, "❌ У вас нет прав администратора.")
+                return
+
+            parts = message.text.split()
+            limit = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 5
+
+            slowest = tracer.get_slowest(min(limit, 20))
+            if not slowest:
+                self.bot.send_message(message.chat.id, "🧵 Трасс пока нет.")
+                return
+
+            text = (f"🧵 Самые медленные трассы (всего {tracer.finished}, "
+                    f"медленнее {tracer.slow_ms:.0f} мс: {tracer.slow})\n\n")
+            text += "\n\n".join(trace.format() for trace in slowest)
+
+            # Без Markdown: в именах спанов есть подчеркивания
+            self.bot.send_message(message.chat.id, text[:4000], parse_mode=None)
+
+        except Exception as e:
+            logger.error(f"Ошибка в traces_command: {e}")
+
+    def profile_command(self, message: Message):
+        """Обработчик команды /profile [сек] - сэмплирующий профиль всех потоков"""
+        try:
+            if message.from_user.id not in ADMIN_IDS:
+                self.bot.send_message(message.chat.id, "❌ У вас нет прав администратора.")
+                return
+
+            parts = message.text.split()
+            seconds = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 10
+            seconds = max(1, min(seconds, PROFILER_SETTINGS['MAX_SECONDS']))
+
+            self.bot.send_message(message.chat.id, f"⏱ Профилирование {seconds} сек...")
+
+            # Сэмплирование идет в отдельном потоке, чтобы не занимать поток пула на все окно
+            threading.Thread(
+                target=self._run_profile, args=(message.chat.id, seconds),
+                name="profiler", daemon=True
+            ).start()
+
+        except Exception as e:
+            logger.error(f"Ошибка в profile_command: {e}")
+
+    def _run_profile(self, chat_id: int, seconds: int):
+        """Снимает профиль и отправляет таблицу функций и collapsed-стеки"""
+        try:
+            result = SamplingProfiler(interval=PROFILER_SETTINGS['INTERVAL']).profile(seconds)
+        except RuntimeError as e:
+            self.bot.send_message(chat_id, f"❌ {e}.")
+            return
+        except Exception as e:
+            logger.error(f"Ошибка профилирования: {e}")
+            return
+
+        try:
+            # Без Markdown: в именах функций есть подчеркивания
+            self.bot.send_message(chat_id, result.format_table(PROFILER_SETTINGS['TOP'])[:4000], parse_mode=None)
+
+            if result.samples:
+                document = io.BytesIO(result.collapsed().encode('utf-8'))
+                document.name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+                self.bot.send_document(
+                    chat_id, document,
+                    caption="🔥 Стеки для flamegraph.pl / speedscope"
+                )
+        except Exception as e:
+            logger.error(f"Ошибка отправки профиля: {e}")
+
+    def plan_command(self, message: Message):
+        """Обработчик команды /plan - расписание фаз игры (в лобби - предварительное)"""
+        try:
+            chat_id = message.chat.id
+            user_id = message.from_user.id
+
+            if chat_id not in self.game_manager.games:
+                self.bot.send_message(chat_id, "❌ Нет активной игры в этом чате.")
+                return
+
+            game = self.game_manager.games[chat_id]
+
+            if user_id != game.admin_id and user_id not in ADMIN_IDS:
+                self.bot.send_message(chat_id, "❌ План игры доступен только админу игры.")
+                return
+
+            if game.phase == GamePhase.LOBBY:
+                plan = build_game_plan(len(game.players))
+            else:
+                plan = self.game_manager.get_game_plan(game)
+
+            self.bot.send_message(chat_id, plan.format_preview(), parse_mode='Markdown')
+
+        except Exception as e:
+            logger.error(f"Ошибка в plan_command: {e}")
+
+    def last_game_command(self, message: Message):
+        """Обработчик команды /lastgame - сводка последней завершенной игры в чате"""
+        try:
+            chat_id = message.chat.id
+            summary = self.game_manager.archive.get_last(chat_id)
+            if not summary:
+                self.bot.send_message(chat_id, "❌ В этом чате еще нет завершенных игр.")
+                return
+
+            self.bot.send_message(chat_id, self._format_game_summary(summary), parse_mode='Markdown')
+
+        except Exception as e:
+            logger.error(f"Ошибка в last_game_command: {e}")
+
+    def _format_game_summary(self, summary) -> str:
+        """Текст сводки завершенной игры: сценарий, попавшие в бункер, исключенные, раскрытые карточки"""
+        finished = time.strftime('%d.%m %H:%M', time.localtime(summary.finished_at))
+        text = f"🗄️ **Последняя игра** ({finished}, игроков: {summary.player_count})\n\n"
+        if summary.scenario:
+            text += f"🌍 {summary.scenario}\n\n"
+
+        winners = ", ".join(name for _, name in summary.winners) or "никто"
+        text += f"🏆 В бункер попали: {winners}"
+        if summary.eliminated:
+            text += "\n💀 Исключены: " + ", ".join(name for _, name in summary.eliminated)
+
+        reveals = [(name, cards) for _, name, cards in summary.reveals if cards]
+        if reveals:
+            text += "\n\n🎴 **Раскрытые карточки:**"
+            for name, cards in reveals:
+                text += f"\n• {name}: " + "; ".join(
+                    f"{CARD_TYPE_TITLES.get(card_type, card_type)} - {value}" for card_type, value in cards
+                )
+        return text
+
     def stop_command(self, message: Message):
         """Обработчик команды /stop"""
         try:
@@ -574,89 +714,96 @@ class BotHandlers:
         except Exception as e:
             logger.error(f"Ошибка в stop_command: {e}")
 
+    def _build_callback_router(self) -> CallbackRouter:
+        """Строит таблицу маршрутов колбэков"""
+        router = CallbackRouter()
+
+        # Игровые действия (самые частые): закодированные кнопки с игрой и фазой
+        router.prefix(CALLBACK_MARKER + CallbackAction.VOTE, self._handle_vote, name="vote")
+        router.prefix(CALLBACK_MARKER + CallbackAction.ABSTAIN, self._handle_abstain, name="abstain")
+        router.prefix(CALLBACK_MARKER + CallbackAction.REVEAL, self._handle_reveal_card, name="reveal")
+        router.prefix(CALLBACK_MARKER + CallbackAction.SPECIAL, self._handle_use_special_card, name="special")
+        router.prefix(CALLBACK_MARKER, self._handle_stale_callback, name="encoded_unknown")
+        router.exact("start_voting", self._handle_start_voting)
+        router.exact("reveal_special_card", self._handle_reveal_special_card)
+
+        # Кнопки старого формата без игры и фазы
+        router.prefix("vote_", self._handle_stale_callback, name="legacy_vote")
+        router.exact("abstain", self._handle_stale_callback, name="legacy_abstain")
+        router.prefix("reveal_", self._handle_stale_callback, name="legacy_reveal")
+        router.exact("use_special_card", self._handle_stale_callback, name="legacy_special")
+        router.exact("manage_cards", self._handle_manage_cards)
+        router.exact("show_my_character", self._handle_show_character)
+        router.exact("show_game_players", self._handle_show_game_players)
+
+        # Лобби
+        router.exact("join_game", self._handle_join_game)
+        router.exact("start_game", self._handle_start_game)
+        router.exact("leave_game", self._handle_leave_game)
+        router.exact("show_players", self._handle_show_players)
+        router.exact("game_settings", self._handle_game_settings)
+
+        # Основное меню
+        router.exact("create_game", self._handle_create_game)
+        router.exact("rules", self._handle_rules)
+        router.exact("about", self._handle_about)
+        router.exact("back", self._handle_back)
+
+        # Админ панель
+        router.exact("admin_panel", self._handle_admin_panel)
+        router.exact("admin_cards", self._handle_admin_cards)
+        router.exact("edit_special", self._handle_edit_special_cards)
+        router.exact("admin_stats", self._handle_admin_stats)
+        router.exact("admin_back", self._handle_admin_panel)
+
+        # Управление карточками
+        router.prefix("edit_", self._handle_edit_cards)
+        router.prefix("add_", self._handle_add_card)
+        router.prefix("remove_", self._handle_remove_card)
+        router.prefix("show_", self._handle_show_cards)
+
+        # Подтверждения
+        router.prefix("confirm_", self._handle_confirm)
+        router.prefix("cancel_", self._handle_cancel)
+
+        return router
+
     def callback_handler(self, call: CallbackQuery):
-        """Основной обработчик колбэков"""
+        """Основной обработчик колбэков: работа уходит в пул колбэков, ответ - сразу.
+
+        Обработчик, успевший за ACK_WAIT, сам отвечает своим тостом; иначе
+        конвейер подтверждает нажатие пустым ответом, чтобы кнопка не крутилась,
+        а работа продолжается в фоне. Повторное нажатие той же кнопки, пока первое
+        обрабатывается, не запускает работу второй раз.
+        """
         try:
-            callback_data = call.data
-            user_id = call.from_user.id
-            chat_id = call.message.chat.id
-            message_id = call.message.message_id
-
-            # Основное меню
-            if callback_data == "create_game":
-                self._handle_create_game(call)
-            elif callback_data == "join_game":
-                self._handle_join_game(call)
-            elif callback_data == "rules":
-                self._handle_rules(call)
-            elif callback_data == "about":
-                self._handle_about(call)
-            elif callback_data == "manage_cards":
-                self._handle_manage_cards(call)
-
-            # Админ панель
-            elif callback_data == "admin_panel":
-                self._handle_admin_panel(call)
-            elif callback_data == "admin_cards":
-                self._handle_admin_cards(call)
-            elif callback_data == "edit_special":
-                self._handle_edit_special_cards(call)
-            elif callback_data == "admin_stats":
-                self._handle_admin_stats(call)
-            elif callback_data == "admin_back":
-                self._handle_admin_panel(call)
-
-            # Управление карточками
-            elif callback_data.startswith("edit_"):
-                self._handle_edit_cards(call)
-            elif callback_data.startswith("add_"):
-                self._handle_add_card(call)
-            elif callback_data.startswith("remove_"):
-                self._handle_remove_card(call)
-            elif callback_data.startswith("show_"):
-                self._handle_show_cards(call)
-
-            # Игровые действия
-            elif callback_data == "start_game":
-                self._handle_start_game(call)
-            elif callback_data == "leave_game":
-                self._handle_leave_game(call)
-            elif callback_data == "show_players":
-                self._handle_show_players(call)
-            elif callback_data == "game_settings":
-                self._handle_game_settings(call)
-
-            # Управление персонажем
-            elif callback_data.startswith("reveal_"):
-                if callback_data == "reveal_special_card":
-                    self._safe_answer_callback(call, "❌ Специальные карточки нельзя раскрывать", show_alert=True)
-                else:
-                    self._handle_reveal_card(call)
-            elif callback_data == "use_special_card":
-                self._handle_use_special_card(call)
-            elif callback_data == "show_my_character":
-                self._handle_show_character(call)
-            elif callback_data == "show_game_players":
-                self._handle_show_game_players(call)
-
-            # Голосование
-            elif callback_data == "start_voting":
-                self._handle_start_voting(call)
-            elif callback_data.startswith("vote_"):
-                if callback_data == "vote_abstain":
-                    self._handle_abstain(call)
+            key = (call.from_user.id, call.message.chat.id if call.message else None,
+                   call.message.message_id if call.message else None, call.data)
+            with self._callbacks_lock:
+                if key in self._callbacks_in_flight:
+                    duplicate = True
                 else:
-                    self._handle_vote(call)
+                    duplicate = False
+                    self._callbacks_in_flight.add(key)
 
-            # Подтверждения
-            elif callback_data.startswith("confirm_"):
-                self._handle_confirm(call)
-            elif callback_data.startswith("cancel_"):
-                self._handle_cancel(call)
+            if duplicate:
+                self._safe_answer_callback(call, "⏳ Уже обрабатывается...")
+                return
+
+            future = self._callback_executor.submit(self._process_callback, call, key)
+            try:
+                future.result(timeout=CALLBACK_SETTINGS['ACK_WAIT'])
+            except FutureTimeoutError:
+                self._safe_answer_callback(call)
+
+        except Exception as e:
+            logger.error(f"Ошибка в callback_handler: {e}")
+            self._safe_answer_callback(call, "❌ Произошла ошибка")
 
-            # Назад
-            elif callback_data == "back":
-                self._handle_back(call)
+    def _process_callback(self, call: CallbackQuery, key: tuple):
+        """Выполняет колбэк в пуле колбэков (трасса из middleware продолжается здесь)"""
+        try:
+            self._traced_dispatch(call)
 
             # Отвечаем на колбэк безопасно
             self._safe_answer_callback(call)
@@ -664,18 +811,51 @@ class BotHandlers:
         except Exception as e:
             logger.error(f"Ошибка в callback_handler: {e}")
             self._safe_answer_callback(call, "❌ Произошла ошибка")
+        finally:
+            with self._callbacks_lock:
+                self._callbacks_in_flight.discard(key)
+
+    def stop_callbacks(self):
+        """Дожидается начатых колбэков, останавливает их пул и дописывает отложенные обновления лобби"""
+        self._callback_executor.shutdown(wait=True)
+        self.lobby_updates.flush_all()
+
+    def _handle_reveal_special_card(self, call: CallbackQuery):
+        """Спецкарточки не раскрываются как обычные карточки"""
+        self._safe_answer_callback(call, "❌ Специальные карточки нельзя раскрывать", show_alert=True)
 
     def _safe_answer_callback(self, call: CallbackQuery, text: str = None, show_alert: bool = False):
         """Безопасная отправка ответа на callback"""
         try:
-            self.bot.answer_callback_query(call.id, text, show_alert)
+            self._answer_callback(call.id, text, show_alert)
         except Exception as e:
             logger.debug(f"Ошибка ответа на callback (игнорируется): {e}")
 
+    def _answer_callback(self, callback_query_id: str, text: str = None, show_alert: bool = None, **kwargs) -> bool:
+        """answer_callback_query, но не больше одного раза на колбэк.
+
+        Конвейер мог уже ответить предварительно, пока обработчик работал:
+        второй ответ Telegram отклонит, поэтому он пропускается.
+        """
+        with self._answers_lock:
+            if callback_query_id in self._answered_callbacks:
+                if text:
+                    logger.debug("Колбэк уже подтвержден, ответ пропущен: %s", text)
+                return False
+            self._answered_callbacks[callback_query_id] = True
+            while len(self._answered_callbacks) > 10000:
+                self._answered_callbacks.popitem(last=False)
+
+        return self.bot.answer_callback_query(callback_query_id, text, show_alert, **kwargs)
+
+    def _edit_message(self, text: str, chat_id: int, message_id: int, **kwargs):
+        """Редактирование сообщения без повторной отправки того же содержимого"""
+        return edit_dedup.edit(self.bot.edit_message_text, text, chat_id, message_id, **kwargs)
+
     def _safe_edit_message(self, chat_id: int, message_id: int, text: str, reply_markup=None, **kwargs):
         """Безопасное редактирование сообщения"""
         try:
-            self.bot.edit_message_text(
+            self._edit_message(
                 text,
                 chat_id,
                 message_id,
@@ -694,75 +874,19 @@ class BotHandlers:
             user_id = message.from_user.id
 
             # Проверяем состояние пользователя
-            if user_id in self.user_states:
-                state = self.user_states[user_id]
-
+            state = self.user_states.get(user_id)
+            if state:
                 if state.get('action') == 'add_card':
                     self._process_add_card(message, state)
                 elif state.get('action') == 'remove_card':
                     self._process_remove_card(message, state)
                 else:
                     # Очищаем неизвестное состояние
-                    del self.user_states[user_id]
+                    self.user_states.pop(user_id)
 
         except Exception as e:
             logger.error(f"Ошибка в text_handler: {e}")
 
-    def _handle_abstain_vote(self, call: CallbackQuery):
-        """Обработка воздержания от голосования"""
-        user_id = call.from_user.id
-
-        if not hasattr(self, 'user_states') or user_id not in self.user_states or 'voting_chat' not in self.user_states[
-            user_id]:
-            self.bot.answer_callback_query(call.id, "❌ Ошибка голосования", show_alert=True)
-            return
-
-        chat_id = self.user_states[user_id]['voting_chat']
-
-        if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Игра не найдена", show_alert=True)
-            return
-
-        game = self.game_manager.games[chat_id]
-        player = game.players.get(user_id)
-
-        if not player or not player.is_alive or player.has_voted:
-            self.bot.answer_callback_query(call.id, "❌ Не можете голосовать", show_alert=True)
-            return
-
-        # Отмечаем как проголосовавшего без цели
-        player.has_voted = True
-        player.vote_target = None
-
-        # Уведомляем пользователя
-        self.bot.edit_message_text(
-            "✅ **Воздержание принято!**\n\nВы воздержались от голосования.",
-            user_id,
-            call.message.message_id,
-            parse_mode='Markdown'
-        )
-
-        # Уведомляем в группе
-        try:
-            alive_players = game.get_alive_players()
-            voted_count = sum(1 for p in alive_players if p.has_voted)
-            voter_name = player.get_display_name()
-
-            self.bot.send_message(
-                chat_id,
-                f"🤐 {voter_name} воздержался ({voted_count}/{len(alive_players)})"
-            )
-        except Exception as e:
-            logger.error(f"Ошибка уведомления в группе: {e}")
-
-        # Очищаем состояние
-        if 'voting_chat' in self.user_states[user_id]:
-            del self.user_states[user_id]['voting_chat']
-            if not self.user_states[user_id]:
-                del self.user_states[user_id]
-
-        self.bot.answer_callback_query(call.id)
-
     # Обработчики конкретных действий
 
     def _handle_create_game(self, call: CallbackQuery):
@@ -785,7 +909,7 @@ class BotHandlers:
         first_name = call.from_user.first_name
 
         if chat_id in self.game_manager.games:
-            self.bot.edit_message_text(
+            self._edit_message(
                 "❌ В этом чате уже есть активная игра!",
                 call.message.chat.id,
                 call.message.message_id
@@ -801,7 +925,7 @@ class BotHandlers:
 
             self._send_lobby_status(chat_id, call.message.message_id)
         else:
-            self.bot.edit_message_text(
+            self._edit_message(
                 "❌ Ошибка создания игры.",
                 call.message.chat.id,
                 call.message.message_id
@@ -810,7 +934,7 @@ class BotHandlers:
     def _handle_join_game(self, call: CallbackQuery):
         """Обработка присоединения к игре"""
         if call.message.chat.type not in ['group', 'supergroup']:
-            self.bot.edit_message_text(
+            self._edit_message(
                 "❌ Нет активной игры в этом чате!",
                 call.message.chat.id,
                 call.message.message_id
@@ -823,7 +947,7 @@ class BotHandlers:
         first_name = call.from_user.first_name
 
         if chat_id not in self.game_manager.games:
-            self.bot.edit_message_text(
+            self._edit_message(
                 "❌ Нет активной игры в этом чате!",
                 call.message.chat.id,
                 call.message.message_id
@@ -836,7 +960,7 @@ class BotHandlers:
                 "🎮 Для участия в игре напишите /start боту в личных сообщениях, если еще не делали этого."
             )
         except Exception:
-            self.bot.answer_callback_query(
+            self._answer_callback(
                 call.id,
                 "❌ Напишите боту /start в личных сообщениях для участия в игре",
                 show_alert=True
@@ -847,13 +971,13 @@ class BotHandlers:
             game = self.game_manager.games[chat_id]
             # ИСПРАВЛЕНО: всегда используем lobby_message_id для редактирования
             if hasattr(game, 'lobby_message_id') and game.lobby_message_id:
-                self._send_lobby_status(chat_id, game.lobby_message_id)
+                self._schedule_lobby_status(chat_id)
             else:
                 # Если нет сохраненного ID, редактируем текущее сообщение
                 game.lobby_message_id = call.message.message_id
                 self._send_lobby_status(chat_id, call.message.message_id)
         else:
-            self.bot.answer_callback_query(
+            self._answer_callback(
                 call.id,
                 "❌ Не удалось присоединиться к игре",
                 show_alert=True
@@ -886,7 +1010,7 @@ class BotHandlers:
 
         keyboard = get_back_keyboard()
 
-        self.bot.edit_message_text(
+        self._edit_message(
             rules_text,
             call.message.chat.id,
             call.message.message_id,
@@ -915,7 +1039,7 @@ class BotHandlers:
 
         keyboard = get_back_keyboard()
 
-        self.bot.edit_message_text(
+        self._edit_message(
             about_text,
             call.message.chat.id,
             call.message.message_id,
@@ -926,13 +1050,13 @@ class BotHandlers:
     def _handle_admin_panel(self, call: CallbackQuery):
         """Админ панель"""
         if call.from_user.id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         admin_text = "👑 **Панель администратора**\n\nВыберите действие:"
         keyboard = get_admin_menu()
 
-        self.bot.edit_message_text(
+        self._edit_message(
             admin_text,
             call.message.chat.id,
             call.message.message_id,
@@ -943,13 +1067,13 @@ class BotHandlers:
     def _handle_admin_cards(self, call: CallbackQuery):
         """Управление карточками"""
         if call.from_user.id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         cards_text = "🃏 **Управление карточками**\n\nВыберите категорию для редактирования:"
         keyboard = get_admin_cards_keyboard()
 
-        self.bot.edit_message_text(
+        self._edit_message(
             cards_text,
             call.message.chat.id,
             call.message.message_id,
@@ -957,19 +1081,58 @@ class BotHandlers:
             parse_mode='Markdown'
         )
 
+    def _format_card_analytics(self, card_analytics) -> str:
+        """Блок аналитики пулов карточек для статистики бота"""
+        min_samples = CARD_ANALYTICS_SETTINGS['MIN_SAMPLES']
+        started = time.perf_counter()
+        win_rates = card_analytics.win_rates('professions', min_samples)
+        early = card_analytics.early_reveals()
+        lift = card_analytics.elimination_lift(min_samples, limit=3)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        stats = card_analytics.get_stats()
+        text = f"\n\n📈 **Пулы карточек:** {stats['games']} игр, выдано карточек {stats['rows']}"
+
+        if win_rates:
+            text += "\n🏆 **Профессии по проценту побед:**"
+            shown = win_rates[:3] + win_rates[3:][-2:]
+            for value, count, win_rate in shown:
+                text += f"\n• {value}: {win_rate:.0%} из {count}"
+
+        if early:
+            text += "\n👀 **До 1-го голосования раскрывают:** " + ", ".join(
+                f"{CARD_TYPE_TITLES.get(card_type, card_type)} {share:.0%}" for card_type, _, share in early[:3]
+            )
+
+        if lift:
+            text += "\n💀 **Чаще исключают с:**"
+            for pool, value, count, rate, ratio in lift:
+                text += f"\n• {POOL_TITLES.get(pool, pool)} {value}: {rate:.0%} (x{ratio:.1f}, из {count})"
+
+        text += f"\n⏱ Посчитано за {elapsed_ms:.0f} мс ({stats['backend']})"
+        return text
+
     def _handle_admin_stats(self, call: CallbackQuery):
         """Статистика бота"""
         if call.from_user.id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         active_games = len(self.game_manager.games)
         total_players = sum(len(game.players) for game in self.game_manager.games.values())
 
+        # Последние завершенные игры узла (полные сводки в чатах - /lastgame)
+        recent_games = "".join(
+            f"\n• {time.strftime('%d.%m %H:%M', time.localtime(summary.finished_at))} чат {summary.chat_id}: "
+            f"игроков {summary.player_count}, в бункере {len(summary.winners)}"
+            for summary in self.game_manager.archive.get_recent(3)
+        )
+
         stats_text = f"""📊 **Статистика бота**
 
 🎮 Активных игр: {active_games}
 👥 Всего игроков онлайн: {total_players}
+🗄️ Завершенных игр в архиве: {len(self.game_manager.archive)} (всего {self.game_manager.archive.total_archived}){recent_games}
 
 📝 **Карточек в базе:**"""
 
@@ -987,9 +1150,69 @@ class BotHandlers:
             name = category_names.get(category, category.title())
             stats_text += f"\n• {name}: {len(cards)}"
 
+        state_stats = self.user_states.get_stats()
+        stats_text += (f"\n\n🧠 **Состояния пользователей:** {state_stats['size']} "
+                       f"(попаданий {state_stats['hits']}, промахов {state_stats['misses']}, "
+                       f"вытеснено {state_stats['evictions']}, истекло {state_stats['expirations']})")
+
+        history = self.game_manager.history
+        if history:
+            try:
+                overview = history.get_overview()
+                stats_text += (f"\n\n📚 **История:** {overview['games']} игр, "
+                               f"ср. длительность {overview['avg_duration'] / 60:.1f} мин, "
+                               f"ср. игроков {overview['avg_players']:.1f}")
+
+                top_players = history.get_top_players()
+                if top_players:
+                    stats_text += "\n🏆 **Лучшие игроки:**"
+                    for name, games, wins, win_rate in top_players:
+                        stats_text += f"\n• {name}: {wins}/{games} ({win_rate:.0%})"
+
+                card_stats = history.get_card_stats('profession')
+                if card_stats:
+                    stats_text += "\n🃏 **Частые профессии:**"
+                    for _, card_value, picks, win_rate in card_stats:
+                        stats_text += f"\n• {card_value}: {picks} раз (побед {win_rate:.0%})"
+            except Exception as e:
+                logger.error(f"Ошибка чтения истории игр: {e}")
+
+        card_analytics = self.game_manager.card_analytics
+        if card_analytics and card_analytics.games:
+            try:
+                stats_text += self._format_card_analytics(card_analytics)
+            except Exception as e:
+                logger.error(f"Ошибка чтения аналитики карточек: {e}")
+
+        if http_session.api_sender:
+            http_stats = http_session.api_sender.get_stats()
+            stats_text += (f"\n\n🌐 **HTTP-пул:** занято {http_stats['in_flight']}/{http_stats['pool_size']} "
+                           f"(пик {http_stats['peak_in_flight']}, соединений {http_stats['connections_opened']}), "
+                           f"повторов {http_stats['retries']}, ошибок {http_stats['errors']}")
+            for kind, count in http_stats['requests'].items():
+                if count:
+                    stats_text += f"\n• {kind}: {count} запросов, ср. {http_stats['avg_ms'][kind]:.0f} мс"
+
+        edit_stats = edit_dedup.get_stats()
+        if edit_stats['saved']:
+            stats_text += (f"\n\n✂️ **Правки без изменений:** пропущено {edit_stats['saved']} "
+                           f"из {edit_stats['saved'] + edit_stats['sent']}")
+
+        if self.game_manager.board:
+            board_stats = self.game_manager.board.get_stats()
+            stats_text += (f"\n\n📌 **Табло:** изменений {board_stats['changes']}, "
+                           f"правок закрепа {board_stats['edits']}")
+
+        slowest_routes = self.callback_router.get_slowest_routes()
+        if slowest_routes:
+            stats_text += "\n\n⏱️ **Самые медленные колбэки (p95):**"
+            for route_name, route_stats in slowest_routes:
+                stats_text += (f"\n• `{route_name}`: {route_stats['p95_ms']:.0f} мс "
+                               f"(ср. {route_stats['avg_ms']:.0f} мс, вызовов {route_stats['calls']})")
+
         keyboard = get_back_keyboard()
 
-        self.bot.edit_message_text(
+        self._edit_message(
             stats_text,
             call.message.chat.id,
             call.message.message_id,
@@ -1002,38 +1225,67 @@ class BotHandlers:
         chat_id = call.message.chat.id
         user_id = call.from_user.id
 
+        # Отложенное обновление лобби не должно затереть сообщение о начале игры
+        lobby_update_pending = self.lobby_updates.cancel(chat_id)
+
         if self.game_manager.start_game(chat_id, user_id):
-            self.bot.edit_message_text(
+            self._edit_message(
                 "🎭 Игра началась! Фаза изучения ролей...",
                 call.message.chat.id,
                 call.message.message_id
             )
         else:
-            self.bot.answer_callback_query(
+            if lobby_update_pending:
+                self._schedule_lobby_status(chat_id)
+            self._answer_callback(
                 call.id,
                 "❌ Не удалось начать игру. Проверьте количество игроков.",
                 show_alert=True
             )
 
+    def _resolve_game_callback(self, call: CallbackQuery):
+        """Раскодирует игровую кнопку и находит её игру. Устаревшие кнопки отклоняются"""
+        payload = decode_callback(call.data)
+        if payload is None:
+            self._handle_stale_callback(call)
+            return None
+
+        game = self.game_manager.games.get(payload.chat_id)
+        if game is None:
+            self._safe_answer_callback(call, "❌ Игра не найдена", show_alert=True)
+            return None
+
+        # Кнопка из прошлой фазы (или прошлой игры в этом чате)
+        if payload.nonce != game.phase_nonce:
+            self._safe_answer_callback(call, "⌛ Кнопка устарела: фаза игры уже сменилась", show_alert=True)
+            return None
+
+        if call.from_user.id not in game.players:
+            self._safe_answer_callback(call, "❌ Вы не участвуете в игре", show_alert=True)
+            return None
+
+        return payload, game
+
+    def _handle_stale_callback(self, call: CallbackQuery):
+        """Кнопки старого формата больше не привязаны к игре"""
+        self._safe_answer_callback(call, "⌛ Кнопка устарела. Откройте меню заново из группы.", show_alert=True)
+
     def _handle_reveal_card(self, call: CallbackQuery):
         """Раскрытие карточки персонажа"""
         user_id = call.from_user.id
 
-        if (not hasattr(self, 'user_states') or
-                user_id not in self.user_states or
-                'cards_chat' not in self.user_states[user_id]):
-            self._safe_answer_callback(call, "❌ Ошибка: чат игры не найден", show_alert=True)
+        resolved = self._resolve_game_callback(call)
+        if not resolved:
             return
 
-        chat_id = self.user_states[user_id]['cards_chat']
-        card_type = call.data.replace("reveal_", "")
+        payload, game = resolved
+        chat_id = payload.chat_id
+        card_type = payload.card_type
 
-        if chat_id not in self.game_manager.games:
-            self._safe_answer_callback(call, "❌ Игра не найдена", show_alert=True)
+        if card_type is None:
+            self._safe_answer_callback(call, "❌ Неизвестная карточка", show_alert=True)
             return
 
-        game = self.game_manager.games[chat_id]
-
         # Проверка очереди
         if hasattr(game,
                    'current_turn_player_id') and game.current_turn_player_id and game.current_turn_player_id != user_id:
@@ -1097,14 +1349,13 @@ class BotHandlers:
                     reveal_text = f"🎴 {player.get_display_name()} раскрыл карточку:\n"
                     reveal_text += f"**{card_name}**: {card_value}"
 
-                    # Отправляем в чат с задержкой
-                    self.game_manager._send_message_with_delay_and_image(
+                    # Отправляем в чат (в режиме табло - на табло)
+                    self.game_manager._send_game_update(
                         chat_id, reveal_text, 'card_reveal', parse_mode='Markdown'
                     )
 
             # ИЗМЕНЕНО: обновляем существующую клавиатуру
-            current_phase = game.phase.value
-            keyboard = get_private_character_keyboard(game.players[user_id], current_phase)
+            keyboard = get_private_character_keyboard(game.players[user_id], game)
 
             success = self._safe_edit_message(
                 user_id,
@@ -1134,32 +1385,20 @@ class BotHandlers:
         """Обработка использования специальной карточки"""
         user_id = call.from_user.id
 
-        # Получаем chat_id из состояния пользователя
-        if (not hasattr(self, 'user_states') or
-                user_id not in self.user_states or
-                'cards_chat' not in self.user_states[user_id]):
-            self.bot.answer_callback_query(call.id, "❌ Ошибка: чат игры не найден", show_alert=True)
-            return
-
-        chat_id = self.user_states[user_id]['cards_chat']
-
-        if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Игра не найдена", show_alert=True)
+        # Игра и фаза зашиты в кнопку
+        resolved = self._resolve_game_callback(call)
+        if not resolved:
             return
 
-        game = self.game_manager.games[chat_id]
-        if user_id not in game.players:
-            self.bot.answer_callback_query(call.id, "❌ Вы не участвуете в игре", show_alert=True)
-            return
-
-        player = game.players[user_id]
+        payload, game = resolved
+        chat_id = payload.chat_id
 
         # Используем специальную карточку
         result = self.game_manager.use_special_card(chat_id, user_id)
 
         if result["success"]:
             # Уведомляем в ЛС
-            self.bot.edit_message_text(
+            self._edit_message(
                 f"✅ {result['message']}",
                 user_id,
                 call.message.message_id,
@@ -1173,21 +1412,22 @@ class BotHandlers:
                 except Exception as e:
                     logger.error(f"Ошибка отправки публичного сообщения: {e}")
 
-            self.bot.answer_callback_query(call.id, "✅ Специальная карточка использована!")
+            self._answer_callback(call.id, "✅ Специальная карточка использована!")
         else:
-            self.bot.answer_callback_query(call.id, f"❌ {result['message']}", show_alert=True)
+            self._answer_callback(call.id, f"❌ {result['message']}", show_alert=True)
 
     def _handle_vote(self, call: CallbackQuery):
         """Обработка голосования"""
         user_id = call.from_user.id
 
-        # Получаем chat_id из состояния пользователя
-        if user_id not in self.user_states or 'voting_chat' not in self.user_states[user_id]:
-            self.bot.answer_callback_query(call.id, "❌ Ошибка голосования", show_alert=True)
+        # Игра, фаза и цель зашиты в кнопку
+        resolved = self._resolve_game_callback(call)
+        if not resolved:
             return
 
-        chat_id = self.user_states[user_id]['voting_chat']
-        target_id = int(call.data.replace("vote_", ""))
+        payload, game = resolved
+        chat_id = payload.chat_id
+        target_id = payload.target
 
         if self.game_manager.vote_player(chat_id, user_id, target_id):
             # Получаем имя цели
@@ -1198,7 +1438,7 @@ class BotHandlers:
                     target_name = game.players[target_id].get_display_name()
 
             # Уведомляем в ЛС
-            self.bot.edit_message_text(
+            self._edit_message(
                 f"✅ **Голос принят!**\n\nВы проголосовали против: {target_name}\n\nВернитесь в группу и дождитесь окончания голосования.",
                 user_id,
                 call.message.message_id,
@@ -1220,13 +1460,10 @@ class BotHandlers:
             except:
                 pass
 
-            # Очищаем состояние
-            if 'voting_chat' in self.user_states[user_id]:
-                del self.user_states[user_id]['voting_chat']
-
-            self.bot.answer_callback_query(call.id)
+            self.game_manager.check_voting_complete(chat_id)
+            self._answer_callback(call.id)
         else:
-            self.bot.answer_callback_query(
+            self._answer_callback(
                 call.id,
                 "❌ Не удалось проголосовать",
                 show_alert=True
@@ -1252,7 +1489,7 @@ class BotHandlers:
             voting_text += f"Проголосовало: {voted_count}/{len(alive_players)}\n\n"
             voting_text += "Используйте кнопки для голосования против игроков."
 
-            self.bot.edit_message_text(
+            self._edit_message(
                 voting_text,
                 chat_id,
                 message.message_id,
@@ -1269,12 +1506,9 @@ class BotHandlers:
         welcome_text += "кто достоин попасть в бункер после апокалипсиса.\n\n"
         welcome_text += "Выберите действие:"
 
-        keyboard = get_main_menu()
-
-        if call.from_user.id in ADMIN_IDS:
-            keyboard.add(InlineKeyboardButton("👑 Админ панель", callback_data="admin_panel"))
+        keyboard = get_main_menu(is_admin=call.from_user.id in ADMIN_IDS)
 
-        self.bot.edit_message_text(
+        self._edit_message(
             welcome_text,
             call.message.chat.id,
             call.message.message_id,
@@ -1288,20 +1522,20 @@ class BotHandlers:
         user_id = call.from_user.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет активной игры", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
 
         if user_id not in game.players:
-            self.bot.answer_callback_query(call.id, "❌ Вы не участвуете в игре", show_alert=True)
+            self._answer_callback(call.id, "❌ Вы не участвуете в игре", show_alert=True)
             return
 
         # Удаляем игрока
         if self.game_manager.leave_game(chat_id, user_id):
             player_name = game.players[user_id].get_display_name() if user_id in game.players else "Игрок"
 
-            self.bot.answer_callback_query(call.id, "✅ Вы покинули игру")
+            self._answer_callback(call.id, "✅ Вы покинули игру")
 
             # Если это был админ или осталось мало игроков
             if user_id == game.admin_id or len(game.players) < GAME_SETTINGS['MIN_PLAYERS']:
@@ -1311,9 +1545,12 @@ class BotHandlers:
                 self._send_message_with_image(chat_id, "❌ Игра завершена из-за выхода игроков." 'game_end')
             else:
                 self.bot.send_message(chat_id, f"👋 {player_name} покинул игру")
-                self._send_lobby_status(chat_id)
+                if getattr(game, 'lobby_message_id', None):
+                    self._schedule_lobby_status(chat_id)
+                else:
+                    self._send_lobby_status(chat_id)
         else:
-            self.bot.answer_callback_query(call.id, "❌ Ошибка при выходе из игры")
+            self._answer_callback(call.id, "❌ Ошибка при выходе из игры")
 
     def _handle_show_players(self, call: CallbackQuery):
         """Показ списка игроков"""
@@ -1322,9 +1559,9 @@ class BotHandlers:
         players_info = self.game_manager.get_players_list(chat_id)
 
         if players_info:
-            self.bot.answer_callback_query(call.id, players_info, show_alert=True)
+            self._answer_callback(call.id, players_info, show_alert=True)
         else:
-            self.bot.answer_callback_query(call.id, "❌ Нет информации об игроках", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет информации об игроках", show_alert=True)
 
     def _handle_game_settings(self, call: CallbackQuery):
         """Настройки игры"""
@@ -1332,13 +1569,13 @@ class BotHandlers:
         user_id = call.from_user.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет активной игры", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
 
         if user_id != game.admin_id:  # Изменено с game.ADMIN_IDS на game.admin_id
-            self.bot.answer_callback_query(call.id, "❌ Только админ может изменять настройки", show_alert=True)
+            self._answer_callback(call.id, "❌ Только админ может изменять настройки", show_alert=True)
             return
 
         settings_text = f"""⚙️ **Настройки игры:**
@@ -1351,7 +1588,7 @@ class BotHandlers:
                 👥 Мин. игроков: {GAME_SETTINGS['MIN_PLAYERS']}
                 👥 Макс. игроков: {GAME_SETTINGS['MAX_PLAYERS']}"""
 
-        self.bot.answer_callback_query(call.id, settings_text, show_alert=True)
+        self._answer_callback(call.id, settings_text, show_alert=True)
 
     def _handle_show_character(self, call: CallbackQuery):
         """Показ своего персонажа"""
@@ -1359,22 +1596,22 @@ class BotHandlers:
         user_id = call.from_user.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет активной игры", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
 
         if user_id not in game.players:
-            self.bot.answer_callback_query(call.id, "❌ Вы не участвуете в игре", show_alert=True)
+            self._answer_callback(call.id, "❌ Вы не участвуете в игре", show_alert=True)
             return
 
         player = game.players[user_id]
         character_info = player.get_character_info(show_all=True)
 
         if character_info:
-            self.bot.answer_callback_query(call.id, f"👤 Ваш персонаж:\n\n{character_info}", show_alert=True)
+            self._answer_callback(call.id, f"👤 Ваш персонаж:\n\n{character_info}", show_alert=True)
         else:
-            self.bot.answer_callback_query(call.id, "❌ Персонаж еще не создан", show_alert=True)
+            self._answer_callback(call.id, "❌ Персонаж еще не создан", show_alert=True)
 
     def _handle_manage_cards(self, call: CallbackQuery):
         """Управление карточками персонажа - переход в ЛС"""
@@ -1382,29 +1619,29 @@ class BotHandlers:
         user_id = call.from_user.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет активной игры", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
 
         if user_id not in game.players:
-            self.bot.answer_callback_query(call.id, "❌ Вы не участвуете в игре", show_alert=True)
+            self._answer_callback(call.id, "❌ Вы не участвуете в игре", show_alert=True)
             return
 
         # Отправляем в ЛС
         try:
             self._send_cards_menu_to_private(user_id, chat_id)
-            self.bot.answer_callback_query(call.id, "✅ Проверьте личные сообщения для управления карточками")
+            self._answer_callback(call.id, "✅ Проверьте личные сообщения для управления карточками")
         except Exception as e:
             logger.error(f"Ошибка отправки меню карточек в ЛС: {e}")
-            self.bot.answer_callback_query(call.id, "❌ Не могу отправить в ЛС. Напишите боту /start")
+            self._answer_callback(call.id, "❌ Не могу отправить в ЛС. Напишите боту /start")
 
     def _handle_show_game_players(self, call: CallbackQuery):
         """Показ игроков в игре с их раскрытыми карточками"""
         chat_id = call.message.chat.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет активной игры", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
@@ -1418,7 +1655,7 @@ class BotHandlers:
             players_text += f"{admin_mark} {status} **{player.get_display_name()}**\n"
             players_text += player.get_character_info(show_all=False) + "\n\n"
 
-        self.bot.answer_callback_query(call.id, players_text, show_alert=True)
+        self._answer_callback(call.id, players_text, show_alert=True)
 
     def _handle_start_voting(self, call: CallbackQuery):
         """Начало голосования - отправка в ЛС"""
@@ -1426,34 +1663,34 @@ class BotHandlers:
         user_id = call.from_user.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Игра не найдена", show_alert=True)
+            self._answer_callback(call.id, "❌ Игра не найдена", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
 
         # Проверяем фазу игры
         if game.phase.value != "voting":
-            self.bot.answer_callback_query(call.id, "❌ Сейчас не время голосования", show_alert=True)
+            self._answer_callback(call.id, "❌ Сейчас не время голосования", show_alert=True)
             return
 
         # Проверяем, что игрок жив
         if user_id not in game.players or not game.players[user_id].is_alive:
-            self.bot.answer_callback_query(call.id, "❌ Вы не можете голосовать", show_alert=True)
+            self._answer_callback(call.id, "❌ Вы не можете голосовать", show_alert=True)
             return
 
         # Проверяем, уже проголосовал ли игрок
         if game.players[user_id].has_voted:
-            self.bot.answer_callback_query(call.id, "❌ Вы уже проголосовали", show_alert=True)
+            self._answer_callback(call.id, "❌ Вы уже проголосовали", show_alert=True)
             return
 
         # Отправляем голосование в ЛС
         try:
             self._send_voting_to_private(user_id, chat_id)
-            self.bot.answer_callback_query(call.id, "✅ Проверьте личные сообщения для голосования")
+            self._answer_callback(call.id, "✅ Проверьте личные сообщения для голосования")
         except Exception as e:
             # Если не удается отправить в ЛС, голосуем в группе
             logger.error(f"Ошибка отправки голосования в ЛС: {e}")
-            self.bot.answer_callback_query(call.id, "❌ Не могу отправить в ЛС. Напишите боту /start")
+            self._answer_callback(call.id, "❌ Не могу отправить в ЛС. Напишите боту /start")
 
     def _send_voting_to_private(self, user_id: int, chat_id: int):
         """Отправляет голосование в ЛС"""
@@ -1462,14 +1699,14 @@ class BotHandlers:
 
         game = self.game_manager.games[chat_id]
 
-        # Создаем клавиатуру с живыми игроками (кроме самого голосующего)
-        alive_players = [p for p in game.get_alive_players() if p.user_id != user_id]
+        # Создаем клавиатуру с живыми игроками (кроме самого голосующего, при переголосовании - только ничейных)
+        alive_players = [p for p in game.get_vote_candidates() if p.user_id != user_id]
 
         if not alive_players:
             self.bot.send_message(user_id, "❌ Нет игроков для голосования")
             return
 
-        keyboard = get_voting_keyboard(alive_players, user_id)
+        keyboard = get_voting_keyboard(alive_players, user_id, chat_id, game.phase_nonce)
 
         voting_text = f"🗳️ **ГОЛОСОВАНИЕ** (Чат: {chat_id})\n\n"
         voting_text += f"Выберите игрока, которого хотите **ИСКЛЮЧИТЬ** из бункера:\n\n"
@@ -1477,15 +1714,6 @@ class BotHandlers:
         for player in alive_players:
             voting_text += f"👤 {player.get_display_name()}\n"
 
-        # Инициализируем user_states если его нет
-        if not hasattr(self, 'user_states'):
-            self.user_states = {}
-
-        # Сохраняем информацию о голосовании
-        if user_id not in self.user_states:
-            self.user_states[user_id] = {}
-        self.user_states[user_id]['voting_chat'] = chat_id
-
         self.bot.send_message(
             user_id,
             voting_text,
@@ -1497,43 +1725,30 @@ class BotHandlers:
         """Обработка воздержания от голосования"""
         user_id = call.from_user.id
 
-        # Инициализируем user_states если его нет
-        if not hasattr(self, 'user_states'):
-            self.user_states = {}
-
-        # Получаем chat_id из состояния пользователя
-        if user_id not in self.user_states or 'voting_chat' not in self.user_states[user_id]:
-            self.bot.answer_callback_query(call.id, "❌ Ошибка голосования", show_alert=True)
-            return
-
-        chat_id = self.user_states[user_id]['voting_chat']
-
-        if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
-            return
-
-        game = self.game_manager.games[chat_id]
-
-        if user_id not in game.players:
-            self.bot.answer_callback_query(call.id, "❌ Вы не участвуете в игре", show_alert=True)
+        # Игра и фаза зашиты в кнопку
+        resolved = self._resolve_game_callback(call)
+        if not resolved:
             return
 
+        payload, game = resolved
+        chat_id = payload.chat_id
         player = game.players[user_id]
 
         if not player.is_alive:
-            self.bot.answer_callback_query(call.id, "❌ Вы не можете голосовать", show_alert=True)
+            self._answer_callback(call.id, "❌ Вы не можете голосовать", show_alert=True)
             return
 
         if player.has_voted:
-            self.bot.answer_callback_query(call.id, "❌ Вы уже проголосовали", show_alert=True)
+            self._answer_callback(call.id, "❌ Вы уже проголосовали", show_alert=True)
             return
 
         # Отмечаем как проголосовавшего, но без цели
-        player.has_voted = True
-        player.vote_target = None
+        if not self.game_manager.abstain_player(chat_id, user_id):
+            self._answer_callback(call.id, "❌ Не удалось воздержаться", show_alert=True)
+            return
 
         # Уведомляем в ЛС
-        self.bot.edit_message_text(
+        self._edit_message(
             f"✅ **Воздержание принято!**\n\nВы воздержались от голосования.\n\nВернитесь в группу и дождитесь окончания голосования.",
             user_id,
             call.message.message_id,
@@ -1553,14 +1768,8 @@ class BotHandlers:
         except Exception as e:
             logger.error(f"Ошибка уведомления в группе: {e}")
 
-        # Очищаем состояние
-        if user_id in self.user_states and 'voting_chat' in self.user_states[user_id]:
-            del self.user_states[user_id]['voting_chat']
-            # Удаляем пустой словарь
-            if not self.user_states[user_id]:
-                del self.user_states[user_id]
-
-        self.bot.answer_callback_query(call.id)
+        self.game_manager.check_voting_complete(chat_id)
+        self._answer_callback(call.id)
 
     def _handle_confirm(self, call: CallbackQuery):
         """Обработка подтверждения действия"""
@@ -1571,11 +1780,11 @@ class BotHandlers:
         elif action == "stop_game":
             self._handle_stop_game_confirm(call)
         else:
-            self.bot.answer_callback_query(call.id, "❌ Неизвестное действие")
+            self._answer_callback(call.id, "❌ Неизвестное действие")
 
     def _handle_cancel(self, call: CallbackQuery):
         """Обработка отмены действия"""
-        self.bot.answer_callback_query(call.id, "❌ Действие отменено")
+        self._answer_callback(call.id, "❌ Действие отменено")
 
         # Возвращаемся к предыдущему меню
         chat_id = call.message.chat.id
@@ -1585,7 +1794,7 @@ class BotHandlers:
             keyboard = get_game_phase_keyboard(game.phase.value)
 
             try:
-                self.bot.edit_message_text(
+                self._edit_message(
                     "🎮 Игра в процессе...",
                     chat_id,
                     call.message.message_id,
@@ -1605,7 +1814,7 @@ class BotHandlers:
     def _handle_edit_cards(self, call: CallbackQuery):
         """Редактирование категории карточек"""
         if call.from_user.id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         category = call.data.replace("edit_", "")
@@ -1637,7 +1846,7 @@ class BotHandlers:
         keyboard = get_card_edit_keyboard(category)
 
         try:
-            self.bot.edit_message_text(
+            self._edit_message(
                 edit_text,
                 call.message.chat.id,
                 call.message.message_id,
@@ -1646,20 +1855,16 @@ class BotHandlers:
             )
         except Exception as e:
             logger.error(f"Ошибка редактирования сообщения: {e}")
-            self.bot.answer_callback_query(call.id, "❌ Ошибка редактирования меню")
+            self._answer_callback(call.id, "❌ Ошибка редактирования меню")
 
     def _handle_add_card(self, call: CallbackQuery):
         """Начало добавления карточки"""
         if call.from_user.id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         category = call.data.replace("add_", "")
 
-        # Инициализируем user_states если его нет
-        if not hasattr(self, 'user_states'):
-            self.user_states = {}
-
         # Сохраняем состояние пользователя
         self.user_states[call.from_user.id] = {
             'action': 'add_card',
@@ -1681,21 +1886,21 @@ class BotHandlers:
         category_name = category_names.get(category, category)
 
         try:
-            self.bot.edit_message_text(
+            self._edit_message(
                 f"✏️ **Добавление карточки**\n\nНапишите {category_name}, которую хотите добавить:",
                 call.message.chat.id,
                 call.message.message_id,
                 parse_mode='Markdown'
             )
-            self.bot.answer_callback_query(call.id, f"Напишите {category_name} в чат")
+            self._answer_callback(call.id, f"Напишите {category_name} в чат")
         except Exception as e:
             logger.error(f"Ошибка редактирования сообщения: {e}")
-            self.bot.answer_callback_query(call.id, "❌ Ошибка редактирования меню")
+            self._answer_callback(call.id, "❌ Ошибка редактирования меню")
 
     def _handle_edit_special_cards(self, call: CallbackQuery):  # new
         """Редактирование специальных карточек"""
         if call.from_user.id != ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         special_cards = get_special_cards()
@@ -1712,7 +1917,7 @@ class BotHandlers:
         keyboard.add(InlineKeyboardButton("📋 Показать все", callback_data="show_special"))
         keyboard.add(InlineKeyboardButton("🔙 Назад", callback_data="admin_cards"))
 
-        self.bot.edit_message_text(
+        self._edit_message(
             edit_text,
             call.message.chat.id,
             call.message.message_id,
@@ -1730,7 +1935,7 @@ class BotHandlers:
             'message_id': call.message.message_id
         }
 
-        self.bot.edit_message_text(
+        self._edit_message(
             "✏️ **Добавление специальной карточки**\n\nВведите название карточки:",
             call.message.chat.id,
             call.message.message_id,
@@ -1740,20 +1945,16 @@ class BotHandlers:
     def _handle_remove_card(self, call: CallbackQuery):
         """Начало удаления карточки"""
         if call.from_user.id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         category = call.data.replace("remove_", "")
         cards = self.game_manager.cards_data.get(category, [])
 
         if not cards:
-            self.bot.answer_callback_query(call.id, "❌ Нет карточек для удаления", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет карточек для удаления", show_alert=True)
             return
 
-        # Инициализируем user_states если его нет
-        if not hasattr(self, 'user_states'):
-            self.user_states = {}
-
         # Сохраняем состояние пользователя
         self.user_states[call.from_user.id] = {
             'action': 'remove_card',
@@ -1772,21 +1973,21 @@ class BotHandlers:
         cards_text += f"\n\nНапишите точный текст карточки для удаления:"
 
         try:
-            self.bot.edit_message_text(
+            self._edit_message(
                 cards_text,
                 call.message.chat.id,
                 call.message.message_id,
                 parse_mode='Markdown'
             )
-            self.bot.answer_callback_query(call.id, "Напишите текст карточки для удаления")
+            self._answer_callback(call.id, "Напишите текст карточки для удаления")
         except Exception as e:
             logger.error(f"Ошибка редактирования сообщения: {e}")
-            self.bot.answer_callback_query(call.id, "❌ Ошибка редактирования меню")
+            self._answer_callback(call.id, "❌ Ошибка редактирования меню")
 
     def _handle_show_cards(self, call: CallbackQuery):
         """Показ всех карточек категории"""
         if call.from_user.id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав доступа", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав доступа", show_alert=True)
             return
 
         category = call.data.replace("show_", "")
@@ -1805,7 +2006,7 @@ class BotHandlers:
         category_name = category_names.get(category, category)
 
         if not cards:
-            self.bot.answer_callback_query(call.id, f"❌ Нет карточек в категории {category_name}", show_alert=True)
+            self._answer_callback(call.id, f"❌ Нет карточек в категории {category_name}", show_alert=True)
             return
 
         cards_text = f"🃏 **{category_name}** ({len(cards)} шт.)\n\n"
@@ -1821,7 +2022,7 @@ class BotHandlers:
         if len(cards_text) > 200:
             cards_text = cards_text[:200] + "..."
 
-        self.bot.answer_callback_query(call.id, cards_text, show_alert=True)
+        self._answer_callback(call.id, cards_text, show_alert=True)
 
     def _process_add_card(self, message: Message, state: dict):
         """Обработка добавления карточки"""
@@ -1847,8 +2048,7 @@ class BotHandlers:
                 self.bot.send_message(message.chat.id, "❌ Карточка уже существует или произошла ошибка")
 
             # Очищаем состояние
-            if message.from_user.id in self.user_states:
-                del self.user_states[message.from_user.id]
+            self.user_states.pop(message.from_user.id)
 
         except Exception as e:
             logger.error(f"Ошибка добавления карточки: {e}")
@@ -1870,8 +2070,7 @@ class BotHandlers:
             self._return_to_card_edit_menu(state, category)
 
             # Очищаем состояние
-            if message.from_user.id in self.user_states:
-                del self.user_states[message.from_user.id]
+            self.user_states.pop(message.from_user.id)
 
         except Exception as e:
             logger.error(f"Ошибка удаления карточки: {e}")
@@ -1899,7 +2098,7 @@ class BotHandlers:
 
             keyboard = get_card_edit_keyboard(category)
 
-            self.bot.edit_message_text(
+            self._edit_message(
                 edit_text,
                 state['chat_id'],
                 state['message_id'],
@@ -1915,14 +2114,14 @@ class BotHandlers:
         user_id = call.from_user.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет активной игры", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
 
         # Проверяем права (админ игры или бота)
         if user_id != game.admin_id and user_id not in ADMIN_IDS:
-            self.bot.answer_callback_query(call.id, "❌ Нет прав для остановки игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет прав для остановки игры", show_alert=True)
             return
 
         # Останавливаем таймеры
@@ -1933,7 +2132,7 @@ class BotHandlers:
         del self.game_manager.games[chat_id]
 
         try:
-            self.bot.edit_message_text(
+            self._edit_message(
                 "⛔ Игра принудительно завершена администратором.",
                 chat_id,
                 call.message.message_id
@@ -1942,20 +2141,20 @@ class BotHandlers:
             logger.error(f"Ошибка редактирования сообщения: {e}")
             self._send_message_with_image(chat_id, "⛔ Игра принудительно завершена администратором." 'game_end')
 
-        self.bot.answer_callback_query(call.id, "✅ Игра остановлена")
+        self._answer_callback(call.id, "✅ Игра остановлена")
 
     def _handle_show_vote_results(self, call: CallbackQuery):
         """Показ результатов голосования"""
         chat_id = call.message.chat.id
 
         if chat_id not in self.game_manager.games:
-            self.bot.answer_callback_query(call.id, "❌ Нет активной игры", show_alert=True)
+            self._answer_callback(call.id, "❌ Нет активной игры", show_alert=True)
             return
 
         game = self.game_manager.games[chat_id]
 
         if game.phase.value != "voting" and game.phase.value != "results":
-            self.bot.answer_callback_query(call.id, "❌ Результаты пока недоступны", show_alert=True)
+            self._answer_callback(call.id, "❌ Результаты пока недоступны", show_alert=True)
             return
 
         alive_players = game.get_alive_players()
@@ -1985,7 +2184,17 @@ class BotHandlers:
         if len(results_text) > 200:
             results_text = results_text[:200] + "..."
 
-        self.bot.answer_callback_query(call.id, results_text, show_alert=True)
+        self._answer_callback(call.id, results_text, show_alert=True)
+
+    def _schedule_lobby_status(self, chat_id: int):
+        """Обновляет сообщение лобби с задержкой: серия входов/выходов - одна правка"""
+        self.lobby_updates.trigger(chat_id)
+
+    def _flush_lobby_status(self, chat_id: int):
+        """Отложенное обновление лобби: рисует состояние на момент срабатывания"""
+        game = self.game_manager.games.get(chat_id)
+        if game and game.phase == GamePhase.LOBBY and getattr(game, 'lobby_message_id', None):
+            self._send_lobby_status(chat_id, game.lobby_message_id)
 
     def _send_lobby_status(self, chat_id: int, edit_message_id: int = None):
         """Отправляет или редактирует статус лобби"""
@@ -2016,7 +2225,7 @@ class BotHandlers:
             # Если указан message_id, редактируем сообщение, иначе отправляем новое
             if edit_message_id:
                 try:
-                    self.bot.edit_message_text(
+                    self._edit_message(
                         lobby_text,
                         chat_id,
                         edit_message_id,
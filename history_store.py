@@ -0,0 +1,265 @@
+# history_store.py
+"""История завершенных игр в SQLite (режим WAL).
+
+Игры записываются фоновым потоком пачками: несколько завершенных игр
+попадают в базу одной транзакцией через executemany. Запросы для
+админ-панели опираются на индексы по игроку, чату и карточке.
+"""
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+from callback_codec import CARD_CODES
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    scenario TEXT,
+    bunker_info TEXT,
+    player_count INTEGER NOT NULL,
+    winner_count INTEGER NOT NULL,
+    voting_rounds INTEGER NOT NULL,
+    started_at REAL,
+    finished_at REAL NOT NULL,
+    duration REAL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    user_id INTEGER NOT NULL,
+    display_name TEXT,
+    profession TEXT,
+    is_winner INTEGER NOT NULL,
+    eliminated_round INTEGER,
+    PRIMARY KEY (game_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS reveals (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    user_id INTEGER NOT NULL,
+    card_type TEXT NOT NULL,
+    card_value TEXT NOT NULL,
+    card_phase INTEGER,
+    revealed_at REAL
+);
+CREATE TABLE IF NOT EXISTS votes (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    voting_round INTEGER NOT NULL,
+    voter_id INTEGER NOT NULL,
+    target_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS eliminations (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    voting_round INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    votes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_games_chat ON games(chat_id, finished_at);
+CREATE INDEX IF NOT EXISTS idx_game_players_user ON game_players(user_id);
+CREATE INDEX IF NOT EXISTS idx_reveals_card ON reveals(card_type, card_value);
+CREATE INDEX IF NOT EXISTS idx_reveals_game_user ON reveals(game_id, user_id);
+CREATE INDEX IF NOT EXISTS idx_votes_game ON votes(game_id, voting_round);
+CREATE INDEX IF NOT EXISTS idx_eliminations_user ON eliminations(user_id);
+"""
+
+_STOP = object()
+
+
+def build_game_record(game) -> dict:
+    """Снимает с игры всё, что нужно для истории (простые значения, без ссылок на игру)"""
+    winners = set(game.winners)
+    eliminated_round = {user_id: voting_round for voting_round, user_id, _ in game.elimination_log}
+
+    players = []
+    revealed_now = []
+    for player in game.players.values():
+        character = player.character
+        players.append((
+            player.user_id,
+            player.get_display_name(),
+            character.profession if character else None,
+            1 if player.user_id in winners else 0,
+            eliminated_round.get(player.user_id)
+        ))
+        if character:
+            revealed_now.extend(
+                (player.user_id, card_type, character.get_card_value(card_type))
+                for card_type in CARD_CODES
+                if character.revealed_cards.get(card_type, False)
+            )
+
+    # Время и фаза известны для раскрытий из журнала; раскрытия спецкарточками - без них
+    logged = {(user_id, card_type): (card_phase, revealed_at)
+              for user_id, card_type, card_phase, revealed_at in game.reveal_log}
+    reveals = [
+        (user_id, card_type, card_value) + logged.get((user_id, card_type), (None, None))
+        for user_id, card_type, card_value in revealed_now
+    ]
+
+    finished_at = time.time()
+    return {
+        'chat_id': game.chat_id,
+        'scenario': game.scenario,
+        'bunker_info': game.bunker_info,
+        'player_count': len(game.players),
+        'winner_count': len(winners),
+        'voting_rounds': game.voting_round,
+        'started_at': game.started_at,
+        'finished_at': finished_at,
+        'duration': finished_at - game.started_at if game.started_at else None,
+        'players': players,
+        'reveals': reveals,
+        'votes': list(game.vote_log),
+        'eliminations': list(game.elimination_log),
+    }
+
+
+class GameHistoryStore:
+    """Хранилище истории игр"""
+
+    def __init__(self, db_file: str, batch_size: int = 50, flush_interval: float = 2.0):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: queue.Queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        self.games_written = 0
+        self.write_errors = 0
+
+        self._read_conn = self._connect()
+        with self._read_conn:
+            self._read_conn.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # --- запись ---
+
+    def record_game(self, game):
+        """Ставит завершенную игру в очередь на запись"""
+        try:
+            self._queue.put(build_game_record(game))
+        except Exception as e:
+            logger.error(f"Ошибка подготовки истории игры в чате {game.chat_id}: {e}")
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(conn, batch)
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[dict]):
+        """Записывает пачку игр одной транзакцией"""
+        players, reveals, votes, eliminations = [], [], [], []
+        try:
+            with conn:
+                for record in batch:
+                    cursor = conn.execute(
+                        "INSERT INTO games (chat_id, scenario, bunker_info, player_count, winner_count, "
+                        "voting_rounds, started_at, finished_at, duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (record['chat_id'], record['scenario'], record['bunker_info'], record['player_count'],
+                         record['winner_count'], record['voting_rounds'], record['started_at'],
+                         record['finished_at'], record['duration'])
+                    )
+                    game_id = cursor.lastrowid
+                    players.extend((game_id,) + row for row in record['players'])
+                    reveals.extend((game_id,) + row for row in record['reveals'])
+                    votes.extend((game_id,) + row for row in record['votes'])
+                    eliminations.extend((game_id,) + row for row in record['eliminations'])
+
+                conn.executemany("INSERT INTO game_players VALUES (?, ?, ?, ?, ?, ?)", players)
+                conn.executemany("INSERT INTO reveals VALUES (?, ?, ?, ?, ?, ?)", reveals)
+                conn.executemany("INSERT INTO votes VALUES (?, ?, ?, ?)", votes)
+                conn.executemany("INSERT INTO eliminations VALUES (?, ?, ?, ?)", eliminations)
+
+            self.games_written += len(batch)
+            logger.debug(f"Записано в историю игр: {len(batch)}")
+        except Exception as e:
+            self.write_errors += len(batch)
+            logger.error(f"Ошибка записи истории игр: {e}")
+
+    def close(self):
+        """Дописывает очередь и закрывает базу"""
+        self._queue.put(_STOP)
+        self._writer.join(timeout=10)
+        with self._read_lock:
+            self._read_conn.close()
+
+    # --- запросы ---
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def get_overview(self, chat_id: Optional[int] = None) -> Dict[str, float]:
+        """Общая статистика: число игр, средняя длительность и размер игры"""
+        sql = ("SELECT COUNT(*), AVG(duration), AVG(player_count), AVG(voting_rounds) FROM games"
+               + (" WHERE chat_id = ?" if chat_id is not None else ""))
+        games, avg_duration, avg_players, avg_rounds = self._query(sql, (chat_id,) if chat_id is not None else ())[0]
+        return {
+            'games': games,
+            'avg_duration': avg_duration or 0.0,
+            'avg_players': avg_players or 0.0,
+            'avg_voting_rounds': avg_rounds or 0.0,
+        }
+
+    def get_user_stats(self, user_id: int) -> Dict[str, float]:
+        """Статистика игрока: игры, победы, процент побед"""
+        games, wins = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(is_winner), 0) FROM game_players WHERE user_id = ?",
+            (user_id,)
+        )[0]
+        return {'games': games, 'wins': wins, 'win_rate': wins / games if games else 0.0}
+
+    def get_top_players(self, limit: int = 5, min_games: int = 3) -> List[tuple]:
+        """Игроки с лучшим процентом побед: (имя, игр, побед, процент)"""
+        return self._query(
+            "SELECT MAX(display_name), COUNT(*) AS games, SUM(is_winner) AS wins, "
+            "1.0 * SUM(is_winner) / COUNT(*) AS win_rate "
+            "FROM game_players GROUP BY user_id HAVING games >= ? "
+            "ORDER BY win_rate DESC, games DESC LIMIT ?",
+            (min_games, limit)
+        )
+
+    def get_card_stats(self, card_type: Optional[str] = None, limit: int = 5) -> List[tuple]:
+        """Самые часто раскрываемые карточки: (тип, значение, раскрытий, процент побед владельцев)"""
+        where = "WHERE r.card_type = ? " if card_type else ""
+        return self._query(
+            "SELECT r.card_type, r.card_value, COUNT(*) AS picks, AVG(gp.is_winner) AS win_rate "
+            "FROM reveals r JOIN game_players gp ON gp.game_id = r.game_id AND gp.user_id = r.user_id "
+            + where +
+            "GROUP BY r.card_type, r.card_value ORDER BY picks DESC LIMIT ?",
+            ((card_type,) if card_type else ()) + (limit,)
+        )
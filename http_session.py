@@ -0,0 +1,209 @@
+# http_session.py
+"""HTTP-сессия клиента Telegram Bot API.
+
+По умолчанию telebot ходит в API через сессию requests без настройки пула и
+с общими таймаутами. Здесь задается своя отправка запросов (apihelper.CUSTOM_REQUEST_SENDER):
+  - пул соединений по числу рабочих потоков, keep-alive;
+  - таймауты по классу метода: отправка, загрузка файлов, getUpdates;
+  - повторы с экспоненциальной задержкой и джиттером, только там, где повтор
+    не может продублировать действие: методы без побочных эффектов повторяются
+    при любой сетевой ошибке, отправка сообщений - только если соединение не
+    установилось или Telegram ответил 429;
+  - счетчики использования пула для админ-статистики.
+"""
+import random
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Повтор этих методов ничего не дублирует (чтение, идемпотентная замена состояния)
+IDEMPOTENT_PREFIXES = ('get', 'edit', 'delete', 'set', 'pin', 'unpin', 'answer', 'leave', 'close', 'log')
+
+UPLOAD_METHODS = {'sendPhoto', 'sendDocument', 'sendVideo', 'sendAudio', 'sendVoice',
+                  'sendAnimation', 'sendMediaGroup', 'sendSticker', 'sendVideoNote'}
+
+
+def method_class(method_name: str, has_files: bool) -> str:
+    """Класс метода для таймаутов и статистики: poll, upload или send"""
+    if method_name == 'getUpdates':
+        return 'poll'
+    if has_files or method_name in UPLOAD_METHODS:
+        return 'upload'
+    return 'send'
+
+
+def is_idempotent(method_name: str) -> bool:
+    return method_name == 'getUpdates' or method_name.startswith(IDEMPOTENT_PREFIXES)
+
+
+class ApiRequestSender:
+    """Отправка запросов Bot API через общий настроенный пул"""
+
+    def __init__(self, pool_size: int = 8, connect_timeout: float = 5, send_timeout: float = 15,
+                 upload_timeout: float = 60, max_retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 5, max_retry_after: float = 10):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeouts = {'send': send_timeout, 'upload': upload_timeout}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        # pool_block: лишние потоки ждут свободное соединение, а не открывают временные
+        self.adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests: Dict[str, int] = {'send': 0, 'upload': 0, 'poll': 0}
+        self.total_ms: Dict[str, float] = {'send': 0.0, 'upload': 0.0, 'poll': 0.0}
+        self.retries = 0
+        self.errors = 0
+
+    def __call__(self, method, url, params=None, files=None, timeout=None, proxies=None):
+        """Сигнатура apihelper.CUSTOM_REQUEST_SENDER"""
+        method_name = url.rsplit('/', 1)[-1]
+        kind = method_class(method_name, bool(files))
+        if kind == 'poll' and timeout:
+            # Таймаут чтения getUpdates apihelper уже вывел из long_polling_timeout
+            request_timeout = (self.connect_timeout, timeout[1])
+        else:
+            request_timeout = (self.connect_timeout, self.read_timeouts[kind])
+        idempotent = is_idempotent(method_name)
+
+        self._enter()
+        started = time.perf_counter()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = self.session.request(method, url, params=params, files=files,
+                                                    timeout=request_timeout, proxies=proxies)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    # Соединение не установлено - запрос точно не дошел до Telegram
+                    not_sent = isinstance(e, requests.ConnectTimeout)
+                    if attempt >= self.max_retries or not (idempotent or not_sent) or not self._rewind(files):
+                        raise
+                    attempt += 1
+                    self._retry_sleep(method_name, attempt, str(e))
+                    continue
+
+                delay = self._retry_delay(response, idempotent)
+                if delay is None or attempt >= self.max_retries or not self._rewind(files):
+                    return response
+                attempt += 1
+                self._retry_sleep(method_name, attempt, f"HTTP {response.status_code}", delay)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._leave(kind, (time.perf_counter() - started) * 1000)
+
+    def _retry_delay(self, response, idempotent: bool) -> Optional[float]:
+        """Задержка перед повтором по ответу или None, если повторять нельзя"""
+        if response.status_code == 429:
+            # Telegram отклонил запрос целиком - повтор безопасен для любого метода
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+            except ValueError:
+                retry_after = 1
+            return retry_after if retry_after <= self.max_retry_after else None
+        if response.status_code >= 500 and idempotent:
+            return 0.0
+        return None
+
+    def _retry_sleep(self, method_name: str, attempt: int, reason: str, minimum: float = 0.0):
+        # Полный джиттер: потоки, упавшие одновременно, не повторяют хором
+        delay = max(minimum, random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        with self._lock:
+            self.retries += 1
+        logger.warning(f"Повтор {method_name} #{attempt} через {delay:.2f} с: {reason}")
+        time.sleep(delay)
+
+    @staticmethod
+    def _rewind(files) -> bool:
+        """Перематывает файлы перед повтором (нельзя - повтор невозможен)"""
+        if not files:
+            return True
+        for value in files.values():
+            file_object = value[1] if isinstance(value, tuple) else value
+            if hasattr(file_object, 'read'):
+                if not hasattr(file_object, 'seek'):
+                    return False
+                file_object.seek(0)
+        return True
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _leave(self, kind: str, elapsed_ms: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[kind] += 1
+            self.total_ms[kind] += elapsed_ms
+
+    def get_stats(self) -> dict:
+        """Использование пула и счетчики запросов"""
+        opened = idle = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            idle += pool.pool.qsize() if pool.pool else 0
+
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'connections_opened': opened,
+                'idle_slots': idle,
+                'requests': dict(self.requests),
+                'avg_ms': {kind: self.total_ms[kind] / count if count else 0.0
+                           for kind, count in self.requests.items()},
+                'retries': self.retries,
+                'errors': self.errors,
+            }
+
+
+api_sender: Optional[ApiRequestSender] = None
+
+
+def install_api_session(pool_size: int) -> ApiRequestSender:
+    """Подключает настроенную отправку запросов к apihelper (один раз на процесс)"""
+    global api_sender
+    if api_sender is not None:
+        return api_sender
+
+    from telebot import apihelper
+    from config import HTTP_SETTINGS
+
+    api_sender = ApiRequestSender(
+        pool_size=pool_size,
+        connect_timeout=HTTP_SETTINGS['CONNECT_TIMEOUT'],
+        send_timeout=HTTP_SETTINGS['SEND_TIMEOUT'],
+        upload_timeout=HTTP_SETTINGS['UPLOAD_TIMEOUT'],
+        max_retries=HTTP_SETTINGS['MAX_RETRIES'],
+        backoff=HTTP_SETTINGS['BACKOFF'],
+    )
+    apihelper.CUSTOM_REQUEST_SENDER = api_sender
+    # Скачивание файлов идет через apihelper.session - тот же пул
+    apihelper.session = api_sender.session
+    logger.info(f"HTTP-пул Bot API: {pool_size} соединений")
+    return api_sender
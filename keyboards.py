@@ -1,8 +1,122 @@
 # keyboards.py
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, List
+
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List, Dict
 
-def get_main_menu() -> InlineKeyboardMarkup:
+from config import BOT_USERNAME, GROUP_CHAT_ID, KEYBOARD_CACHE_SIZE
+from callback_codec import CallbackAction, encode_callback, encode_card_reveal
+
+
+class KeyboardCache:
+    """LRU-кэш готовых клавиатур в виде сериализованного JSON reply_markup"""
+
+    def __init__(self, max_size: int = KEYBOARD_CACHE_SIZE):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: tuple, build: Callable[[], InlineKeyboardMarkup]) -> str:
+        """Возвращает JSON клавиатуры из кэша или строит и сохраняет её"""
+        with self._lock:
+            markup_json = self._items.get(key)
+            if markup_json is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return markup_json
+
+        # Строим вне блокировки - сборка клавиатуры не должна тормозить другие потоки
+        markup_json = build().to_json()
+
+        with self._lock:
+            self.misses += 1
+            self._items[key] = markup_json
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+        return markup_json
+
+    def clear(self):
+        """Очищает кэш"""
+        with self._lock:
+            self._items.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает статистику кэша"""
+        with self._lock:
+            return {'size': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
+keyboard_cache = KeyboardCache()
+
+
+def cached_keyboard(key_func: Callable = None):
+    """Декоратор: кэширует клавиатуру по (имя функции, ключ состояния).
+
+    Без key_func ключом служат сами аргументы - подходит для статичных меню.
+    Функция возвращает готовый JSON, который telebot принимает как reply_markup.
+    """
+    def decorator(builder: Callable[..., InlineKeyboardMarkup]):
+        @wraps(builder)
+        def wrapper(*args, **kwargs) -> str:
+            if key_func:
+                state_key = key_func(*args, **kwargs)
+            else:
+                state_key = (args, tuple(sorted(kwargs.items())))
+            return keyboard_cache.get_or_build(
+                (builder.__name__, state_key),
+                lambda: builder(*args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+# Карточки, которые игрок раскрывает из ЛС (порядок кнопок)
+PRIVATE_CARD_TYPES = ['profession', 'biology', 'health', 'phobia', 'hobby', 'fact', 'baggage']
+
+
+def _voting_key(players: List, current_user_id: int, chat_id: int, nonce: int) -> tuple:
+    """Ключ клавиатуры голосования: игра, фаза, голосующий и список доступных целей"""
+    targets = tuple(
+        (player.user_id, player.get_display_name()) for player in players
+        if getattr(player, 'is_alive', False) and getattr(player, 'user_id', None) != current_user_id
+    )
+    return chat_id, nonce, current_user_id, targets
+
+
+def _reveal_state_key(player, game) -> tuple:
+    """Ключ клавиатуры игрока: меняется только при смене фазы или состояния раскрытия"""
+    current_phase = game.phase.value
+    if not player.character:
+        return player.user_id, game.chat_id, game.phase_nonce, None
+
+    revealed = tuple(
+        player.character.revealed_cards.get(card_type, False) or
+        getattr(player, f'abstained_card_{card_type}', False)
+        for card_type in PRIVATE_CARD_TYPES
+    )
+    can_use_special = bool(player.character.special_card and
+                           hasattr(player, 'special_card_used') and
+                           not player.special_card_used)
+    return (player.user_id, game.chat_id, game.phase_nonce,
+            current_phase == "card_reveal_1", revealed, can_use_special)
+
+
+def _cards_menu_key(chat_id: int, game_manager=None) -> tuple:
+    """Ключ меню карточек: чат и завершено ли первое голосование"""
+    game = game_manager.games.get(chat_id) if game_manager else None
+    if game is None:
+        return chat_id, None
+    return chat_id, bool(getattr(game, 'first_voting_completed', False))
+
+
+@cached_keyboard()
+def get_main_menu(is_admin: bool = False) -> InlineKeyboardMarkup:
     """Главное меню"""
     keyboard = InlineKeyboardMarkup(row_width=1)
     keyboard.add(
@@ -12,8 +126,12 @@ def get_main_menu() -> InlineKeyboardMarkup:
         InlineKeyboardButton("📋 Правила", callback_data="rules"),
         InlineKeyboardButton("ℹ️ О боте", callback_data="about")
     )
+    if is_admin:
+        keyboard.add(InlineKeyboardButton("👑 Админ панель", callback_data="admin_panel"))
     return keyboard
 
+
+@cached_keyboard()
 def get_admin_menu() -> InlineKeyboardMarkup:
     """Меню администратора"""
     keyboard = InlineKeyboardMarkup(row_width=1)
@@ -24,6 +142,7 @@ def get_admin_menu() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@cached_keyboard(lambda is_admin=False: bool(is_admin))
 def get_game_lobby_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
     """Клавиатура лобби игры"""
     keyboard = InlineKeyboardMarkup(row_width=2)
@@ -44,6 +163,7 @@ def get_game_lobby_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
     return keyboard
 
 
+@cached_keyboard()
 def get_character_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для управления персонажем"""
     keyboard = InlineKeyboardMarkup(row_width=2)
@@ -66,10 +186,8 @@ def get_character_keyboard() -> InlineKeyboardMarkup:
     keyboard.add(InlineKeyboardButton("📋 Мой персонаж", callback_data="show_my_character"))
     return keyboard
 
-    if player.character and player.character.special_card_id and not player.special_card_used: #new
-        keyboard.add(InlineKeyboardButton("⚡ Использовать спец. карточку", callback_data="use_special_card")) #new
-
 
+@cached_keyboard(lambda phase: None)
 def get_card_reveal_phase_keyboard(phase: str) -> InlineKeyboardMarkup:
     """Клавиатура для фаз раскрытия карточек"""
     keyboard = InlineKeyboardMarkup(row_width=2)
@@ -82,55 +200,30 @@ def get_card_reveal_phase_keyboard(phase: str) -> InlineKeyboardMarkup:
 
     return keyboard
 
-def get_voting_keyboard(players: List, current_user_id: int) -> InlineKeyboardMarkup:
+
+@cached_keyboard(_voting_key)
+def get_voting_keyboard(players: List, current_user_id: int, chat_id: int, nonce: int) -> InlineKeyboardMarkup:
     """Клавиатура для голосования"""
     keyboard = InlineKeyboardMarkup(row_width=1)
-    
+
     # Добавляем кнопки для голосования за каждого живого игрока (кроме текущего)
     for player in players:
         if hasattr(player, 'is_alive') and player.is_alive and hasattr(player, 'user_id') and player.user_id != current_user_id:
             text = f"🗳️ {player.get_display_name()}"
-            keyboard.add(InlineKeyboardButton(text, callback_data=f"vote_{player.user_id}"))
-    
+            callback = encode_callback(CallbackAction.VOTE, chat_id, nonce, player.user_id)
+            keyboard.add(InlineKeyboardButton(text, callback_data=callback))
+
     # Добавляем кнопку воздержания
-    keyboard.add(InlineKeyboardButton("🤐 Воздержаться", callback_data="abstain"))
+    callback = encode_callback(CallbackAction.ABSTAIN, chat_id, nonce)
+    keyboard.add(InlineKeyboardButton("🤐 Воздержаться", callback_data=callback))
     return keyboard
 
 
-def __init__(self, chat_id: int, admin_id: int):
-    # ... существующие поля ...
-    self.first_voting_completed = False  # Новое поле
-
-
-def get_cards_menu_inline_keyboard(chat_id: int, game_manager=None) -> InlineKeyboardMarkup:
-    """Клавиатура для перехода в бота для управления карточками"""
-    keyboard = InlineKeyboardMarkup(row_width=1)
-
-    # Проверяем завершено ли первое голосование
-    if game_manager and chat_id in game_manager.games:
-        game = game_manager.games[chat_id]
-        if getattr(game, 'first_voting_completed', False):
-            # После первого голосования - только переход в бота
-            bot_username = "bunker_nnkf_bot"  # Замените на username вашего бота
-            url = f"https://t.me/{bot_username}"
-            keyboard.add(InlineKeyboardButton("🃏 Перейти в бота", url=url))
-        else:
-            # До первого голосования - переход с параметрами
-            bot_username = "bunker_nnkf_bot"
-            url = f"https://t.me/{bot_username}?start=cards_{chat_id}"
-            keyboard.add(InlineKeyboardButton("🃏 Управлять карточками", url=url))
-    else:
-        # Fallback
-        bot_username = "bunker_nnkf_bot"
-        url = f"https://t.me/{bot_username}?start=cards_{chat_id}"
-        keyboard.add(InlineKeyboardButton("🃏 Управлять карточками", url=url))
-
-    return keyboard
-
+@cached_keyboard()
 def get_admin_cards_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура управления карточками"""
     keyboard = InlineKeyboardMarkup(row_width=1)
-    
+
     categories = [
         ("💼 Профессии", "edit_professions"),
         ("👤 Биология", "edit_biology"),
@@ -143,17 +236,19 @@ def get_admin_cards_keyboard() -> InlineKeyboardMarkup:
         ("🃏 Спец. карточки", "edit_special_cards"),
         ("🎲 Сценарии", "edit_scenarios")
     ]
-    
+
     for text, callback in categories:
         keyboard.add(InlineKeyboardButton(text, callback_data=callback))
-    
+
     keyboard.add(InlineKeyboardButton("🔙 Назад", callback_data="admin_back"))
     return keyboard
 
+
+@cached_keyboard()
 def get_card_edit_keyboard(category: str) -> InlineKeyboardMarkup:
     """Клавиатура редактирования категории карточек"""
     keyboard = InlineKeyboardMarkup(row_width=2)
-    
+
     keyboard.add(
         InlineKeyboardButton("➕ Добавить", callback_data=f"add_{category}"),
         InlineKeyboardButton("❌ Удалить", callback_data=f"remove_{category}")
@@ -162,10 +257,11 @@ def get_card_edit_keyboard(category: str) -> InlineKeyboardMarkup:
         InlineKeyboardButton("📋 Показать все", callback_data=f"show_{category}"),
         InlineKeyboardButton("🔙 Назад", callback_data="admin_cards")
     )
-    
+
     return keyboard
 
 
+@cached_keyboard()
 def get_game_phase_keyboard(phase: str) -> InlineKeyboardMarkup:
     """Клавиатура для текущей фазы игры"""
     keyboard = InlineKeyboardMarkup(row_width=1)
@@ -179,6 +275,8 @@ def get_game_phase_keyboard(phase: str) -> InlineKeyboardMarkup:
 
     return keyboard
 
+
+@cached_keyboard()
 def get_confirmation_keyboard(action: str) -> InlineKeyboardMarkup:
     """Клавиатура подтверждения действия"""
     keyboard = InlineKeyboardMarkup(row_width=2)
@@ -188,6 +286,8 @@ def get_confirmation_keyboard(action: str) -> InlineKeyboardMarkup:
     )
     return keyboard
 
+
+@cached_keyboard()
 def get_back_keyboard() -> InlineKeyboardMarkup:
     """Простая клавиатура возврата"""
     keyboard = InlineKeyboardMarkup()
@@ -195,33 +295,38 @@ def get_back_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@cached_keyboard()
 def get_voting_inline_keyboard(chat_id: int) -> InlineKeyboardMarkup:
     """Клавиатура для перехода в бота для голосования"""
     keyboard = InlineKeyboardMarkup(row_width=1)
-    
+
     # URL для перехода в бота с параметром для голосования
-    bot_username = "bunker_nnkf_bot"  # Замените на username вашего бота
-    url = f"https://t.me/{bot_username}?start=vote_{chat_id}"
-    
+    url = f"https://t.me/{BOT_USERNAME}?start=vote_{chat_id}"
+
     keyboard.add(InlineKeyboardButton("🗳️ Голосовать в личных сообщениях", url=url))
     return keyboard
 
-def get_private_voting_keyboard(players: List, current_user_id: int) -> InlineKeyboardMarkup:
+
+@cached_keyboard(_voting_key)
+def get_private_voting_keyboard(players: List, current_user_id: int, chat_id: int, nonce: int) -> InlineKeyboardMarkup:
     """Клавиатура для голосования в личных сообщениях"""
     keyboard = InlineKeyboardMarkup(row_width=1)
-    
+
     # Добавляем кнопки для голосования за каждого живого игрока (кроме текущего)
     for player in players:
         if hasattr(player, 'is_alive') and player.is_alive and hasattr(player, 'user_id') and player.user_id != current_user_id:
             text = f"🗳️ Голосовать против {player.get_display_name()}"
-            keyboard.add(InlineKeyboardButton(text, callback_data=f"vote_{player.user_id}"))
-    
+            callback = encode_callback(CallbackAction.VOTE, chat_id, nonce, player.user_id)
+            keyboard.add(InlineKeyboardButton(text, callback_data=callback))
+
     # Добавляем кнопку воздержания
-    keyboard.add(InlineKeyboardButton("🤐 Воздержаться", callback_data="vote_abstain"))
+    callback = encode_callback(CallbackAction.ABSTAIN, chat_id, nonce)
+    keyboard.add(InlineKeyboardButton("🤐 Воздержаться", callback_data=callback))
     return keyboard
 
 
-def get_private_character_keyboard(player, current_phase=None) -> InlineKeyboardMarkup:
+@cached_keyboard(_reveal_state_key)
+def get_private_character_keyboard(player, game) -> InlineKeyboardMarkup:
     """Клавиатура для управления персонажем в ЛС"""
     keyboard = InlineKeyboardMarkup(row_width=3)
 
@@ -231,27 +336,28 @@ def get_private_character_keyboard(player, current_phase=None) -> InlineKeyboard
     cards = []
 
     # Ограничения только для первой фазы
-    if current_phase == "card_reveal_1":
+    if game.phase.value == "card_reveal_1":
         # В первой фазе только профессия
-        card_info = [("💼", "reveal_profession", "profession")]
+        card_info = [("💼", "profession")]
     else:
         # В остальных фазах все карточки
         card_info = [
-            ("💼", "reveal_profession", "profession"),
-            ("👤", "reveal_biology", "biology"),
-            ("🫁", "reveal_health", "health"),
-            ("🗣", "reveal_phobia", "phobia"),
-            ("🎮", "reveal_hobby", "hobby"),
-            ("🔎", "reveal_fact", "fact"),
-            ("📦", "reveal_baggage", "baggage")
+            ("💼", "profession"),
+            ("👤", "biology"),
+            ("🫁", "health"),
+            ("🗣", "phobia"),
+            ("🎮", "hobby"),
+            ("🔎", "fact"),
+            ("📦", "baggage")
         ]
 
-    for emoji, callback, card_type in card_info:
+    for emoji, card_type in card_info:
         # Проверяем не раскрыта ли карта и не воздержался ли игрок
         not_revealed = not player.character.revealed_cards.get(card_type, False)
         not_abstained = not getattr(player, f'abstained_card_{card_type}', False)
 
         if not_revealed and not_abstained:
+            callback = encode_card_reveal(game.chat_id, game.phase_nonce, card_type)
             cards.append(InlineKeyboardButton(emoji, callback_data=callback))
 
     # Добавляем кнопки по 3 в ряд
@@ -266,15 +372,17 @@ def get_private_character_keyboard(player, current_phase=None) -> InlineKeyboard
     if (player.character.special_card and
             hasattr(player, 'special_card_used') and
             not player.special_card_used):
-        keyboard.row(InlineKeyboardButton("⚡ Использовать спецкарточку", callback_data="use_special_card"))
+        callback = encode_callback(CallbackAction.SPECIAL, game.chat_id, game.phase_nonce)
+        keyboard.row(InlineKeyboardButton("⚡ Использовать спецкарточку", callback_data=callback))
 
     # НОВОЕ: кнопка возврата в группу
-    from config import GROUP_CHAT_ID
     if GROUP_CHAT_ID:
         keyboard.row(InlineKeyboardButton("🔙 Вернуться в группу", url=f"https://t.me/c/{abs(GROUP_CHAT_ID)}/1"))
 
     return keyboard
 
+
+@cached_keyboard(_cards_menu_key)
 def get_cards_menu_inline_keyboard(chat_id: int, game_manager=None) -> InlineKeyboardMarkup:
     """Клавиатура для перехода в бота для управления карточками"""
     keyboard = InlineKeyboardMarkup(row_width=1)
@@ -284,18 +392,15 @@ def get_cards_menu_inline_keyboard(chat_id: int, game_manager=None) -> InlineKey
         game = game_manager.games[chat_id]
         if getattr(game, 'first_voting_completed', False):
             # После первого голосования - только переход в бота
-            bot_username = "bunker_nnkf_bot"  # Замените на username вашего бота
-            url = f"https://t.me/{bot_username}"
+            url = f"https://t.me/{BOT_USERNAME}"
             keyboard.add(InlineKeyboardButton("🃏 Перейти в бота", url=url))
         else:
             # До первого голосования - переход с параметрами
-            bot_username = "bunker_nnkf_bot"
-            url = f"https://t.me/{bot_username}?start=cards_{chat_id}"
+            url = f"https://t.me/{BOT_USERNAME}?start=cards_{chat_id}"
             keyboard.add(InlineKeyboardButton("🃏 Управлять карточками", url=url))
     else:
         # Fallback
-        bot_username = "bunker_nnkf_bot"
-        url = f"https://t.me/{bot_username}?start=cards_{chat_id}"
+        url = f"https://t.me/{BOT_USERNAME}?start=cards_{chat_id}"
         keyboard.add(InlineKeyboardButton("🃏 Управлять карточками", url=url))
 
-    return keyboard
\ No newline at end of file
+    return keyboard
@@ -0,0 +1,179 @@
+# logging_setup.py
+"""Неблокирующее логирование.
+
+Потоки игры только кладут запись в очередь (QueueHandler), а в файл и консоль
+пишет отдельный поток QueueListener. Файл ротируется по размеру или по времени,
+старые части сжимаются в .gz. В файл записи идут в JSON (по строке на запись)
+с контекстом: chat_id, user_id и фазой игры.
+"""
+import atexit
+import contextlib
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Callable, Optional
+
+# Контекст текущего потока обработки (обновление, таймер)
+_context = threading.local()
+
+# chat_id -> название фазы; задается менеджером игр
+_phase_provider: Optional[Callable[[int], Optional[str]]] = None
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+CONTEXT_FIELDS = ('chat_id', 'user_id', 'phase', 'trace_id')
+
+
+def bind_log_context(**fields):
+    """Задает контекст логов для текущего потока (chat_id, user_id, phase)"""
+    for key, value in fields.items():
+        setattr(_context, key, value)
+
+
+def clear_log_context():
+    """Сбрасывает контекст логов текущего потока"""
+    _context.__dict__.clear()
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Контекст логов на время блока (прежний восстанавливается)"""
+    previous = dict(_context.__dict__)
+    bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        _context.__dict__.clear()
+        _context.__dict__.update(previous)
+
+
+def set_phase_provider(provider: Optional[Callable[[int], Optional[str]]]):
+    """Задает функцию, возвращающую фазу игры по chat_id"""
+    global _phase_provider
+    _phase_provider = provider
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет в запись chat_id/user_id/phase из контекста потока.
+
+    Работает в потоке, который пишет лог, поэтому фаза берется на момент события,
+    а не на момент записи в файл.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field in ('chat_id', 'user_id', 'trace_id'):
+            if not hasattr(record, field):
+                setattr(record, field, getattr(_context, field, None))
+
+        if not hasattr(record, 'phase'):
+            phase = getattr(_context, 'phase', None)
+            if phase is None and record.chat_id is not None and _phase_provider:
+                try:
+                    phase = _phase_provider(record.chat_id)
+                except Exception:
+                    phase = None
+            record.phase = phase
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+
+def _gzip_rotator(source: str, dest: str):
+    """Сжимает закрытую часть лога"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _create_file_handler(config: dict) -> logging.Handler:
+    if config.get('rotation', 'size') == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            config['file'], when=config.get('when', 'midnight'),
+            backupCount=config.get('backup_count', 7), encoding='utf-8'
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            config['file'], maxBytes=config.get('max_bytes', 5 * 1024 * 1024),
+            backupCount=config.get('backup_count', 7), encoding='utf-8'
+        )
+
+    if config.get('compress', True):
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging(config: dict):
+    """Настраивает корневой логгер: очередь + фоновый поток записи.
+
+    Повторный вызов (например, в процессе-воркере с другим файлом) заменяет
+    прежнюю настройку.
+    """
+    global _listener
+
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    file_handler = _create_file_handler(config)
+    if config.get('json', True):
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(config['format']))
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(config['format']))
+
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, config['level']))
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Дописывает очередь логов и останавливает поток записи"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
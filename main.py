@@ -22,7 +22,7 @@ from pathlib import Path
 # Добавляем текущую директорию в путь для импортов
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import BOT_TOKEN, ADMIN_IDS, DATA_DIR
+from config import BOT_TOKEN, ADMIN_IDS, DATA_DIR, SHARDING_SETTINGS
 from bot import BunkerBot
 
 logger = logging.getLogger(__name__)
@@ -73,6 +73,9 @@ def main():
                 print("\n⚠️ Предупреждения обнаружены, но бот может работать.")
                 time.sleep(3)
 
+        if SHARDING_SETTINGS['WORKERS'] > 1:
+            return run_sharded()
+
         # Создаем и запускаем бота
         bot = BunkerBot()
         print("✅ Бот успешно инициализирован")
@@ -99,6 +102,22 @@ def main():
         return 1
 
 
+def run_sharded():
+    """Запуск в многопроцессном режиме (фронт-процесс + воркеры)"""
+    from sharding import ShardedBot
+
+    sharded = ShardedBot(BOT_TOKEN, SHARDING_SETTINGS['WORKERS'], SHARDING_SETTINGS['QUEUE_SIZE'],
+                         SHARDING_SETTINGS['RESTART_DELAY'])
+    print(f"🧩 Многопроцессный режим: воркеров {SHARDING_SETTINGS['WORKERS']}")
+    print("-" * 50)
+
+    try:
+        sharded.start_polling()
+    finally:
+        sharded.stop()
+    return 0
+
+
 def install_requirements():
     """Установка зависимостей"""
     try:
@@ -121,6 +140,8 @@ def show_help():
   python main.py          - Запуск бота
   python main.py --help   - Эта справка
   python main.py --check  - Проверка конфигурации
+  python benchmark_storage.py - Сравнение хранилищ (STORAGE_BACKEND)
+  SHARD_WORKERS=4 python main.py - Многопроцессный режим (карточки только для чтения)
 
 ⚙️ Настройка:
 1. Получите токен бота у @BotFather
@@ -146,6 +167,9 @@ def show_help():
   /help  - Справка
   /admin - Панель администратора (только для админа)
   /stop  - Остановить игру (админ игры)
+  /plan  - План игры (админ игры)
+  /traces - Медленные трассы обработки (только для админа)
+  /profile - Профиль потоков бота (только для админа)
 
 🌐 Поддержка:
   - Создавайте игры в группах
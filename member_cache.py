@@ -0,0 +1,120 @@
+# member_cache.py
+"""Кэш ответов Telegram о составе чатов (администраторы, участники).
+
+Проверка прав на каждом нажатии не должна стоить запроса к API:
+  - ответы живут TTL секунд, ошибки и "не найден" - короткий negative TTL;
+  - обновление chat_member сбрасывает все записи своего чата;
+  - одновременные запросы одного ключа ждут один общий запрос (single-flight).
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Выполняющийся запрос, который ждут остальные потоки"""
+
+    __slots__ = ('event', 'value')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+
+
+class MemberCache:
+    """TTL-кэш с отрицательным кэшированием, сбросом по чату и single-flight"""
+
+    def __init__(self, ttl: float = 60, negative_ttl: float = 10, max_size: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+
+        # key -> (значение, момент истечения)
+        self._items: OrderedDict = OrderedDict()
+        self._chat_keys: Dict[int, Set[tuple]] = {}
+        self._flights: Dict[tuple, _Flight] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key: tuple, loader: Callable[[], Any], default: Any = None) -> Any:
+        """Значение из кэша или результат loader().
+
+        key[1] - chat_id (по нему сбрасываются записи). Исключение loader'а
+        и ответ None кэшируются как default на negative_ttl.
+        """
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            flight = self._flights.get(key)
+            waiting = flight is not None
+            if waiting:
+                self.shared += 1
+            else:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+
+        if waiting:
+            flight.event.wait()
+            return flight.value
+
+        value, ttl = default, self.negative_ttl
+        try:
+            result = loader()
+            if result is not None:
+                value, ttl = result, self.ttl
+        except Exception as e:
+            logger.warning(f"Запрос {key[0]} для чата {key[1]} не удался, ответ закэширован на {self.negative_ttl:.0f} с: {e}")
+        finally:
+            with self._lock:
+                self._store(key, value, ttl)
+                del self._flights[key]
+            flight.value = value
+            flight.event.set()
+
+        return value
+
+    def _store(self, key: tuple, value: Any, ttl: float):
+        self._items[key] = (value, time.monotonic() + ttl)
+        self._items.move_to_end(key)
+        self._chat_keys.setdefault(key[1], set()).add(key)
+
+        while len(self._items) > self.max_size:
+            old_key, _ = self._items.popitem(last=False)
+            self._forget_chat_key(old_key)
+
+    def _forget_chat_key(self, key: tuple):
+        keys = self._chat_keys.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._chat_keys[key[1]]
+
+    def invalidate_chat(self, chat_id: int):
+        """Сбрасывает все записи чата (изменился состав или права участников)"""
+        with self._lock:
+            for key in self._chat_keys.pop(chat_id, ()):
+                self._items.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._chat_keys.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает статистику кэша"""
+        with self._lock:
+            return {'size': len(self._items), 'hits': self.hits, 'misses': self.misses,
+                    'shared': self.shared, 'invalidations': self.invalidations}
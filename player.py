@@ -31,6 +31,14 @@ class PlayerCharacter:
                 'special_card': False
             }
 
+    def get_card_value(self, card_type: str) -> str:
+        """Возвращает текст карточки персонажа по ее типу"""
+        if card_type == 'biology':
+            return f"{self.gender} {self.age} лет"
+        if card_type == 'health':
+            return f"{self.body_type}, {self.disease}"
+        return str(getattr(self, card_type, ''))
+
 class Player:
     """Класс игрока"""
     
@@ -45,8 +53,13 @@ class Player:
         self.vote_target: Optional[int] = None
         self.is_admin = False
         
-    def _weighted_choice(self, choices: List[Tuple[str, int]]) -> str:
-        """Выбирает элемент с учетом весов"""
+    def _weighted_choice(self, choices: List[Tuple[str, int]], alias_table: tuple = None) -> str:
+        """Выбирает элемент с учетом весов (по таблице псевдонимов, если она есть)"""
+        if alias_table:
+            cards, prob, alias = alias_table
+            index = random.randrange(len(cards))
+            return cards[index] if random.random() < prob[index] else cards[alias[index]]
+
         if not choices:
             return ""
         
@@ -64,15 +77,19 @@ class Player:
         
         return choices[0][0]  # Fallback
 
-    def generate_character(self, cards_data: Dict[str, List]) -> PlayerCharacter:
+    def generate_character(self, cards_data: Dict[str, List], alias_tables: Dict[str, tuple] = None) -> PlayerCharacter:
         """Генерирует случайного персонажа"""
+        alias_tables = alias_tables or {}
+
         # Генерируем пол и возраст
-        gender = self._weighted_choice(cards_data.get('biology', [('Мужчина', 1)]))
+        gender = self._weighted_choice(cards_data.get('biology', [('Мужчина', 1)]), alias_tables.get('biology'))
         age = random.randint(16, 100)
 
         # Генерируем телосложение и заболевание
-        body_type = self._weighted_choice(cards_data.get('health_body', [('Обычный', 1)]))
-        disease = self._weighted_choice(cards_data.get('health_disease', [('Полностью здоров', 1)]))
+        body_type = self._weighted_choice(cards_data.get('health_body', [('Обычный', 1)]),
+                                          alias_tables.get('health_body'))
+        disease = self._weighted_choice(cards_data.get('health_disease', [('Полностью здоров', 1)]),
+                                        alias_tables.get('health_disease'))
 
         # Генерируем специальную карточку (используем настройку из config)
         from config import GAME_SETTINGS
@@ -210,7 +227,7 @@ class Player:
             card = special_cards[card_id]
 
             # ИСПРАВЛЕНО: передаем game_manager через игру для доступа к системе сохранения
-            if hasattr(game, 'chat_id'):
+            if hasattr(game, 'chat_id') and not getattr(game, 'game_manager', None):
                 # Находим game_manager через глобальный доступ или передаем его
                 import bot
                 if hasattr(bot, '_bot_instance') and bot._bot_instance:
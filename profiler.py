@@ -0,0 +1,120 @@
+# profiler.py
+"""Сэмплирующий профилировщик всех потоков процесса.
+
+Фоновый поток раз в interval снимает стеки всех потоков (sys._current_frames)
+и считает, какие функции чаще всего оказываются на вершине (собственное время)
+и в стеке вообще (полное время). Накладные расходы не зависят от числа вызовов
+в профилируемом коде, поэтому его можно включать на живом боте.
+
+Результат - таблица топ-N функций и стеки в collapsed-формате
+("поток;внешняя;...;внутренняя количество"), который понимают flamegraph.pl
+и speedscope.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileResult:
+    """Результат профилирования"""
+
+    def __init__(self, stacks: Counter, self_counts: Counter, total_counts: Counter,
+                 samples: int, duration: float, interval: float):
+        self.stacks = stacks
+        self.self_counts = self_counts
+        self.total_counts = total_counts
+        self.samples = samples
+        self.duration = duration
+        self.interval = interval
+
+    def top_functions(self, limit: int = 20) -> List[Tuple[str, int, int]]:
+        """Функции с наибольшим собственным временем: (функция, собственных, всего)"""
+        return [(label, count, self.total_counts[label])
+                for label, count in self.self_counts.most_common(limit)]
+
+    def format_table(self, limit: int = 20) -> str:
+        """Текстовая таблица топ-N функций"""
+        if not self.samples:
+            return "Нет сэмплов"
+
+        lines = [f"Сэмплов: {self.samples} за {self.duration:.1f} с (шаг {self.interval * 1000:.0f} мс)",
+                 f"{'self%':>6} {'total%':>7}  функция"]
+        for label, self_count, total_count in self.top_functions(limit):
+            lines.append(f"{self_count * 100 / self.samples:>6.1f} {total_count * 100 / self.samples:>7.1f}  {label}")
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """Стеки в collapsed-формате для flamegraph"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик. Одновременно может работать только один"""
+
+    _running_lock = threading.Lock()
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+
+    def profile(self, seconds: float) -> ProfileResult:
+        """Снимает сэмплы в течение seconds и возвращает результат (блокирует вызывающий поток)"""
+        if not self._running_lock.acquire(blocking=False):
+            raise RuntimeError("Профилирование уже запущено")
+
+        try:
+            return self._sample(seconds)
+        finally:
+            self._running_lock.release()
+
+    def _sample(self, seconds: float) -> ProfileResult:
+        stacks: Counter = Counter()
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        samples = 0
+
+        own_ident = threading.get_ident()
+        labels: Dict[object, str] = {}
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while time.perf_counter() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+
+                stack = []
+                depth = 0
+                while frame is not None and depth < self.max_depth:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                    depth += 1
+
+                if not stack:
+                    continue
+
+                samples += 1
+                self_counts[stack[0]] += 1
+                for label in set(stack):
+                    total_counts[label] += 1
+
+                thread_name = thread_names.get(ident, str(ident)).replace(';', '_').replace(' ', '_')
+                stacks[";".join([thread_name] + stack[::-1])] += 1
+
+            time.sleep(self.interval)
+
+        return ProfileResult(stacks, self_counts, total_counts, samples,
+                             time.perf_counter() - started, self.interval)
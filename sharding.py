@@ -0,0 +1,277 @@
+# sharding.py
+"""Многопроцессный режим: игры распределяются по процессам-воркерам по chat_id.
+
+Фронт-процесс сам получает обновления (getUpdates) и, не разбирая их в объекты,
+раскладывает по очередям воркеров:
+  - сообщения и колбэки групп - по chat_id группы;
+  - закодированные игровые колбэки из ЛС - по chat_id игры из callback_data;
+  - диплинки /start vote_<chat_id> и /start cards_<chat_id> - по chat_id игры
+    из параметра команды;
+  - прочие сообщения и колбэки из ЛС - по последней группе, где фронт видел
+    пользователя (иначе по его user_id).
+Каждый воркер - полноценный BunkerBot со своим GameManager, таймерами и
+сохранением; пулы карточек в воркерах только для чтения.
+"""
+import multiprocessing
+import queue
+import signal
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from callback_codec import decode_callback
+
+logger = logging.getLogger(__name__)
+
+_STOP = None
+
+# Параметры /start, в которых передается chat_id игры (см. handlers.start_command)
+_START_CHAT_PREFIXES = ('vote_', 'cards_')
+
+
+def decode_start_param(text: str) -> Optional[int]:
+    """Извлекает chat_id игры из диплинка /start vote_<chat_id> или cards_<chat_id>"""
+    parts = text.split()
+    if len(parts) < 2 or parts[0].split('@')[0] != '/start':
+        return None
+
+    param = parts[1]
+    for prefix in _START_CHAT_PREFIXES:
+        if param.startswith(prefix):
+            try:
+                return int(param[len(prefix):])
+            except ValueError:
+                return None
+    return None
+
+
+def shard_for_chat(chat_id: int, workers: int) -> int:
+    """Стабильный номер воркера для чата (одинаковый во всех процессах и запусках)"""
+    return zlib.crc32(str(chat_id).encode('ascii')) % workers
+
+
+class ShardRouter:
+    """Выбирает воркер для сырого обновления Telegram (dict из getUpdates)"""
+
+    def __init__(self, workers: int, max_users: int = 100000):
+        self.workers = workers
+        self.max_users = max_users
+        # user_id -> chat_id группы, где пользователь последний раз играл
+        self._user_chats: OrderedDict = OrderedDict()
+        self.routed = [0] * workers
+
+    def _remember_user(self, user_id: int, chat_id: int):
+        self._user_chats[user_id] = chat_id
+        self._user_chats.move_to_end(user_id)
+        while len(self._user_chats) > self.max_users:
+            self._user_chats.popitem(last=False)
+
+    def _chat_key(self, chat: dict, user: Optional[dict]) -> int:
+        """Ключ шардирования для чата, из которого пришло обновление"""
+        user_id = user.get('id') if user else None
+        if chat.get('type') != 'private':
+            if user_id:
+                self._remember_user(user_id, chat['id'])
+            return chat['id']
+
+        return self._user_chats.get(user_id, chat['id'])
+
+    def route_key(self, update: dict) -> Optional[int]:
+        """Возвращает chat_id, по которому шардируется обновление"""
+        message = update.get('message') or update.get('edited_message')
+        if message:
+            if message['chat'].get('type') == 'private':
+                chat_id = decode_start_param(message.get('text') or "")
+                if chat_id is not None:
+                    user = message.get('from')
+                    if user:
+                        self._remember_user(user['id'], chat_id)
+                    return chat_id
+            return self._chat_key(message['chat'], message.get('from'))
+
+        callback = update.get('callback_query')
+        if callback:
+            payload = decode_callback(callback.get('data') or "")
+            if payload:
+                return payload.chat_id
+
+            message = callback.get('message')
+            if message:
+                return self._chat_key(message['chat'], callback.get('from'))
+            return callback['from']['id']
+
+        member_update = update.get('my_chat_member') or update.get('chat_member')
+        if member_update:
+            return member_update['chat']['id']
+
+        return None
+
+    def route(self, update: dict) -> int:
+        """Номер воркера для обновления"""
+        key = self.route_key(update)
+        shard = shard_for_chat(key, self.workers) if key is not None else 0
+        self.routed[shard] += 1
+        return shard
+
+
+def _worker_main(index: int, updates_queue):
+    """Точка входа процесса-воркера"""
+    from telebot import types
+    from config import USER_STATE_SETTINGS, LOGGING_CONFIG
+    from logging_setup import setup_logging
+    import bot as bot_module
+
+    # Свой файл лога у каждого воркера: ротацию одного файла несколько процессов не поделят
+    setup_logging(dict(LOGGING_CONFIG, file=f"{LOGGING_CONFIG['file']}.worker{index}"))
+
+    if USER_STATE_SETTINGS['PERSIST_FILE']:
+        USER_STATE_SETTINGS['PERSIST_FILE'] = f"{USER_STATE_SETTINGS['PERSIST_FILE']}.{index}"
+
+    bunker_bot = bot_module.BunkerBot(worker_index=index)
+    bot_module._bot_instance = bunker_bot
+    # Воркер останавливается по маркеру из очереди, а не по Ctrl+C всей группы процессов
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.info(f"Воркер {index} запущен")
+
+    while True:
+        raw_update = updates_queue.get()
+        if raw_update is _STOP:
+            break
+
+        try:
+            update = types.Update.de_json(raw_update)
+            bunker_bot.bot.process_new_updates([update])
+        except Exception as e:
+            logger.error(f"Воркер {index}: ошибка обработки обновления: {e}")
+
+    bunker_bot.stop()
+    logger.info(f"Воркер {index} остановлен")
+
+
+class ShardedBot:
+    """Фронт-процесс: получает обновления и раздает их воркерам.
+
+    Очередь воркера ограничена, и фронт в нее не блокируется: обновление для
+    переполненной очереди или упавшего воркера отбрасывается, остальные шарды
+    получают свои без задержки. Упавший воркер перезапускается через
+    restart_delay с новой очередью."""
+
+    def __init__(self, token: str, workers: int, queue_size: int = 1000, restart_delay: float = 5.0):
+        self.token = token
+        self.workers = workers
+        self.queue_size = queue_size
+        self.restart_delay = restart_delay
+        self.router = ShardRouter(workers)
+
+        self._context = multiprocessing.get_context('spawn')
+        self.queues: list = [None] * workers
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        for index in range(workers):
+            self._create_worker(index)
+
+        self._running = False
+        self._dead_workers: Dict[int, float] = {}  # номер воркера -> когда замечено падение
+        self._congested = set()
+        self.dropped = [0] * workers
+        self.restarts = [0] * workers
+
+    def _create_worker(self, index: int):
+        """Новая очередь и процесс воркера (процесс еще не запущен)"""
+        self.queues[index] = self._context.Queue(maxsize=self.queue_size)
+        self.processes[index] = self._context.Process(
+            target=_worker_main, args=(index, self.queues[index]),
+            name=f"bunker-worker-{index}", daemon=True
+        )
+
+    def start_polling(self, long_polling_timeout: int = 50):
+        """Запускает воркеры и цикл получения обновлений"""
+        from telebot import apihelper, util
+
+        for process in self.processes:
+            process.start()
+        logger.info(f"Запущено воркеров: {self.workers}")
+
+        self._running = True
+        offset = None
+        while self._running:
+            try:
+                updates = apihelper.get_updates(
+                    self.token, offset=offset, timeout=long_polling_timeout + 10,
+                    long_polling_timeout=long_polling_timeout,
+                    allowed_updates=util.update_types
+                )
+            except Exception as e:
+                logger.error(f"Ошибка получения обновлений: {e}")
+                time.sleep(3)
+                continue
+
+            self._check_workers()
+            for raw_update in updates:
+                offset = raw_update['update_id'] + 1
+                try:
+                    self._dispatch(raw_update)
+                except Exception as e:
+                    logger.error(f"Ошибка маршрутизации обновления {raw_update.get('update_id')}: {e}")
+
+    def _dispatch(self, raw_update: dict):
+        """Кладет обновление в очередь его воркера, не дожидаясь места"""
+        shard = self.router.route(raw_update)
+        if shard in self._dead_workers:
+            self.dropped[shard] += 1
+            return
+
+        try:
+            self.queues[shard].put_nowait(raw_update)
+        except queue.Full:
+            self.dropped[shard] += 1
+            if shard not in self._congested:
+                self._congested.add(shard)
+                logger.warning(f"Очередь воркера {shard} переполнена ({self.queue_size}), обновления его чатов "
+                               f"отбрасываются")
+            return
+        self._congested.discard(shard)
+
+    def _check_workers(self):
+        """Замечает упавшие воркеры и перезапускает их после паузы"""
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if index not in self._dead_workers:
+                if not process.is_alive():
+                    self._dead_workers[index] = now
+                    logger.error(f"Воркер {index} завершился (код {process.exitcode}), перезапуск через "
+                                 f"{self.restart_delay:g} с; до него обновления его чатов отбрасываются")
+                continue
+
+            if now - self._dead_workers[index] < self.restart_delay:
+                continue
+
+            # Очередь новая: упавший процесс мог оставить старую с захваченной блокировкой чтения
+            old_queue = self.queues[index]
+            old_queue.cancel_join_thread()
+            old_queue.close()
+            self._create_worker(index)
+            self.processes[index].start()
+            del self._dead_workers[index]
+            self._congested.discard(index)
+            self.restarts[index] += 1
+            logger.warning(f"Воркер {index} перезапущен (раз: {self.restarts[index]}); игры, которые он держал "
+                           f"в памяти, без кластерного режима потеряны")
+
+    def stop(self):
+        """Останавливает прием обновлений и дожидается воркеров"""
+        self._running = False
+        for index, updates_queue in enumerate(self.queues):
+            if not self.processes[index].is_alive():
+                continue
+            try:
+                updates_queue.put(_STOP, timeout=5)
+            except queue.Full:
+                logger.error(f"Воркер {index} не принял сигнал остановки: очередь переполнена")
+        for process in self.processes:
+            if process.pid is not None:
+                process.join(timeout=15)
+
+        logger.info(f"Обновлений по воркерам: {self.router.routed}, отброшено: {self.dropped}, "
+                    f"перезапусков: {self.restarts}")
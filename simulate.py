@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Монте-Карло симулятор игр без Telegram.
+
+Два режима:
+  - движок (--engine): настоящие Game/GameManager с пустым транспортом (NullBot)
+    и виртуальными часами вместо потоков-таймеров, игроками управляет политика
+    голосования. Медленнее, зато это ровно логика бота;
+  - быстрый (по умолчанию): та же модель раздачи карточек и голосований по плану
+    игры (game_plan), посчитанная сразу для пачки игр на NumPy. Без NumPy - тот
+    же расчет циклом на Python.
+
+Модель игроков: каждый ход и голос занимает случайное время из --think, доля
+--idle молчит до таймаута, доля --abstain воздерживается. Ничья, как в движке,
+ведет к одному переголосованию между лидерами, повторная ничья никого не
+исключает; игра движка, которая не дошла до конца, попадает в исходы как
+"не завершилась". Совпадение быстрого режима с движком проверяет
+tests/test_simulate.py.
+
+NumPy необязателен (requirements-optional.txt).
+
+Запуск:
+
+    python simulate.py [--players 8] [--games 100000] [--policy random|focused]
+                       [--abstain 0.1] [--idle 0.05] [--think 5,40] [--rules classic]
+                       [--engine] [--seed N]
+"""
+import argparse
+import itertools
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # быстрый режим считает циклом на Python
+    np = None
+
+from config import CARD_ANALYTICS_SETTINGS, CLUSTER_SETTINGS, FANOUT_SETTINGS, GAME_SETTINGS, HISTORY_SETTINGS
+from game_plan import CARD_PHASES, GamePlan, build_game_plan
+
+# Категории раздачи: (пул в cards_data, поле персонажа)
+DEAL_CATEGORIES = (
+    ('professions', 'profession'), ('biology', 'gender'), ('health_body', 'body_type'),
+    ('health_disease', 'disease'), ('phobias', 'phobia'), ('hobbies', 'hobby'),
+    ('facts', 'fact'), ('baggage', 'baggage'),
+)
+
+# Карточка, которую раскрывают в фазе (как в GameManager._start_next_turn)
+PHASE_CARDS = {1: 'profession', 2: 'biology', 3: 'health', 4: 'phobia', 5: 'hobby', 6: 'fact', 7: 'baggage'}
+
+CHUNK_GAMES = 10000
+MAX_ENGINE_STEPS = 10000
+
+
+class NullBot:
+    """Пустой транспорт: любой метод Bot API успешен, send_* возвращают сообщение"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            with self._lock:
+                self.calls[name] += 1
+                message_id = next(self._message_ids)
+            return SimpleNamespace(message_id=message_id) if name.startswith('send_') else True
+        return method
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+
+class VirtualTimer:
+    """GameTimer на виртуальных часах: срабатывания выполняет драйвер симуляции"""
+
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        self.timers: Dict[str, tuple] = {}  # timer_id -> (срок, порядок, колбэк, args, kwargs)
+        self._order = itertools.count()
+
+    def start_timer(self, timer_id: str, duration: float, callback, *args, **kwargs):
+        self.timers[timer_id] = (self.clock.now + duration, next(self._order), callback, args, kwargs)
+
+    def stop_timer(self, timer_id: str) -> bool:
+        return self.timers.pop(timer_id, None) is not None
+
+    def is_active(self, timer_id: str) -> bool:
+        return timer_id in self.timers
+
+    def stop_all_timers(self):
+        self.timers.clear()
+
+    def next_due(self) -> Optional[Tuple[float, int, str]]:
+        if not self.timers:
+            return None
+        timer_id, (due, order, _, _, _) = min(self.timers.items(), key=lambda item: item[1][:2])
+        return due, order, timer_id
+
+    def fire(self, timer_id: str):
+        due, _, callback, args, kwargs = self.timers.pop(timer_id)
+        self.clock.now = max(self.clock.now, due)
+        callback(*args, **kwargs)
+
+
+class VirtualScheduler:
+    """Общая очередь срабатываний нескольких VirtualTimer"""
+
+    def __init__(self, clock: VirtualClock, timers: List[VirtualTimer]):
+        self.clock = clock
+        self.timers = timers
+        self.fired = 0
+
+    def _next(self):
+        candidates = [(timer.next_due(), timer) for timer in self.timers]
+        candidates = [(due, timer) for due, timer in candidates if due is not None]
+        return min(candidates, key=lambda item: item[0][:2]) if candidates else None
+
+    def run_next(self) -> bool:
+        """Выполняет ближайшее срабатывание (False - ждать нечего)"""
+        candidate = self._next()
+        if candidate is None:
+            return False
+        (_, _, timer_id), timer = candidate
+        self.fired += 1
+        timer.fire(timer_id)
+        return True
+
+    def advance_to(self, moment: float):
+        """Переводит часы, выполняя все срабатывания до этого момента"""
+        while True:
+            candidate = self._next()
+            if candidate is None or candidate[0][0] > moment:
+                break
+            self.run_next()
+        self.clock.now = max(self.clock.now, moment)
+
+
+def create_headless_manager(clock: VirtualClock):
+    """GameManager без Telegram, истории и кластера: состояние игр в памяти, таймеры виртуальные"""
+    HISTORY_SETTINGS['ENABLED'] = False
+    CARD_ANALYTICS_SETTINGS['ENABLED'] = False
+    CLUSTER_SETTINGS['ENABLED'] = False
+    GAME_SETTINGS['BOARD_MODE'] = False
+    # Рассылки идут в NullBot - лимит частоты Telegram не нужен
+    FANOUT_SETTINGS['RATE'] = FANOUT_SETTINGS['BURST'] = 10 ** 9
+
+    from game_manager import GameManager
+    from storage import MemoryStorage
+
+    manager = GameManager(NullBot(), cards_read_only=True)
+    # Карточки загружены из настоящего хранилища, игры пишутся только в память
+    manager.storage = MemoryStorage()
+    manager.phase_timer.timer = VirtualTimer(clock)
+    manager.notification_timer.timer = VirtualTimer(clock)
+    return manager
+
+
+class RandomPolicy:
+    """Голос против случайного живого игрока, раскрытие - карточка фазы"""
+
+    name = 'random'
+
+    def __init__(self, rng: random.Random, abstain: float = 0.1, idle: float = 0.05,
+                 think: Tuple[float, float] = (5.0, 40.0)):
+        self.rng = rng
+        self.abstain = abstain
+        self.idle = idle
+        self.think = think
+
+    def think_time(self) -> Optional[float]:
+        """Время на ход или голос (None - игрок молчит до таймаута)"""
+        if self.rng.random() < self.idle:
+            return None
+        return self.rng.uniform(*self.think)
+
+    def choose_target(self, voter_id: int, seats: List[int]) -> Optional[int]:
+        """Цель голоса среди живых по порядку мест (None - воздержаться)"""
+        if self.rng.random() < self.abstain:
+            return None
+        return self.rng.choice([seat for seat in seats if seat != voter_id])
+
+    def choose_card(self, character, card_number: int) -> str:
+        card_type = PHASE_CARDS[card_number]
+        if card_number == 1 or not character.revealed_cards.get(card_type, False):
+            return card_type
+        hidden = [card for card in PHASE_CARDS.values() if not character.revealed_cards.get(card, False)]
+        return self.rng.choice(hidden) if hidden else card_type
+
+
+class FocusedPolicy(RandomPolicy):
+    """Сценарий: все голосуют против первого живого по порядку мест, он сам - против второго"""
+
+    name = 'focused'
+
+    def choose_target(self, voter_id: int, seats: List[int]) -> Optional[int]:
+        if self.rng.random() < self.abstain:
+            return None
+        return next(seat for seat in seats if seat != voter_id)
+
+
+POLICIES = {policy.name: policy for policy in (RandomPolicy, FocusedPolicy)}
+
+
+class SimulationStats:
+    """Распределения по сыгранным играм"""
+
+    def __init__(self, player_count: int, mode: str, policy: str):
+        self.player_count = player_count
+        self.mode = mode
+        self.policy = policy
+        self.games = 0
+        self.durations: List[float] = []
+        self.votes_held = 0
+        self.ties = 0
+        self.api_calls = 0
+        self.outcomes = Counter()  # slots - места заняты, plan - план окончен, stalled - не завершилась
+        self.eliminations = Counter()  # фаза раскрытия -> исключений после нее
+        self.card_counts: Dict[str, Counter] = {category: Counter() for category, _ in DEAL_CATEGORIES}
+        self.duplicate_games = Counter()  # категория -> игр с одинаковыми карточками у двух игроков
+        self.elapsed = 0.0
+
+    def add_characters(self, characters):
+        for category, field in DEAL_CATEGORIES:
+            values = [getattr(character, field) for character in characters]
+            self.card_counts[category].update(values)
+            if len(set(values)) < len(values):
+                self.duplicate_games[category] += 1
+
+    def format_report(self, top: int = 5) -> str:
+        games = max(1, self.games)
+        lines = [
+            f"🎲 {self.games} игр, {self.player_count} игроков, режим {self.mode}, политика {self.policy}",
+            f"⏱ {self.elapsed:.1f} с, {self.games / max(self.elapsed, 1e-9) * 60:.0f} игр/мин",
+        ]
+
+        if len(self.durations) >= 2:
+            deciles = statistics.quantiles(self.durations, n=10)
+            lines.append(f"Длительность, мин: p10 {deciles[0] / 60:.1f} | медиана {deciles[4] / 60:.1f} | "
+                         f"p90 {deciles[8] / 60:.1f} | среднее {statistics.fmean(self.durations) / 60:.1f}")
+
+        lines.append(f"Голосований за игру: {self.votes_held / games:.2f}, ничьих без исключения: {self.ties}")
+        lines.append("Исходы: " + " | ".join(
+            f"{label} {self.outcomes[key] / games:.1%}"
+            for key, label in (('slots', "места заняты"), ('plan', "план окончен"), ('stalled', "не завершилась"))
+        ))
+        if self.eliminations:
+            lines.append("Исключений после фазы: " + " | ".join(
+                f"{card}: {self.eliminations[card] / games:.2f}" for card in sorted(self.eliminations)
+            ))
+        if self.api_calls:
+            lines.append(f"Запросов к API на игру: {self.api_calls / games:.0f}")
+
+        lines.append(f"\nКарточки (топ-{top}, доля раздач; повтор - доля игр, где карточка досталась двоим):")
+        for category, _ in DEAL_CATEGORIES:
+            counts = self.card_counts[category]
+            total = sum(counts.values())
+            if not total:
+                continue
+            common = " | ".join(f"{card} {count / total:.1%}" for card, count in counts.most_common(top))
+            lines.append(f"  {category} ({len(counts)} шт., повтор {self.duplicate_games[category] / games:.1%}): {common}")
+
+        return "\n".join(lines)
+
+
+class EngineSimulator:
+    """Игры через настоящий GameManager"""
+
+    def __init__(self, policy: RandomPolicy):
+        self.clock = VirtualClock()
+        self.manager = create_headless_manager(self.clock)
+        self.scheduler = VirtualScheduler(self.clock, [self.manager.phase_timer.timer,
+                                                       self.manager.notification_timer.timer])
+        self.policy = policy
+
+    def play(self, chat_id: int, player_count: int, stats: SimulationStats):
+        from game_manager import GamePhase
+
+        manager = self.manager
+        manager.create_game(chat_id, 1)
+        for user_id in range(1, player_count + 1):
+            manager.join_game(chat_id, user_id, f"sim{user_id}", f"Игрок {user_id}")
+
+        game = manager.games[chat_id]
+        started = self.clock.now
+        calls_before = sum(manager.bot.calls.values())
+        if not manager.start_game(chat_id, 1):
+            raise RuntimeError(f"Игра на {player_count} игроков не запускается (ALLOWED_PLAYERS)")
+
+        handled = None
+        eliminated = 0
+        for _ in range(MAX_ENGINE_STEPS):
+            # Исключение случается в результатах голосования после текущей фазы раскрытия
+            if len(game.eliminated_players) > eliminated:
+                stats.eliminations[game.current_card_phase] += len(game.eliminated_players) - eliminated
+                eliminated = len(game.eliminated_players)
+            if chat_id not in manager.games:
+                break
+            state = (game.phase_nonce, game.current_turn_player_id, game.turn_started_at)
+            if state != handled and game.phase.value.startswith('card_reveal_') and game.current_turn_player_id:
+                handled = state
+                self._play_turn(chat_id, game)
+            elif state != handled and game.phase == GamePhase.VOTING:
+                handled = state
+                self._play_voting(chat_id, game)
+            elif not self.scheduler.run_next():
+                break  # ни действий, ни таймеров - игра встала
+
+        stalled = chat_id in manager.games
+        if stalled:
+            manager._cleanup_game(chat_id)
+
+        stats.games += 1
+        stats.durations.append(self.clock.now - started)
+        stats.votes_held += game.voting_round
+        # Ничья - раунд с голосами, после которого никого не исключили (как в быстром режиме)
+        voted = {round_number for round_number, _, target in game.vote_log if target is not None}
+        stats.ties += len(voted - {round_number for round_number, _, _ in game.elimination_log})
+        stats.api_calls += sum(manager.bot.calls.values()) - calls_before
+        stats.add_characters([player.character for player in game.players.values()])
+
+        plan = game.plan
+        if stalled:
+            stats.outcomes['stalled'] += 1
+        elif len(game.get_alive_players()) <= plan.bunker_slots:
+            stats.outcomes['slots'] += 1
+        else:
+            stats.outcomes['plan'] += 1
+
+    def _play_turn(self, chat_id: int, game):
+        player = game.players[game.current_turn_player_id]
+        think = self.policy.think_time()
+        if think is None or think >= GAME_SETTINGS['TURN_TIMEOUT']:
+            return  # ход закончит таймер
+
+        turn = (game.phase_nonce, player.user_id, game.turn_started_at)
+        self.scheduler.advance_to(self.clock.now + think)
+        if (game.phase_nonce, game.current_turn_player_id, game.turn_started_at) == turn:
+            self.manager.reveal_card(chat_id, player.user_id,
+                                     self.policy.choose_card(player.character, game.current_card_phase))
+
+    def _play_voting(self, chat_id: int, game):
+        from game_manager import GamePhase
+
+        started = self.clock.now
+        nonce = game.phase_nonce
+        voters = game.get_alive_players()
+        seats = sorted(player.user_id for player in game.get_vote_candidates())
+
+        decisions = []
+        for voter in voters:
+            think = self.policy.think_time()
+            if think is not None and think < GAME_SETTINGS['VOTING_TIME']:
+                decisions.append((think, voter))
+
+        for think, voter in sorted(decisions, key=lambda decision: decision[0]):
+            self.scheduler.advance_to(started + think)
+            if game.phase != GamePhase.VOTING or game.phase_nonce != nonce:
+                return
+
+            target = self.policy.choose_target(voter.user_id, seats)
+            if target is None:
+                self.manager.abstain_player(chat_id, voter.user_id)
+            else:
+                self.manager.vote_player(chat_id, voter.user_id, target)
+            self.manager.check_voting_complete(chat_id)
+
+
+def _card_pools(cards_data: Dict[str, list]) -> Dict[str, Tuple[list, Optional[list]]]:
+    """Пулы раздачи: категория -> (карточки, веса или None для равных)"""
+    pools = {}
+    for category, _ in DEAL_CATEGORIES:
+        cards = cards_data.get(category) or []
+        if not cards:
+            continue
+        if isinstance(cards[0], (tuple, list)):
+            pools[category] = ([card for card, _ in cards], [weight for _, weight in cards])
+        else:
+            pools[category] = (list(cards), None)
+    return pools
+
+
+class FastSimulator:
+    """Модель раздачи и голосований по плану без движка: NumPy по пачкам игр или цикл на Python"""
+
+    def __init__(self, cards_data: Dict[str, list], policy: RandomPolicy, seed: Optional[int] = None):
+        self.pools = _card_pools(cards_data)
+        self.policy = policy
+        self.np_rng = np.random.default_rng(seed) if np is not None else None
+
+    @property
+    def mode(self) -> str:
+        return 'numpy' if self.np_rng is not None else 'python'
+
+    def run(self, player_count: int, games: int, stats: SimulationStats):
+        plan = build_game_plan(player_count)
+        if self.np_rng is None:
+            for _ in range(games):
+                self._play_python(plan, player_count, stats)
+            return
+
+        for offset in range(0, games, CHUNK_GAMES):
+            self._play_numpy(plan, player_count, min(CHUNK_GAMES, games - offset), stats)
+
+    def _play_numpy(self, plan: GamePlan, player_count: int, games: int, stats: SimulationStats):
+        rng = self.np_rng
+        policy = self.policy
+        low, high = policy.think
+
+        # Раздача: независимый выбор для каждого игрока, как Player.generate_character
+        for category, (cards, weights) in self.pools.items():
+            if weights is None:
+                draws = rng.integers(len(cards), size=(games, player_count))
+            else:
+                probabilities = np.asarray(weights, dtype=float)
+                draws = rng.choice(len(cards), size=(games, player_count), p=probabilities / probabilities.sum())
+            counts = np.bincount(draws.ravel(), minlength=len(cards))
+            stats.card_counts[category].update({card: int(count) for card, count in zip(cards, counts) if count})
+            duplicates = (np.diff(np.sort(draws, axis=1), axis=1) == 0).any(axis=1)
+            stats.duplicate_games[category] += int(duplicates.sum())
+
+        alive = np.ones((games, player_count), dtype=bool)
+        # Мест на 1-2 меньше, чем игроков (Game.generate_scenario)
+        slots = np.maximum(1, player_count - rng.integers(1, 3, size=games))
+        ended = np.zeros(games, dtype=bool)
+        by_slots = np.zeros(games, dtype=bool)
+        duration = np.zeros(games)
+
+        for card in range(1, CARD_PHASES + 1):
+            # Ходы: молчащий игрок тратит весь таймаут
+            turns = np.where(rng.random((games, player_count)) < policy.idle, GAME_SETTINGS['TURN_TIMEOUT'],
+                             rng.uniform(low, high, (games, player_count)))
+            duration += np.where(ended, 0.0, (turns * alive).sum(axis=1))
+
+            for _ in range(plan.votes_in(card)):
+                index = np.flatnonzero(~ended)
+                if not len(index):
+                    break
+                candidates = alive[index]
+                for revote in (False, True):
+                    votes, voting_time = self._numpy_votes(alive[index], candidates)
+                    duration[index] += voting_time
+                    stats.votes_held += len(index)
+
+                    top = votes.max(axis=1)
+                    leading = (votes == top[:, None]) & (top[:, None] > 0)
+                    leaders = leading.sum(axis=1)
+                    eliminate = leaders == 1
+                    tie = leaders > 1
+                    stats.ties += int(tie.sum())
+                    stats.eliminations[card] += int(eliminate.sum())
+                    alive[index[eliminate], votes[eliminate].argmax(axis=1)] = False
+
+                    done = alive[index].sum(axis=1) <= slots[index]
+                    duration[index[~done]] += GAME_SETTINGS['RESULTS_TIME']
+                    ended[index[done]] = True
+                    by_slots[index[done]] = True
+
+                    # Ничья - одно переголосование между лидерами, повторная ничья никого не исключает
+                    if revote or not tie.any():
+                        break
+                    index, candidates = index[tie], leading[tie]
+
+        stats.games += games
+        stats.durations.extend(duration.tolist())
+        stats.outcomes['slots'] += int(by_slots.sum())
+        stats.outcomes['plan'] += games - int(by_slots.sum())
+
+    def _numpy_votes(self, voters, candidates) -> tuple:
+        """Раунд голосования по пачке игр: голоса по местам и длительность раунда.
+        voters - кто голосует (живые), candidates - против кого можно голосовать"""
+        rng = self.np_rng
+        policy = self.policy
+        low, high = policy.think
+        count, player_count = voters.shape
+        rows = np.arange(count)
+        seats = np.arange(player_count)
+
+        silent = rng.random((count, player_count)) < policy.idle
+        voting = voters & ~silent & (rng.random((count, player_count)) >= policy.abstain)
+
+        if policy.name == 'focused':
+            first = candidates.argmax(axis=1)
+            rest = candidates.copy()
+            rest[rows, first] = False
+            second = rest.argmax(axis=1)
+            targets = np.where(seats == first[:, None], second[:, None], first[:, None])
+        else:
+            # Случайная цель среди кандидатов, не сам голосующий: максимум случайных ключей
+            keys = rng.random((count, player_count, player_count))
+            keys[~np.broadcast_to(candidates[:, None, :], keys.shape)] = -1.0
+            keys[:, seats, seats] = -1.0
+            targets = keys.argmax(axis=2)
+
+        flat = (rows[:, None] * player_count + targets)[voting]
+        votes = np.bincount(flat, minlength=count * player_count).reshape(count, player_count)
+
+        # Голосование кончается, когда проголосовали все, иначе по дедлайну
+        think = np.where(voters, rng.uniform(low, high, (count, player_count)), 0.0).max(axis=1)
+        return votes, np.where((silent & voters).any(axis=1), GAME_SETTINGS['VOTING_TIME'], think)
+
+    def _python_votes(self, alive: List[int], candidates: List[int]) -> Tuple[Counter, float]:
+        """Раунд голосования одной игры: голоса по местам и длительность раунда"""
+        policy = self.policy
+        votes = Counter()
+        voting_time = 0.0
+        for voter in alive:
+            think = policy.think_time()
+            if think is None:
+                voting_time = GAME_SETTINGS['VOTING_TIME']
+                continue
+            voting_time = max(voting_time, think)
+            target = policy.choose_target(voter, candidates)
+            if target is not None:
+                votes[target] += 1
+        return votes, min(voting_time, GAME_SETTINGS['VOTING_TIME'])
+
+    def _play_python(self, plan: GamePlan, player_count: int, stats: SimulationStats):
+        rng = self.policy.rng
+        policy = self.policy
+
+        for category, (cards, weights) in self.pools.items():
+            values = rng.choices(cards, weights=weights, k=player_count)
+            stats.card_counts[category].update(values)
+            if len(set(values)) < len(values):
+                stats.duplicate_games[category] += 1
+
+        alive = list(range(player_count))
+        slots = max(1, player_count - rng.randint(1, 2))
+        duration = 0.0
+        by_slots = False
+
+        for card in range(1, CARD_PHASES + 1):
+            if by_slots:
+                break
+            for _ in alive:
+                think = policy.think_time()
+                duration += GAME_SETTINGS['TURN_TIMEOUT'] if think is None else think
+
+            for _ in range(plan.votes_in(card)):
+                candidates = alive
+                for revote in (False, True):
+                    votes, voting_time = self._python_votes(alive, candidates)
+                    duration += voting_time
+                    stats.votes_held += 1
+
+                    top = max(votes.values(), default=0)
+                    leaders = [seat for seat in candidates if top and votes[seat] == top]
+                    if len(leaders) == 1:
+                        alive.remove(leaders[0])
+                        stats.eliminations[card] += 1
+                    elif leaders:
+                        stats.ties += 1
+
+                    if len(alive) <= slots:
+                        by_slots = True
+                        break
+                    duration += GAME_SETTINGS['RESULTS_TIME']
+
+                    # Ничья - одно переголосование между лидерами, повторная ничья никого не исключает
+                    if revote or len(leaders) < 2:
+                        break
+                    candidates = leaders
+                if by_slots:
+                    break
+
+        stats.games += 1
+        stats.durations.append(duration)
+        stats.outcomes['slots' if by_slots else 'plan'] += 1
+
+
+def run_simulation(player_count: int, games: int, policy_name: str = 'random', abstain: float = 0.1,
+                   idle: float = 0.05, think: Tuple[float, float] = (5.0, 40.0), engine: bool = False,
+                   seed: Optional[int] = None) -> SimulationStats:
+    rng = random.Random(seed)
+    policy = POLICIES[policy_name](rng, abstain=abstain, idle=idle, think=think)
+    started = time.perf_counter()
+
+    if engine:
+        random.seed(seed)  # раздача и сценарий в движке идут через модуль random
+        simulator = EngineSimulator(policy)
+        stats = SimulationStats(player_count, 'engine', policy_name)
+        try:
+            for number in range(games):
+                simulator.play(-1000 - number, player_count, stats)
+        finally:
+            from fanout import shutdown_fan_out
+            shutdown_fan_out()
+    else:
+        cards_data = create_headless_manager(VirtualClock()).cards_data
+        simulator = FastSimulator(cards_data, policy, seed)
+        stats = SimulationStats(player_count, simulator.mode, policy_name)
+        simulator.run(player_count, games, stats)
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Монте-Карло симулятор игр Бункера")
+    parser.add_argument('--players', type=int, default=8, help="Игроков в игре")
+    parser.add_argument('--games', type=int, default=None, help="Игр (по умолчанию 100000, в режиме движка 200)")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random', help="Политика голосования")
+    parser.add_argument('--abstain', type=float, default=0.1, help="Доля воздержавшихся")
+    parser.add_argument('--idle', type=float, default=0.05, help="Доля молчащих до таймаута")
+    parser.add_argument('--think', default='5,40', help="Время на ход и голос, сек: мин,макс")
+    parser.add_argument('--rules', default=None, help="Набор правил game_plan.RULE_SETS")
+    parser.add_argument('--engine', action='store_true', help="Играть через GameManager")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.rules:
+        GAME_SETTINGS['RULE_SET'] = args.rules
+    low, high = (float(value) for value in args.think.split(','))
+    games = args.games or (200 if args.engine else 100000)
+
+    # Логи движка на каждое действие здесь только мешают
+    logging.disable(logging.INFO)
+    stats = run_simulation(args.players, games, args.policy, args.abstain, args.idle, (low, high),
+                           args.engine, args.seed)
+    print(stats.format_report())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
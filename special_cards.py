@@ -484,7 +484,7 @@ else:
     "reveal_all_cards": SpecialCard(
         name="Полное раскрытие",
         description="Раскрой все свои карточки сразу",
-        code="""
+        code=r"""
 if not player.character:
     result = {"success": False, "message": "У вас нет персонажа"}
 else:
@@ -642,7 +642,7 @@ SPECIAL_CARDS = {
             file_content += f'    "{card_id}": SpecialCard(\n'
             file_content += f'        name="{card.name}",\n'
             file_content += f'        description="{card.description}",\n'
-            file_content += f'        code="""{card.code}""",\n'
+            file_content += f'        code=r"""{card.code}""",\n'
             file_content += f'        usage_count={card.usage_count}\n'
             file_content += f'    ),\n'
         
@@ -0,0 +1,308 @@
+# storage.py
+"""Хранилища карточек и состояния живых игр.
+
+Бэкенд выбирается в config (STORAGE_SETTINGS['BACKEND']):
+  json   - файлы в CARDS_DIR и PLAYER_CARDS_DIR (как раньше)
+  memory - только в памяти процесса (тесты, бенчмарки, одноразовые запуски)
+  sqlite - одна база в режиме WAL, состояние игрока хранится отдельной строкой,
+           поэтому раскрытие карточки обновляет одну строку, а не всю игру
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """Интерфейс хранилища.
+
+    Состояние игры - словарь вида {'chat_id', 'phase', 'current_card_phase', 'players': {str(user_id): {...}}}.
+    """
+
+    name = "base"
+
+    def load_cards_category(self, category: str) -> Optional[list]:
+        """Возвращает категорию карточек или None, если ее нет в хранилище"""
+        raise NotImplementedError
+
+    def save_cards_category(self, category: str, cards: list):
+        raise NotImplementedError
+
+    def cards_fingerprint(self, categories) -> Optional[tuple]:
+        """Дешевый отпечаток карточек (меняется при их изменении) для снимка при старте.
+
+        None - бэкенд отпечаток не поддерживает, карточки читаются каждый раз.
+        """
+        return None
+
+    def save_game_state(self, chat_id: int, game_data: dict):
+        """Сохраняет состояние игры целиком"""
+        raise NotImplementedError
+
+    def save_player_state(self, chat_id: int, game_header: dict, user_id: int, player_data: dict):
+        """Сохраняет состояние одного игрока (и заголовок игры: фаза и т.п.)"""
+        game_data = self.load_game_state(chat_id) or {'players': {}}
+        game_data.update(game_header)
+        game_data['players'][str(user_id)] = player_data
+        self.save_game_state(chat_id, game_data)
+
+    def load_game_state(self, chat_id: int) -> Optional[dict]:
+        raise NotImplementedError
+
+    def delete_game_state(self, chat_id: int) -> bool:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def _write_json_atomic(path: str, data):
+    """Пишет JSON во временный файл и подменяет им исходный: читатель видит старый или новый файл целиком"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class JsonFileStorage(StorageBackend):
+    """Карточки и игры в JSON-файлах (по файлу на категорию и на игру).
+
+    Сохранение игрока - чтение, правка и запись файла игры, поэтому записи
+    одной игры идут под замком чата, иначе параллельные голоса теряют друг друга.
+    """
+
+    name = "json"
+
+    def __init__(self, cards_dir: str, games_dir: str):
+        self.cards_dir = cards_dir
+        self.games_dir = games_dir
+        os.makedirs(cards_dir, exist_ok=True)
+        os.makedirs(games_dir, exist_ok=True)
+        self._chat_locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _game_file(self, chat_id: int) -> str:
+        return os.path.join(self.games_dir, f'game_{chat_id}.json')
+
+    def _chat_lock(self, chat_id: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._chat_locks.setdefault(chat_id, threading.Lock())
+
+    def load_cards_category(self, category: str) -> Optional[list]:
+        file_path = os.path.join(self.cards_dir, f'{category}.json')
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_cards_category(self, category: str, cards: list):
+        _write_json_atomic(os.path.join(self.cards_dir, f'{category}.json'), cards)
+
+    def cards_fingerprint(self, categories) -> Optional[tuple]:
+        fingerprint = []
+        for category in categories:
+            try:
+                stat = os.stat(os.path.join(self.cards_dir, f'{category}.json'))
+                fingerprint.append((category, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                fingerprint.append((category, None, None))
+        return tuple(fingerprint)
+
+    def save_game_state(self, chat_id: int, game_data: dict):
+        with self._chat_lock(chat_id):
+            _write_json_atomic(self._game_file(chat_id), game_data)
+
+    def save_player_state(self, chat_id: int, game_header: dict, user_id: int, player_data: dict):
+        with self._chat_lock(chat_id):
+            game_data = self._read_game(chat_id) or {'players': {}}
+            game_data.update(game_header)
+            game_data['players'][str(user_id)] = player_data
+            _write_json_atomic(self._game_file(chat_id), game_data)
+
+    def _read_game(self, chat_id: int) -> Optional[dict]:
+        filename = self._game_file(chat_id)
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_game_state(self, chat_id: int) -> Optional[dict]:
+        # Файл подменяется целиком (os.replace), читать можно без замка
+        return self._read_game(chat_id)
+
+    def delete_game_state(self, chat_id: int) -> bool:
+        with self._chat_lock(chat_id):
+            filename = self._game_file(chat_id)
+            deleted = os.path.exists(filename)
+            if deleted:
+                os.remove(filename)
+        with self._locks_guard:
+            self._chat_locks.pop(chat_id, None)
+        return deleted
+
+
+def _copy(data):
+    """Независимая копия данных (pickle в C-коде заметно быстрее copy.deepcopy)"""
+    return pickle.loads(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+
+class MemoryStorage(StorageBackend):
+    """Хранилище в памяти процесса (данные копируются, как при записи на диск)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._cards: Dict[str, list] = {}
+        self._games: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def load_cards_category(self, category: str) -> Optional[list]:
+        with self._lock:
+            cards = self._cards.get(category)
+            return _copy(cards) if cards is not None else None
+
+    def save_cards_category(self, category: str, cards: list):
+        with self._lock:
+            self._cards[category] = _copy(cards)
+
+    def save_game_state(self, chat_id: int, game_data: dict):
+        with self._lock:
+            self._games[chat_id] = _copy(game_data)
+
+    def save_player_state(self, chat_id: int, game_header: dict, user_id: int, player_data: dict):
+        with self._lock:
+            game_data = self._games.setdefault(chat_id, {'players': {}})
+            game_data.update(_copy(game_header))
+            game_data['players'][str(user_id)] = _copy(player_data)
+
+    def load_game_state(self, chat_id: int) -> Optional[dict]:
+        with self._lock:
+            game_data = self._games.get(chat_id)
+            return _copy(game_data) if game_data is not None else None
+
+    def delete_game_state(self, chat_id: int) -> bool:
+        with self._lock:
+            return self._games.pop(chat_id, None) is not None
+
+
+class SQLiteStorage(StorageBackend):
+    """Хранилище в SQLite (WAL). Игрок - отдельная строка player_states.
+
+    Все запросы - постоянные параметризованные строки, поэтому sqlite3 берет
+    подготовленные выражения из кэша соединения и не разбирает SQL повторно.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cards (
+        category TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS game_states (
+        chat_id INTEGER PRIMARY KEY,
+        header TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS player_states (
+        chat_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (chat_id, user_id)
+    ) WITHOUT ROWID;
+    """
+
+    SQL_LOAD_CARDS = "SELECT data FROM cards WHERE category = ?"
+    SQL_SAVE_CARDS = ("INSERT INTO cards (category, data) VALUES (?, ?) "
+                      "ON CONFLICT(category) DO UPDATE SET data = excluded.data")
+    SQL_SAVE_HEADER = ("INSERT INTO game_states (chat_id, header) VALUES (?, ?) "
+                       "ON CONFLICT(chat_id) DO UPDATE SET header = excluded.header")
+    SQL_SAVE_PLAYER = ("INSERT INTO player_states (chat_id, user_id, data) VALUES (?, ?, ?) "
+                       "ON CONFLICT(chat_id, user_id) DO UPDATE SET data = excluded.data")
+    SQL_LOAD_HEADER = "SELECT header FROM game_states WHERE chat_id = ?"
+    SQL_LOAD_PLAYERS = "SELECT user_id, data FROM player_states WHERE chat_id = ?"
+    SQL_DELETE_HEADER = "DELETE FROM game_states WHERE chat_id = ?"
+    SQL_DELETE_PLAYERS = "DELETE FROM player_states WHERE chat_id = ?"
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _dumps(data) -> str:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _split_header(game_data: dict) -> dict:
+        return {key: value for key, value in game_data.items() if key != 'players'}
+
+    def load_cards_category(self, category: str) -> Optional[list]:
+        with self._lock:
+            row = self._conn.execute(self.SQL_LOAD_CARDS, (category,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_cards_category(self, category: str, cards: list):
+        with self._lock, self._conn:
+            self._conn.execute(self.SQL_SAVE_CARDS, (category, self._dumps(cards)))
+
+    def save_game_state(self, chat_id: int, game_data: dict):
+        players = [(chat_id, int(user_id), self._dumps(player_data))
+                   for user_id, player_data in game_data.get('players', {}).items()]
+        with self._lock, self._conn:
+            self._conn.execute(self.SQL_SAVE_HEADER, (chat_id, self._dumps(self._split_header(game_data))))
+            self._conn.execute(self.SQL_DELETE_PLAYERS, (chat_id,))
+            self._conn.executemany(self.SQL_SAVE_PLAYER, players)
+
+    def save_player_state(self, chat_id: int, game_header: dict, user_id: int, player_data: dict):
+        with self._lock, self._conn:
+            self._conn.execute(self.SQL_SAVE_HEADER, (chat_id, self._dumps(game_header)))
+            self._conn.execute(self.SQL_SAVE_PLAYER, (chat_id, user_id, self._dumps(player_data)))
+
+    def load_game_state(self, chat_id: int) -> Optional[dict]:
+        with self._lock:
+            header = self._conn.execute(self.SQL_LOAD_HEADER, (chat_id,)).fetchone()
+            if not header:
+                return None
+            rows = self._conn.execute(self.SQL_LOAD_PLAYERS, (chat_id,)).fetchall()
+
+        game_data = json.loads(header[0])
+        game_data['players'] = {str(user_id): json.loads(data) for user_id, data in rows}
+        return game_data
+
+    def delete_game_state(self, chat_id: int) -> bool:
+        with self._lock, self._conn:
+            deleted = self._conn.execute(self.SQL_DELETE_HEADER, (chat_id,)).rowcount
+            self._conn.execute(self.SQL_DELETE_PLAYERS, (chat_id,))
+        return deleted > 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_storage(backend: Optional[str] = None) -> StorageBackend:
+    """Создает хранилище по имени бэкенда (по умолчанию - из config)"""
+    from config import STORAGE_SETTINGS, CARDS_DIR, PLAYER_CARDS_DIR
+
+    backend = (backend or STORAGE_SETTINGS['BACKEND']).lower()
+    if backend == 'json':
+        return JsonFileStorage(CARDS_DIR, PLAYER_CARDS_DIR)
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'sqlite':
+        return SQLiteStorage(STORAGE_SETTINGS['SQLITE_FILE'])
+
+    raise ValueError(f"Неизвестный бэкенд хранилища: {backend}")
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Аналитика карточек при нескольких писателях в одном каталоге"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from card_analytics import POOL_CODES, CardAnalyticsStore  # noqa: E402
+
+GAMES = 50
+
+
+def _game_rows(worker: int, game: int) -> list:
+    """Игра из двух профессий; у воркеров разный порядок появления карточек"""
+    first, second = ('Врач', 'Повар') if worker == 0 else ('Повар', 'Врач')
+    code = POOL_CODES['professions']
+    return [
+        (code, ('professions', first), 1, 1, 0, 1, 0),
+        (code, ('professions', second), 2, 1, 0, 0, 1),
+        (code, ('professions', f"Воркер {worker}"), 0, 0, 0, game % 2, 0),
+    ]
+
+
+def _append_games(directory: str, worker: int):
+    store = CardAnalyticsStore(directory, part=f"worker{worker}")
+    for game in range(GAMES):
+        store.append_rows(_game_rows(worker, game))
+    store.close()
+
+
+class TwoAppendersTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_parallel_processes_merge_on_read(self):
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=_append_games, args=(self.directory, worker)) for worker in (0, 1)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            self.assertEqual(process.exitcode, 0)
+
+        store = CardAnalyticsStore(self.directory)
+        stats = store.get_stats()
+        self.assertEqual(stats['games'], 2 * GAMES)
+        self.assertEqual(stats['rows'], 2 * GAMES * 3)
+        self.assertEqual(stats['parts'], 3)
+        self.assertEqual(stats['cards'], 4)
+
+        rates = {value: (count, rate) for value, count, rate in store.win_rates('professions')}
+        # Врач у одного воркера побеждает, у другого исключен; номера в их словарях разные
+        self.assertEqual(rates['Врач'], (2 * GAMES, 0.5))
+        self.assertEqual(rates['Повар'], (2 * GAMES, 0.5))
+        self.assertEqual(rates['Воркер 0'], (GAMES, 0.5))
+        self.assertEqual(rates['Воркер 1'], (GAMES, 0.5))
+
+        lift = {(pool, value): count for pool, value, count, _, _ in store.elimination_lift(min_count=1)}
+        self.assertEqual(lift, {('professions', 'Врач'): 2 * GAMES, ('professions', 'Повар'): 2 * GAMES})
+        store.close()
+
+    def test_reader_sees_rows_of_live_writer(self):
+        first = CardAnalyticsStore(self.directory, part='worker0')
+        second = CardAnalyticsStore(self.directory, part='worker1')
+        first.append_rows(_game_rows(0, 0))
+        self.assertEqual(second.games, 1)
+
+        second.append_rows(_game_rows(1, 0))
+        first.append_rows(_game_rows(0, 1))
+        self.assertEqual(second.games, 3)
+        self.assertEqual(first.rows, second.rows)
+        self.assertEqual(sorted(first.win_rates('professions')), sorted(second.win_rates('professions')))
+
+        # Каталоги воркеров не пересекаются: у каждого свои колонки
+        for worker in (0, 1):
+            self.assertTrue(os.path.exists(os.path.join(self.directory, f"worker{worker}", 'game.col')))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'game.col')))
+
+    def test_torn_tail_of_other_writer_is_ignored(self):
+        writer = CardAnalyticsStore(self.directory, part='worker0')
+        writer.append_rows(_game_rows(0, 0))
+        # Писатель успел дописать только часть колонок новой игры
+        with open(os.path.join(self.directory, 'worker0', 'game.col'), 'ab') as f:
+            f.write(b"\x01\x00\x00\x00")
+
+        reader = CardAnalyticsStore(self.directory, part='worker1')
+        self.assertEqual(reader.rows, 3)
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, 'worker0', 'game.col')), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
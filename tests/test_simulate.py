@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Быстрая модель симулятора против настоящего движка"""
+import logging
+import math
+import os
+import statistics
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulate import run_simulation  # noqa: E402
+
+PLAYERS = 8
+ENGINE_GAMES = 300
+FAST_GAMES = 5000
+# Расхождение больше стольких стандартных ошибок - модель не совпадает с движком
+MAX_Z = 4.0
+
+
+def _z_share(count_a: int, total_a: int, count_b: int, total_b: int) -> float:
+    share_a, share_b = count_a / total_a, count_b / total_b
+    pooled = (count_a + count_b) / (total_a + total_b)
+    error = math.sqrt(pooled * (1 - pooled) * (1 / total_a + 1 / total_b))
+    return abs(share_a - share_b) / error if error else 0.0
+
+
+def _z_mean(values_a: list, values_b: list) -> float:
+    error = math.sqrt(statistics.variance(values_a) / len(values_a) + statistics.variance(values_b) / len(values_b))
+    return abs(statistics.fmean(values_a) - statistics.fmean(values_b)) / error
+
+
+class FastModelMatchesEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def _compare(self, policy: str):
+        engine = run_simulation(PLAYERS, ENGINE_GAMES, policy, engine=True, seed=11)
+        fast = run_simulation(PLAYERS, FAST_GAMES, policy, seed=12)
+        self.assertEqual(engine.outcomes['stalled'], 0)
+
+        self.assertLess(_z_mean(engine.durations, fast.durations), MAX_Z, "длительность игры")
+        # После одной фазы раскрытия голосование одно: исключений в игре 0 или 1
+        for card in (2, 3):
+            self.assertLess(_z_share(engine.eliminations[card], engine.games, fast.eliminations[card], fast.games),
+                            MAX_Z, f"исключения после фазы {card}")
+        self.assertLess(_z_share(engine.outcomes['plan'], engine.games, fast.outcomes['plan'], fast.games),
+                        MAX_Z, "доля игр, где кончился план")
+        self.assertLess(_z_share(engine.ties, engine.votes_held, fast.ties, fast.votes_held),
+                        MAX_Z, "доля голосований с ничьей")
+
+    def test_random_policy(self):
+        self._compare('random')
+
+    def test_focused_policy(self):
+        self._compare('focused')
+
+
+if __name__ == '__main__':
+    unittest.main()
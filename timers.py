@@ -1,9 +1,12 @@
 # timers.py
 import threading
 import time
-from typing import Dict, Callable, Optional
+from typing import Any, Dict, Callable, Optional
 import logging
 
+from logging_setup import bind_log_context, clear_log_context
+from tracing import tracer
+
 logger = logging.getLogger(__name__)
 
 class GameTimer:
@@ -12,6 +15,8 @@ class GameTimer:
     def __init__(self):
         self.timers: Dict[str, threading.Timer] = {}
         self.active_timers: Dict[str, bool] = {}
+        # Остановка и срабатывание одного таймера не должны выполниться оба
+        self._lock = threading.Lock()
     
     def start_timer(self, timer_id: str, duration: int, callback: Callable, *args, **kwargs):
         """Запускает таймер"""
@@ -23,23 +28,25 @@ class GameTimer:
             timer = threading.Timer(duration, self._timer_callback, 
                                   args=[timer_id, callback, args, kwargs])
             
-            self.timers[timer_id] = timer
-            self.active_timers[timer_id] = True
+            with self._lock:
+                self.timers[timer_id] = timer
+                self.active_timers[timer_id] = True
             timer.start()
             
-            logger.info(f"Таймер {timer_id} запущен на {duration} секунд")
+            logger.debug("Таймер %s запущен на %s секунд", timer_id, duration)
             
         except Exception as e:
             logger.error(f"Ошибка при запуске таймера {timer_id}: {e}")
     
     def stop_timer(self, timer_id: str) -> bool:
-        """Останавливает таймер"""
+        """Останавливает таймер (False - не запущен или уже сработал)"""
         try:
-            if timer_id in self.timers:
-                self.timers[timer_id].cancel()
-                del self.timers[timer_id]
+            with self._lock:
+                timer = self.timers.pop(timer_id, None)
                 self.active_timers[timer_id] = False
-                logger.info(f"Таймер {timer_id} остановлен")
+            if timer:
+                timer.cancel()
+                logger.debug("Таймер %s остановлен", timer_id)
                 return True
         except Exception as e:
             logger.error(f"Ошибка при остановке таймера {timer_id}: {e}")
@@ -52,12 +59,24 @@ class GameTimer:
     def _timer_callback(self, timer_id: str, callback: Callable, args: tuple, kwargs: dict):
         """Внутренний колбэк таймера"""
         try:
-            self.active_timers[timer_id] = False
-            if timer_id in self.timers:
+            with self._lock:
+                # Таймер успели остановить или перезапустить - этот колбэк не нужен
+                # (поток threading.Timer - сам таймер)
+                if self.timers.get(timer_id) is not threading.current_thread():
+                    return
                 del self.timers[timer_id]
+                self.active_timers[timer_id] = False
             
-            # Вызываем колбэк
-            callback(*args, **kwargs)
+            # Первый аргумент колбэков игровых таймеров - chat_id
+            clear_log_context()
+            if args and isinstance(args[0], int):
+                bind_log_context(chat_id=args[0])
+
+            # Вызываем колбэк (срабатывание таймера - отдельная трасса)
+            trace = tracer.new_trace(f"timer:{getattr(callback, '__name__', timer_id)}",
+                                     chat_id=args[0] if args else None)
+            with tracer.activate(trace):
+                callback(*args, **kwargs)
             
         except Exception as e:
             logger.error(f"Ошибка в колбэке таймера {timer_id}: {e}")
@@ -73,6 +92,103 @@ class GameTimer:
         # Это упрощенная реализация, для точного времени нужно хранить время старта
         return None
 
+class Debouncer:
+    """Сводит серию вызовов по ключу в одно срабатывание за окно window.
+
+    Первый вызов планирует срабатывание через window, следующие до него только
+    заменяют аргументы: колбэк получает последнее состояние, а число срабатываний
+    зависит от времени, а не от числа вызовов. Вызов во время срабатывания
+    планирует еще одно, поэтому последнее изменение всегда доходит.
+    """
+
+    def __init__(self, window: float, callback: Callable):
+        self.window = window
+        self.callback = callback
+        self._timers: Dict[Any, threading.Timer] = {}
+        self._args: Dict[Any, tuple] = {}
+        # key -> [замок, сколько срабатываний его держат или ждут]; живет, пока есть срабатывания
+        self._key_locks: Dict[Any, list] = {}
+        self._lock = threading.Lock()
+        self.triggered = 0
+        self.fired = 0
+
+    def trigger(self, key, *args):
+        """Запрашивает срабатывание для ключа (аргументы колбэка - key, *args)"""
+        with self._lock:
+            self.triggered += 1
+            self._args[key] = args
+            if key in self._timers:
+                return
+            timer = threading.Timer(self.window, self._fire, args=[key])
+            timer.daemon = True
+            self._timers[key] = timer
+        timer.start()
+
+    def is_pending(self, key) -> bool:
+        """Есть ли по ключу несработавшее изменение"""
+        with self._lock:
+            return key in self._args
+
+    def cancel(self, key) -> bool:
+        """Отменяет запланированное срабатывание"""
+        with self._lock:
+            self._args.pop(key, None)
+            timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        return timer is not None
+
+    def flush(self, key):
+        """Выполняет запланированное срабатывание сразу"""
+        with self._lock:
+            timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+            self._run(key)
+
+    def flush_all(self):
+        """Выполняет все запланированные срабатывания (остановка бота)"""
+        with self._lock:
+            keys = list(self._timers)
+        for key in keys:
+            self.flush(key)
+
+    def _fire(self, key):
+        with self._lock:
+            self._timers.pop(key, None)
+
+        clear_log_context()
+        if isinstance(key, int):
+            bind_log_context(chat_id=key)
+        trace = tracer.new_trace(f"debounce:{getattr(self.callback, '__name__', 'callback')}",
+                                 chat_id=key if isinstance(key, int) else None)
+        with tracer.activate(trace):
+            self._run(key)
+
+    def _run(self, key):
+        with self._lock:
+            args = self._args.pop(key, None)
+            if args is None:
+                return
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        # Срабатывания одного ключа не идут параллельно (медленный запрос дольше окна)
+        try:
+            with entry[0]:
+                self.fired += 1
+                try:
+                    self.callback(key, *args)
+                except Exception as e:
+                    logger.error(f"Ошибка отложенного обновления {key}: {e}")
+        finally:
+            # Замок не нужен, когда по ключу не осталось срабатываний: ключи (чаты) не копятся
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+
 class PhaseTimer:
     """Специальный таймер для фаз игры"""
     
@@ -103,15 +219,26 @@ class PhaseTimer:
             # Останавливаем все таймеры для чата
             stopped = False
             for timer_id in list(self.timer.timers.keys()):
-                if timer_id.startswith(f"phase_{chat_id}"):
+                if timer_id.startswith(f"phase_{chat_id}_"):
                     self.timer.stop_timer(timer_id)
                     stopped = True
             return stopped
+
+    def stop_chat_timers(self, chat_id: int) -> int:
+        """Останавливает все таймеры чата (фазы и ходы игроков)"""
+        prefixes = (f"phase_{chat_id}_", f"turn_{chat_id}_")
+        stopped = 0
+        for timer_id in list(self.timer.timers.keys()):
+            if timer_id.startswith(prefixes):
+                self.timer.stop_timer(timer_id)
+                self.phase_start_times.pop(timer_id, None)
+                stopped += 1
+        return stopped
     
     def _phase_timeout(self, chat_id: int, phase: str):
         """Обработка истечения времени фазы"""
         try:
-            logger.info(f"Истекло время фазы {phase} для чата {chat_id}")
+            logger.info("Истекло время фазы %s для чата %s", phase, chat_id)
             
             # Уведомляем game_manager о завершении фазы
             if hasattr(self.game_manager, 'on_phase_timeout'):
@@ -0,0 +1,252 @@
+# tracing.py
+"""Легкая трассировка обработки обновлений.
+
+Middleware создает трассу для каждого сообщения/колбэка и прикрепляет ее к
+объекту обновления. Обработчик (в потоке пула) активирует трассу, а вложенные
+вызовы - методы GameManager и каждый запрос к Telegram API - пишут в нее спаны.
+Время от middleware до начала обработчика попадает в спан "wait" (очередь пула).
+
+Медленные трассы (дольше TRACING_SETTINGS['SLOW_MS']) пишутся в лог, самые
+медленные из последних хранятся для команды /traces.
+"""
+import contextlib
+import functools
+import heapq
+import itertools
+import os
+import threading
+import time
+import logging
+from typing import List, Optional
+
+from logging_setup import bind_log_context
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ('name', 'start_ms', 'duration_ms', 'depth', 'error')
+
+    def __init__(self, name: str, start_ms: float, depth: int):
+        self.name = name
+        self.start_ms = start_ms
+        self.duration_ms = 0.0
+        self.depth = depth
+        self.error = False
+
+
+class Trace:
+    """Одна трасса: обработка одного обновления или срабатывание таймера"""
+
+    __slots__ = ('trace_id', 'name', 'attrs', 'started', 'wall_started', 'spans', 'duration_ms', 'depth')
+
+    def __init__(self, trace_id: str, name: str, attrs: dict):
+        self.trace_id = trace_id
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans: List[Span] = []
+        self.duration_ms = 0.0
+        self.depth = 0
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def format(self) -> str:
+        """Дерево спанов для лога и админ-команды"""
+        attrs = ", ".join(f"{key}={value}" for key, value in self.attrs.items() if value is not None)
+        lines = [f"{self.trace_id} {self.name} {self.duration_ms:.0f} мс" + (f" ({attrs})" if attrs else "")]
+        for span in self.spans:
+            mark = " ❌" if span.error else ""
+            lines.append(f"{'  ' * (span.depth + 1)}└ {span.name} +{span.start_ms:.0f} / {span.duration_ms:.0f} мс{mark}")
+        return "\n".join(lines)
+
+
+class Tracer:
+    """Создает трассы, ведет спаны текущего потока и хранит самые медленные трассы"""
+
+    # Защита от разрастания трассы (например, рассылка на 16 игроков с повторами)
+    MAX_SPANS = 200
+
+    def __init__(self, enabled: bool = True, slow_ms: float = 1000, keep: int = 20):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.keep = keep
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._slowest: List[tuple] = []  # min-куча (длительность, номер, трасса)
+        self._counter = itertools.count()
+        self._prefix = f"{os.getpid():x}"
+        self.finished = 0
+        self.slow = 0
+
+    def new_trace(self, name: str, **attrs) -> Optional[Trace]:
+        """Создает трассу (без активации в текущем потоке)"""
+        if not self.enabled:
+            return None
+        return Trace(f"{self._prefix}-{next(self._counter):x}", name, attrs)
+
+    def current(self) -> Optional[Trace]:
+        return getattr(self._local, 'trace', None)
+
+    @contextlib.contextmanager
+    def activate(self, trace: Optional[Trace]):
+        """Делает трассу текущей в потоке на время блока и завершает ее в конце"""
+        if trace is None:
+            yield None
+            return
+
+        previous = self.current()
+        self._local.trace = trace
+        bind_log_context(trace_id=trace.trace_id)
+
+        # Ожидание от создания трассы до начала обработки (очередь пула потоков)
+        waited = trace.elapsed_ms()
+        if waited >= 1:
+            span = Span("wait", 0.0, 0)
+            span.duration_ms = waited
+            trace.spans.append(span)
+
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+            bind_log_context(trace_id=previous.trace_id if previous else None)
+            self.finish(trace)
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """Спан внутри текущей трассы (ничего не делает без трассы)"""
+        trace = self.current()
+        if trace is None or len(trace.spans) >= self.MAX_SPANS:
+            yield
+            return
+
+        span = Span(name, trace.elapsed_ms(), trace.depth)
+        trace.spans.append(span)
+        trace.depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            span.error = True
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000
+            trace.depth -= 1
+
+    def finish(self, trace: Trace):
+        """Закрывает трассу: лог медленной трассы и учет в топе"""
+        trace.duration_ms = trace.elapsed_ms()
+
+        with self._lock:
+            self.finished += 1
+            entry = (trace.duration_ms, next(self._counter), trace)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif trace.duration_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+            is_slow = trace.duration_ms >= self.slow_ms
+            if is_slow:
+                self.slow += 1
+
+        if is_slow:
+            logger.warning("Медленная трасса:\n%s", trace.format())
+
+    def get_slowest(self, limit: int = 5) -> List[Trace]:
+        """Самые медленные трассы (по убыванию длительности)"""
+        with self._lock:
+            entries = sorted(self._slowest, key=lambda entry: entry[0], reverse=True)
+        return [trace for _, _, trace in entries[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._slowest.clear()
+
+
+def _create_tracer() -> Tracer:
+    from config import TRACING_SETTINGS
+    return Tracer(TRACING_SETTINGS['ENABLED'], TRACING_SETTINGS['SLOW_MS'], TRACING_SETTINGS['KEEP'])
+
+
+tracer = _create_tracer()
+
+
+def traced(name: str = None):
+    """Декоратор: вызов функции - спан текущей трассы"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if tracer.current() is None:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_entry(func):
+    """Декоратор обработчика обновления: активирует трассу, созданную в middleware.
+
+    Если трассы нет (middleware выключены), создает новую.
+    """
+    @functools.wraps(func)
+    def wrapper(update_object, *args, **kwargs):
+        trace = getattr(update_object, 'trace', None) or tracer.new_trace(func.__name__)
+        with tracer.activate(trace):
+            with tracer.span(func.__name__):
+                return func(update_object, *args, **kwargs)
+    return wrapper
+
+
+def start_update_trace(update_object) -> Optional[Trace]:
+    """Создает трассу для сообщения или колбэка и прикрепляет ее к объекту"""
+    if not tracer.enabled:
+        return None
+
+    message = getattr(update_object, 'message', None)
+    if message is not None and hasattr(update_object, 'data'):
+        # CallbackQuery
+        trace = tracer.new_trace(
+            f"callback:{(update_object.data or '')[:24]}",
+            chat_id=message.chat.id, user_id=update_object.from_user.id
+        )
+    else:
+        text = getattr(update_object, 'text', None) or ''
+        trace = tracer.new_trace(
+            f"message:{text.split()[0][:24] if text.startswith('/') else 'text'}",
+            chat_id=update_object.chat.id,
+            user_id=update_object.from_user.id if update_object.from_user else None
+        )
+
+    update_object.trace = trace
+    return trace
+
+
+_api_tracing_installed = False
+
+
+def install_api_tracing():
+    """Оборачивает apihelper._make_request: каждый запрос к Telegram - спан api.<метод>"""
+    global _api_tracing_installed
+    if _api_tracing_installed:
+        return
+
+    from telebot import apihelper
+
+    original = apihelper._make_request
+
+    @functools.wraps(original)
+    def traced_make_request(token, method_name, *args, **kwargs):
+        if tracer.current() is None:
+            return original(token, method_name, *args, **kwargs)
+        with tracer.span(f"api.{method_name}"):
+            return original(token, method_name, *args, **kwargs)
+
+    apihelper._make_request = traced_make_request
+    _api_tracing_installed = True
@@ -0,0 +1,206 @@
+# user_state.py
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class UserStateStore:
+    """Хранилище состояний пользователей с TTL записей и ограничением размера (LRU).
+
+    Повторяет интерфейс словаря (in, [], del, get, pop), поэтому обработчики
+    работают с ним так же, как с обычным dict. Просроченные записи удаляются
+    при обращении и фоновой очисткой.
+    """
+
+    def __init__(self, ttl: float = 900, max_size: int = 10000,
+                 sweep_interval: float = 60, persist_file: Optional[str] = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self.persist_file = persist_file
+
+        # user_id -> (значение, момент истечения по time.time())
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._stop_event = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+        if self.persist_file:
+            self._load()
+
+    # --- интерфейс словаря ---
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._items[key]
+            self._dirty = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key, default=None):
+        """Возвращает состояние пользователя и продлевает его позицию в LRU"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._items[key]
+                self.expirations += 1
+                self.misses += 1
+                self._dirty = True
+                return default
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """Сохраняет состояние с TTL (по умолчанию - общий TTL хранилища)"""
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            self._dirty = True
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Удаляет и возвращает состояние"""
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is None:
+                return default
+            self._dirty = True
+            return entry[0]
+
+    # --- обслуживание ---
+
+    def sweep(self) -> int:
+        """Удаляет все просроченные записи. Возвращает количество удаленных"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._items.items() if expires_at <= now]
+            for key in expired:
+                del self._items[key]
+            if expired:
+                self.expirations += len(expired)
+                self._dirty = True
+
+        if expired:
+            logger.debug(f"Удалено просроченных состояний пользователей: {len(expired)}")
+        return len(expired)
+
+    def start_sweeper(self):
+        """Запускает фоновую очистку просроченных записей"""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="user-state-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.sweep()
+                self.save()
+            except Exception as e:
+                logger.error(f"Ошибка фоновой очистки состояний пользователей: {e}")
+
+    def close(self):
+        """Останавливает фоновую очистку и сохраняет состояния"""
+        self._stop_event.set()
+        if self._sweeper:
+            self._sweeper.join(timeout=5)
+        self.save()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает счетчики хранилища"""
+        with self._lock:
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    # --- сохранение ---
+
+    def save(self) -> bool:
+        """Сохраняет непросроченные состояния в файл (если он задан)"""
+        if not self.persist_file:
+            return False
+
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = [[key, value, expires_at] for key, (value, expires_at) in self._items.items()]
+            self._dirty = False
+
+        try:
+            tmp_path = f"{self.persist_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_file)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения состояний пользователей: {e}")
+            with self._lock:
+                self._dirty = True
+            return False
+
+    def _load(self):
+        """Загружает состояния из файла, пропуская просроченные"""
+        if not os.path.exists(self.persist_file):
+            return
+
+        try:
+            with open(self.persist_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            now = time.time()
+            with self._lock:
+                for key, value, expires_at in data:
+                    if expires_at > now:
+                        self._items[key] = (value, expires_at)
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+
+            logger.info(f"Загружено состояний пользователей: {len(self._items)}")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки состояний пользователей: {e}")